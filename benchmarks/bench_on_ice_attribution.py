@@ -0,0 +1,125 @@
+"""
+Benchmark on-ice player attribution on a synthetic full season.
+
+Compares the original iterrows loop (linear scan of the shift chart for every shot)
+against the per-game ShiftIndex lookup and the vectorized whole-game attribution.
+
+Usage:
+    python benchmarks/bench_on_ice_attribution.py --games 1312 --legacy-games 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.shift_index import ShiftIndex, attribute_players_on_ice, time_to_seconds
+
+TEAMS = ['TOR', 'MTL']
+
+
+def legacy_get_players_on_ice(shifts_data, shot_time, shot_period, team_code):
+    players_on_ice = {'shooting_team': [], 'opposing_team': []}
+    for shift in shifts_data:
+        start_time = time_to_seconds(shift['startTime'])
+        end_time = time_to_seconds(shift['endTime'])
+        shift_length = end_time - start_time
+        if shift['period'] == shot_period and start_time <= shot_time < end_time and shift_length <= 300:
+            player_name = f"{shift['firstName']} {shift['lastName']}"
+            if shift['teamAbbrev'] == team_code:
+                players_on_ice['shooting_team'].append(player_name)
+            else:
+                players_on_ice['opposing_team'].append(player_name)
+    return ', '.join(players_on_ice['shooting_team']), ', '.join(players_on_ice['opposing_team'])
+
+
+def legacy_process_shots(shots_df, shifts_data_cache):
+    shots_df['shooting_team_players'] = ''
+    shots_df['opposing_team_players'] = ''
+    for idx, row in shots_df.iterrows():
+        shot_time_seconds = row['time']
+        shot_period = row['period']
+        if shot_period > 1:
+            shot_time_seconds -= (shot_period - 1) * 1200
+        shooting, opposing = legacy_get_players_on_ice(shifts_data_cache[row['nhl_game_id']], shot_time_seconds, shot_period, row['teamCode'])
+        shots_df.at[idx, 'shooting_team_players'] = shooting
+        shots_df.at[idx, 'opposing_team_players'] = opposing
+    return shots_df
+
+
+def make_game(rng, shifts_per_game=800, shots_per_game=80):
+    shifts = []
+    per_period = shifts_per_game // 3
+    for period in (1, 2, 3):
+        for i in range(per_period):
+            player = i % 36
+            start = rng.randint(0, 1150)
+            end = min(start + rng.randint(20, 70), 1200)
+            shifts.append({
+                'period': period,
+                'startTime': f"{start // 60:02d}:{start % 60:02d}",
+                'endTime': f"{end // 60:02d}:{end % 60:02d}",
+                'firstName': f"First{player}",
+                'lastName': f"Last{player}",
+                'teamAbbrev': TEAMS[player % 2],
+            })
+    shots = [(rng.randint(0, 3599), rng.choice(TEAMS)) for _ in range(shots_per_game)]
+    return shifts, shots
+
+
+def make_season(games, seed=2024):
+    rng = random.Random(seed)
+    shifts_data_cache = {}
+    rows = []
+    for game in range(games):
+        nhl_game_id = 2024020001 + game
+        shifts, shots = make_game(rng)
+        shifts_data_cache[nhl_game_id] = shifts
+        for shot_time, team in shots:
+            rows.append((nhl_game_id, shot_time, shot_time // 1200 + 1, team))
+    shots_df = pd.DataFrame(rows, columns=['nhl_game_id', 'time', 'period', 'teamCode'])
+    return shots_df, shifts_data_cache
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=1312, help='Games in the synthetic season')
+    parser.add_argument('--legacy-games', type=int, default=20, help='Games to time with the legacy loop (extrapolated)')
+    args = parser.parse_args()
+
+    shots_df, shifts_data_cache = make_season(args.games)
+    print(f"Synthetic season: {args.games} games, {len(shots_df)} shots")
+
+    legacy_ids = list(shifts_data_cache)[:args.legacy_games]
+    legacy_shots = shots_df[shots_df['nhl_game_id'].isin(legacy_ids)].copy()
+    legacy_result, legacy_time = timed(legacy_process_shots, legacy_shots, shifts_data_cache)
+    legacy_season = legacy_time * len(shots_df) / max(len(legacy_shots), 1)
+
+    def build_indexes():
+        return {nhl_game_id: ShiftIndex(shifts) for nhl_game_id, shifts in shifts_data_cache.items()}
+
+    shift_indexes, index_time = timed(build_indexes)
+    vectorized_result, vectorized_time = timed(attribute_players_on_ice, shots_df.copy(), shift_indexes)
+
+    check = vectorized_result.loc[legacy_result.index, ['shooting_team_players', 'opposing_team_players']]
+    assert check.equals(legacy_result[['shooting_team_players', 'opposing_team_players']]), "Attribution mismatch"
+
+    new_total = index_time + vectorized_time
+    print(f"Legacy iterrows loop: {legacy_time:.2f}s for {len(legacy_shots)} shots (~{legacy_season:.1f}s per season, extrapolated)")
+    print(f"Shift index build:    {index_time:.2f}s")
+    print(f"Vectorized attribution: {vectorized_time:.2f}s")
+    print(f"Speedup: {legacy_season / new_total:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
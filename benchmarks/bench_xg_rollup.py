@@ -0,0 +1,150 @@
+"""
+Benchmark player xG% over the shot_on_ice bridge against the player_game_xg rollup.
+
+Builds a synthetic league in SQLite (shots_data, shot_on_ice and bio_info for a number of
+seasons), rolls it up into player_game_xg, then times the last-n-games and date-range
+player statements both ways for a sample of players and checks they agree.
+
+Usage:
+    python benchmarks/bench_xg_rollup.py --seasons 3 --lookups 200
+    python benchmarks/bench_xg_rollup.py --games 400 --db /tmp/xg_bench.sqlite
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from stat_hardcode import xg_percent
+from utils.player_game_xg import write_player_game_xg
+from utils.query_catalog import CATALOG
+from utils.shot_on_ice import write_shot_on_ice
+
+TEAMS = 32
+SKATERS_PER_TEAM = 20
+
+
+def make_league(seasons, games, shots_per_game=60, seed=2024):
+    rng = random.Random(seed)
+    shots, on_ice = [], []
+    for season in range(2024 - seasons + 1, 2025):
+        opening = date(season, 10, 1)
+        for game in range(games):
+            nhl_game_id = season * 1_000_000 + 20_000 + game + 1
+            home, away = rng.sample(range(TEAMS), 2)
+            game_date = (opening + timedelta(days=game * 180 // games)).isoformat()
+            for shot_id in range(shots_per_game):
+                shooting, opposing = (home, away) if rng.random() < 0.5 else (away, home)
+                home_skaters, away_skaters = (5, 5) if rng.random() < 0.8 else rng.choice([(5, 4), (4, 5), (6, 5)])
+                shots.append((shot_id, nhl_game_id, season, game_date, rng.random() * 0.3,
+                              int(rng.random() < 0.08), home_skaters, away_skaters))
+                for team, side in ((shooting, 'shooting'), (opposing, 'opposing')):
+                    for player in rng.sample(range(SKATERS_PER_TEAM), 5):
+                        on_ice.append((shot_id, nhl_game_id, team * 100 + player, side))
+    shots_df = pd.DataFrame(shots, columns=['shotID', 'nhl_game_id', 'season', 'gameDate', 'xGoal', 'goal',
+                                            'homeSkatersOnIce', 'awaySkatersOnIce'])
+    on_ice_df = pd.DataFrame(on_ice, columns=['shotID', 'nhl_game_id', 'playerId', 'side'])
+    bio_info = pd.DataFrame([(team * 100 + player, f"Player{team * 100 + player:04d} Team{team}")
+                             for team in range(TEAMS) for player in range(SKATERS_PER_TEAM)],
+                            columns=['playerId', 'name'])
+    return shots_df, on_ice_df, bio_info
+
+
+def build(engine, shots_df, on_ice_df, bio_info):
+    shots_df.to_sql('shots_data', engine, index=False, chunksize=50_000)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE UNIQUE INDEX idx_shots_pk ON shots_data (nhl_game_id, shotID)")
+    bio_info.to_sql('bio_info', engine, index=False)
+    write_shot_on_ice(engine, on_ice_df)
+    started = time.perf_counter()
+    rows = write_player_game_xg(engine, shots_df['nhl_game_id'].unique())
+    return rows, time.perf_counter() - started
+
+
+def run(connection, name, params):
+    cursor = connection.cursor()
+    cursor.execute(CATALOG[name].replace('%s', '?'), params)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def bridge(connection, name, params):
+    xgoals = {row['side']: row['xGoals'] or 0.0 for row in run(connection, name, params)}
+    return xgoals.get('shooting', 0.0), xgoals.get('opposing', 0.0)
+
+
+def rollup(connection, name, params):
+    row = run(connection, name, params)[0]
+    return row['xGF'] or 0.0, row['xGA'] or 0.0
+
+
+def timed(calls):
+    latencies, results = [], []
+    for call in calls:
+        started = time.perf_counter()
+        results.append(call())
+        latencies.append(time.perf_counter() - started)
+    return results, latencies
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"  {label:<8} median {statistics.median(ordered) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+    return statistics.median(ordered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seasons', type=int, default=3, help='Seasons in the synthetic league')
+    parser.add_argument('--games', type=int, default=1312, help='Games per season')
+    parser.add_argument('--lookups', type=int, default=200, help='Players to look up per query shape')
+    parser.add_argument('--db', default=':memory:', help='SQLite file to build into (default in memory)')
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    shots_df, on_ice_df, bio_info = make_league(args.seasons, args.games)
+    print(f"Synthetic league: {args.seasons} seasons, {shots_df['nhl_game_id'].nunique()} games, "
+          f"{len(shots_df)} shots, {len(on_ice_df)} bridge rows")
+    rows, rollup_time = build(engine, shots_df, on_ice_df, bio_info)
+    print(f"Rolled up {rows} player_game_xg rows in {rollup_time:.2f}s")
+
+    rng = random.Random(7)
+    players = rng.choices(list(bio_info.itertuples(index=False)), k=args.lookups)
+    season_start, season_end = f"{shots_df['season'].max()}-10-01", shots_df['gameDate'].max()
+    # Shape: (bridge statements, bridge params, rollup statements, rollup params) for a (playerId, name)
+    shapes = {
+        'last 20 games': lambda player_id, name: (
+            xg_percent.PLAYER_NGAMES, [f"%{name}%", f"%{name}%", 20],
+            xg_percent.PLAYER_ROLLUP_NGAMES, [player_id, player_id, 20]),
+        'one season': lambda player_id, name: (
+            xg_percent.PLAYER_DATES, [f"%{name}%", season_start, season_end],
+            xg_percent.PLAYER_ROLLUP_DATES, [player_id, season_start, season_end]),
+    }
+
+    raw = engine.raw_connection()
+    for shape, statements in shapes.items():
+        for situation, key in xg_percent.SITUATIONS.items():
+            calls = [statements(player.playerId, player.name) for player in players]
+            print(f"{shape}, {situation}:")
+            bridge_results, bridge_latencies = timed(
+                lambda call=call: bridge(raw, call[0][key], call[1]) for call in calls)
+            rollup_results, rollup_latencies = timed(
+                lambda call=call: rollup(raw, call[2][key], call[3]) for call in calls)
+            for expected, actual in zip(bridge_results, rollup_results):
+                assert all(abs(a - b) < 1e-9 for a, b in zip(expected, actual)), "Rollup disagrees with the bridge"
+            before = report('bridge', bridge_latencies)
+            after = report('rollup', rollup_latencies)
+            print(f"  speedup  {before / after:.0f}x")
+    raw.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,7 @@ from stat_hardcode.game_information import game_information
 from stat_hardcode.team_record import team_record
 from figure_generation.player_cards import fetch_player_card
 from chains.single_games import get_single_game_chain
+from utils.query_metrics import instrument_tool
 
 class goal_map_scatter_schema(BaseModel):
     conditions : str = Field(title="Conditions", description="""The conditions to filter the data by. This should be a natural language description of the data for the scatterplot. This should include information like the team, player, home or away, ect.
@@ -412,6 +413,8 @@ def get_agent(db, rules_db, cba_db, llm):
             Anything that is about things happening in a single game should invoke this tool. If any query asks about a player has done _ in a game, or in a single game, ect. Invoke this tool."""
         )
     ]
+    # Queries each tool runs are timed under its name in QUERY_METRICS
+    tools = [instrument_tool(tool) for tool in tools]
     
     # Pull the prompt template from the hub
     prompt = hub.pull("hwchase17/openai-tools-agent")
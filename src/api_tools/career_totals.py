@@ -1,5 +1,5 @@
 import requests
-from utils.database_init import run_query_mysql
+from utils import query_catalog
 
 def get_nhl_player_career_stats(db, player_name):
     player_id = find_player_id(db, player_name)
@@ -30,13 +30,5 @@ def get_nhl_player_career_stats(db, player_name):
 
 
 def find_player_id(db, player_name):
-    query = f"""SELECT playerId FROM bio_info WHERE name LIKE '%{player_name}%'
-            """
-    print(query)
-    result = run_query_mysql(query, db)
-    
-    if result and isinstance(result, list) and isinstance(result[0], dict):
-        return result[0].get("playerId")
-    
-    return None
+    return query_catalog.find_player_id(db, player_name)
 
@@ -5,6 +5,8 @@ import os
 import argparse
 from agent.agent_main import get_agent
 from utils.database_init import init_db, init_vector_db
+from utils.schema_registry import schema_registry
+from utils.query_metrics import serve_metrics
 import matplotlib.pyplot as plt
 from langchain_openai import ChatOpenAI
 
@@ -32,12 +34,27 @@ def get_secrets_or_env(remote):
         open_ai_key = os.getenv("OPENAI_API_KEY")
     return MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, open_ai_key
 
+@st.cache_resource
+def get_db_pool(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE):
+    # One connection pool per server process, shared by every session and rerun
+    db = init_db(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE)
+    # Table schemas for the SQL chain prompts, loaded (or read from the snapshot) once at startup
+    schema_registry(db)
+    return db
+
+@st.cache_resource
+def start_metrics_server():
+    # Query latency histograms at http://127.0.0.1:$QUERY_METRICS_PORT/metrics, once per server process
+    port = os.getenv("QUERY_METRICS_PORT")
+    return serve_metrics(int(port)) if port else None
+
 if "database" not in st.session_state:
     # args = parser.parse_args()
     # TODO: remote to true before pushing on this branch
     MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, open_ai_key = get_secrets_or_env(remote=True)
     
-    db = init_db(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE)
+    db = get_db_pool(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE)
+    start_metrics_server()
     rules_db = init_vector_db('rules', open_ai_key)
     cba_db = init_vector_db('cba', open_ai_key)
 
@@ -6,7 +6,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain.globals import set_verbose
-from utils.database_init import get_table_info, run_query_mysql, init_db
+from utils.database_init import run_query_mysql, init_db
+from utils.schema_registry import schema_prompt
 
 # Load environment variables
 load_dotenv()
@@ -18,7 +19,7 @@ def run_query(query, db):
 
 def get_table_schema(db):
         relevent_tables = ['BIO_Info']
-        return get_table_info(db, relevent_tables) #return the schema of the first table in the list
+        return schema_prompt(db, relevent_tables)  # loaded once per schema version, see utils.schema_registry
 
 def get_bio_chain(db, llm):
 
@@ -6,6 +6,7 @@ from langchain_openai import ChatOpenAI
 from openai import OpenAI 
 from datetime import date
 from utils.database_init import init_db, run_query_mysql
+from utils.sql_governor import governed_shot_frame, run_generated
 
 load_dotenv()
 
@@ -19,8 +20,7 @@ def get_date_data_from_table(db, sql_chain, natural_language_query, today_date):
         template_for_sql_query = f"""Please return a list of shots from the shots_data table that contains only the columns and rows relavent to the query: {natural_language_query}.
         Allways add a condition for the dates of the shots, use the natural language query to determine this. Again return only the needed columns. Also note for context today's date is {today_date}"""
         print(template_for_sql_query)
-        query = sql_chain.invoke({"question" : template_for_sql_query})
-        shot_data = pd.DataFrame(run_query_mysql(query, db))
+        query, shot_data = run_generated(sql_chain, {"question" : template_for_sql_query}, db, governed_shot_frame)
         #print(shot_data.head(5))
         if shot_data.empty:
             raise ValueError("There was an error with the query. Please try again with a different query.")
@@ -31,8 +31,7 @@ def get_ngame_data(db, sql_chain, natural_language_query):
     This should be a query asking for a stat over the last _ number of games. Or between game numbers for a team. Use the fact that the greater the nhl_game_id value, the more recent the game was.
     When somone refers to a game number though, they mean within a certain season value"""
     print(template_for_sql_query)
-    query = sql_chain.invoke({"question" : template_for_sql_query})
-    shot_data = pd.DataFrame(run_query_mysql(query, db))
+    query, shot_data = run_generated(sql_chain, {"question" : template_for_sql_query}, db, governed_shot_frame)
     #shot_data.to_csv('testingNGame.csv')
     if shot_data.empty:
         raise ValueError("There was an error with the query. Please try again with a different query.")
@@ -6,7 +6,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain.globals import set_verbose
-from utils.database_init import get_table_info, run_query_mysql, init_db
+from utils.database_init import run_query_mysql, init_db
+from utils.schema_registry import schema_prompt
+from utils.sql_governor import run_generated_rows
 import os
 import mysql.connector
 
@@ -25,7 +27,7 @@ import mysql.connector
 def single_game_sql(db, llm):
     def get_table_schema(db):
         relevent_tables = ['shots_data']
-        return get_table_info(db, relevent_tables) #return the schema of the first table in the list
+        return schema_prompt(db, relevent_tables)  # loaded once per schema version, see utils.schema_registry
 
     template = """
                 Based on the table schema below, generate a valid SQL query that answers the user's question. 
@@ -157,30 +159,9 @@ def single_game_sql(db, llm):
 
 
 def get_single_game_chain(db, llm):
-    def run_query(query, db):
-        try:
-            cursor = db.cursor(dictionary=True, buffered= True)  # Use dictionary=True to get results as dictionaries
-            cursor.execute(query)
-            result = cursor.fetchall() 
-            cursor.close()
-
-            if result:
-                    print(result)
-                    return result
-            else:
-                    print("No data found")
-                    return None
-        except mysql.connector.Error as err:
-            print(f"Error: {err}")
-            return None
-        except Exception as ex:
-            print(f"Unexpected Error: {ex}")
-            return None
-
-    
     def get_table_schema(db):
         relevent_tables = ['shots_data']
-        return get_table_info(db, relevent_tables) #return the schema of the first table in the list
+        return schema_prompt(db, relevent_tables)  # loaded once per schema version, see utils.schema_registry
 
 
     sql_chain = single_game_sql(db, llm)
@@ -203,7 +184,10 @@ def get_single_game_chain(db, llm):
     prompt = ChatPromptTemplate.from_template(template)
 
     full_chain = (
-        RunnablePassthrough.assign(query = sql_chain).assign(schema = lambda _: get_table_schema(db)).assign(response=lambda variables: run_query(variables["query"], db))
+        # The generated query runs behind the SQL governor; a rejected query goes back to sql_chain once
+        RunnablePassthrough.assign(generated=lambda variables: run_generated_rows(sql_chain, variables, db))
+        .assign(query=lambda variables: variables["generated"][0], response=lambda variables: variables["generated"][1])
+        .assign(schema = lambda _: get_table_schema(db))
         | prompt
         | llm
         | StrOutputParser()
@@ -6,7 +6,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain.globals import set_verbose
-from utils.database_init import get_table_info, run_query_mysql
+from utils.database_init import run_query_mysql
+from utils.schema_registry import schema_prompt
+from utils.sql_governor import run_generated_rows
 
 
 set_verbose(True)
@@ -25,8 +27,8 @@ def get_sql_chain(db, llm):
 
     #database functions. Get information from the databases to be used in the chain
     def get_table_schema(db):
-        relevent_tables = ['SkaterStats_regular_2024', 'GoalieStats_regular_2024', 'LineStats_playoffs_2024', 'PairStats_regular_2024', 'teamstats_regular_2024']
-        return get_table_info(db, relevent_tables) #return the schema of the first table in the list
+        relevent_tables = ['skater_stats', 'goalie_stats', 'line_stats', 'pair_stats', 'team_stats']
+        return schema_prompt(db, relevent_tables)  # loaded once per schema version, see utils.schema_registry
 
     #print(run_query("SELECT * FROM RegularSeason2023 LIMIT 1")) # Test the database connection
 
@@ -36,10 +38,12 @@ def get_sql_chain(db, llm):
     DO NOT include explanations, comments, code blocks, or duplicate queries. Return only a single SQL query. DO NOT include ```sql or ``` in the response.
     {schema}
    
-    For skaters, lines, pairs, teams, and goalies there is a table for regular season and playoffs in each year. Table names are using the following format:
-    - Regular season → <playerType>Stats_regular_<year> 
-    - Playoffs → <PlayerType>Stats_playoffs_<year>
-    where player type refers to whether the player is a skater, goalie, pairing, line, or team. 
+    For skaters, goalies, lines, pairs, and teams there is one table holding every season: skater_stats, goalie_stats, line_stats, pair_stats, and team_stats.
+    Each row has a 'season' column (the first year of the season) and a 'season_type' column:
+    - Regular season → season_type = 'regular'
+    - Playoffs → season_type = 'playoffs'
+    ALWAYS filter on season and season_type. For a range of seasons use one query with season BETWEEN <first> AND <last>, never a UNION of seasons.
+    For example, goals by a skater in the 2023 playoffs: SELECT I_F_goals FROM skater_stats WHERE name = '<name>' AND season = 2023 AND season_type = 'playoffs' AND situation = 'all'
 
     Shots_data contains information on every shot taken in the NHL since 2015. More detail about how to query this table is provided below.
 
@@ -53,13 +57,13 @@ def get_sql_chain(db, llm):
     For example if someone asks "Who leads the NHL in Goals" this would be the same as "who lead the NHL in goals in the 2024-25 season"
     If someone does not specify the season type assume the season is regular.
 
-    If someone asks what 'pair', 'defensive pairing', 'd pair', or 'pairing' they mean defensive pairing from the PairStats_regular_<year> or PairStats_playoffs_<year> tables.
-    If someone asks what 'line' or 'forward line'  they mean forward line from the lineStats_regular_<year> or lineStats_playoffs_<year> tables.
+    If someone asks what 'pair', 'defensive pairing', 'd pair', or 'pairing' they mean defensive pairing from the pair_stats table.
+    If someone asks what 'line' or 'forward line'  they mean forward line from the line_stats table.
     pairs and lines contain multiple names that are stored in a hyphonated way like, name1-name2-name3 or just name1-name2. To account for different orders being inputed, use: 
     WHERE name LIKE '%name1%' AND name LIKE '%name2%' AND name LIKE '%name3%'; This is the way to find the line since the names may be in different orders.
 
     The current season is the 2024-25 season. Use this season for current stats. When no season is provided or it is unclear what season is being refered to, Use 2024. 
-    If someone asks, 'what pair leads the NHL in expected goals percentage with at least 50 minutes played" Then this means to query the PairStats_regular_2024 and find the highest expected goals percentage with at least 50 minutes played.
+    If someone asks, 'what pair leads the NHL in expected goals percentage with at least 50 minutes played" Then this means to query pair_stats where season = 2024 and season_type = 'regular' and find the highest expected goals percentage with at least 50 minutes played.
     
     Use correct stat terms:
     - "Even strength" → "5on5", "Power play" → "5on4", "Shorthanded" → "4on5", "All situations" → "All". If strength is not defined use 'all' Do not add the total of multiple strengths together.
@@ -73,7 +77,7 @@ def get_sql_chain(db, llm):
     Grouping: Forwards = (C, L, R), Skaters = (C, L, R, D).  
 
     Someone May request stats from a range of seasons like 'How many goals did Connor Mcdavid score from the 2018-19 season to the 2022-23 season' This means query the db and find the total for Every season in between those two inclusive. 
-    In that example then, you would query for the total goals in the 2018, 2019, 2020, 2021, and 2022 seasons.
+    In that example then, you would query for the total goals with season BETWEEN 2018 AND 2022 in a single query with SUM.
 
     When the user requests a total allways use the 'all' situation for the player do not add these up.
     For example, if someone were to ask how many games played a player had in a season, use only the result in 'all' DO NOT ADD THEM with others.
@@ -118,7 +122,7 @@ def get_sql_chain(db, llm):
     Reminder that this column is stored in seconds. Convert a minumum number of minutes to seconds by multiplying by 60. Use this for the SQL query.
 
     If someone asks for a top _ in a stat, return the highest _ number in that stat. 
-    For example the top 10 lines in expected goals percentage. This means return the top 10 lines from linestats_regular_2024 in expected goals percentage.
+    For example the top 10 lines in expected goals percentage. This means return the top 10 lines from line_stats where season = 2024 and season_type = 'regular' in expected goals percentage.
     
     This is the same for defensive pairings. For example if someone asks for the expected goals percentage of the makar toews pairing, this should be interperated as the makar-toews pairing.
     Despite adding the dashes, keep the order of the names the same. So for the line example that would be Knies-Matthews-Marner or for the pairs example Makar-Toews
@@ -134,7 +138,7 @@ def get_sql_chain(db, llm):
 
     For example if someone asks, Where does knies matthews marner rank for forward lines in expected goals percentage? the SQL query should be:
 
-    'SELECT `rank`, xGoalsPercentage FROM (SELECT name, RANK() OVER (ORDER BY xGoalsPercentage DESC) AS `rank`, xGoalsPercentage FROM LineStats_regular_2024) AS ranked_data WHERE name LIKE '%Knies%' AND name LIKE '%Matthews%' AND name LIKE '%Marner%';
+    'SELECT `rank`, xGoalsPercentage FROM (SELECT name, RANK() OVER (ORDER BY xGoalsPercentage DESC) AS `rank`, xGoalsPercentage FROM line_stats WHERE season = 2024 AND season_type = 'regular') AS ranked_data WHERE name LIKE '%Knies%' AND name LIKE '%Matthews%' AND name LIKE '%Marner%';
 
     If someone requests where a skater, line, pairing, or team ranks among _. This is asking for where they are in a list sorted by the stat they are asking for, where all the things in the list meet a certain condition. For example:
     Where does Makar-Toews rank in expected goals percentage among defense pairs with at least 150 minutes. Means where in the list of pairs with over 150 minutes do they rank in expected goals perecentage. 
@@ -201,7 +205,7 @@ def get_sql_chain(db, llm):
     Use shots_data if the user requests a a list of gameIDs given a condition about a player, or very specific information like where the Montreal Canadians scored in the second period ect. Use game_logs for TEAM level information that is about the entire game. 
 
     If a user requests a player 5 on 5 expected goals percentage you are returning the onIce_xGoalsPercentage where situation is 5on5 and the name is the player name.
-    This means if a user asks for this value in the _playoffs or _regular season look in the right table and return that value.
+    This means if a user asks for this value in the playoffs or regular season filter on the right season_type and return that value.
 
     When someone asks who leads a statistic sort by the statistic and give the number one response.
 
@@ -241,13 +245,10 @@ def get_sql_chain(db, llm):
     return sql_chain
 
 def get_chain(db, llm):
-    def run_query(query, db):
-        return run_query_mysql(query, db)
-    
     #database functions. Get information from the databases to be used in the chain
     def get_table_schema(db):
-        relevent_tables = ['SkaterStats_regular_2024', 'GoalieStats_regular_2024', 'LineStats_playoffs_2024', 'PairStats_regular_2024', 'teamstats_regular_2024']
-        return get_table_info(db, relevent_tables) #return the schema of the first table in the list
+        relevent_tables = ['skater_stats', 'goalie_stats', 'line_stats', 'pair_stats', 'team_stats']
+        return schema_prompt(db, relevent_tables)  # loaded once per schema version, see utils.schema_registry
 
 
     sql_chain = get_sql_chain(db, llm)
@@ -274,7 +275,10 @@ def get_chain(db, llm):
     prompt = ChatPromptTemplate.from_template(template)
 
     full_chain = (
-        RunnablePassthrough.assign(query = sql_chain).assign(schema = lambda _: get_table_schema(db)).assign(response=lambda variables: run_query(variables["query"], db))
+        # The generated query runs behind the SQL governor; a rejected query goes back to sql_chain once
+        RunnablePassthrough.assign(generated=lambda variables: run_generated_rows(sql_chain, variables, db))
+        .assign(query=lambda variables: variables["generated"][0], response=lambda variables: variables["generated"][1])
+        .assign(schema = lambda _: get_table_schema(db))
         | prompt
         | llm
         | StrOutputParser()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from datetime import date, datetime
+from utils import query_catalog
 from utils.database_init import run_query_mysql, init_db
 import requests
 from dotenv import load_dotenv
@@ -43,15 +44,7 @@ def load_image_from_url(url):
 # open_ai_key = os.getenv("OPENAI_API_KEY")
 
 def find_player_id(db, player_name):
-    query = f"""SELECT playerId FROM bio_info WHERE name LIKE '%{player_name}%'
-            """
-    print(query)
-    result = run_query_mysql(query, db)
-    
-    if result and isinstance(result, list) and isinstance(result[0], dict):
-        return result[0].get("playerId")
-    
-    return None
+    return query_catalog.find_player_id(db, player_name)
 
 
 # Define a function to get the color based on the percentile
@@ -64,14 +57,31 @@ def get_box_color(percentile):
     else:
         return mcolors.to_rgba(f'#ff{int(abs(((percentile)/50) * 255)):02x}00')
 
-def get_basic_stats_query(situation, player_name, season_value):
-   return f"""
-                SELECT GAMES_PLAYED, ICETIME, onIce_xGoalsPercentage, offIce_xGoalsPercentage, onIce_corsiPercentage, 
+def get_career_stats_query(season_count):
+   """Catalog statement for one player's basic stats over season_count seasons; binds playerId, then the seasons."""
+   return query_catalog.register(f'career_stats_{season_count}', f"""
+                SELECT season, situation, GAMES_PLAYED, ICETIME, onIce_xGoalsPercentage, offIce_xGoalsPercentage, onIce_corsiPercentage, 
                 offIce_corsiPercentage,I_F_xGoals, I_F_primaryAssists, I_F_shotsOnGoal, I_F_points, I_F_goals, I_F_penalityMinutes, I_F_takeaways, I_F_giveaways, 
                 I_F_lowDangerShots, I_F_mediumDangerShots, I_F_highDangerShots, OnIce_F_xGoals, OnIce_F_goals, OnIce_A_xGoals, OnIce_A_goals, OffIce_F_xGoals, OffIce_A_xGoals, I_F_hits, shotsBlockedByPlayer
-                FROM skaterstats_regular_{season_value} 
-                WHERE name = '{player_name}' AND SITUATION = '{situation}'
-                """
+                FROM skater_stats
+                WHERE playerId = %s AND season_type = 'regular' AND situation IN ('5on5', 'all')
+                AND season IN ({query_catalog.in_placeholders(season_count)})
+                """)
+
+def fetch_career_stats(db, player_id, seasons):
+    """
+    Basic stats for every season in one query on the skater_stats lookup index.
+    Returns (season, situation) -> [row], the shape run_query_mysql gave per season and situation.
+    """
+    career = {}
+    seasons = [int(season_value) for season_value in seasons]
+    if player_id is None or not seasons:
+        return career
+    statement = get_career_stats_query(len(seasons))
+    for row in query_catalog.run_statement(db, statement, [int(player_id)] + seasons) or []:
+        key = (int(row.pop('season')), row.pop('situation'))
+        career[key] = [row]
+    return career
 
 def get_percentile_query(db_connection, situation, player_name, season_value):
     query =  f"""
@@ -83,8 +93,8 @@ def get_percentile_query(db_connection, situation, player_name, season_value):
                         I_F_penalityMinutes, I_F_takeaways, I_F_giveaways, I_F_lowDangerShots, I_F_mediumDangerShots, 
                         I_F_highDangerShots, OnIce_F_xGoals, OnIce_F_goals, OnIce_A_xGoals, OnIce_A_goals, OffIce_F_xGoals, 
                         OffIce_A_xGoals, I_F_hits, shotsBlockedByPlayer, position
-                    FROM skaterstats_regular_{season_value}
-                    WHERE SITUATION = '{situation}'AND ICETIME IS NOT NULL AND ICETIME > 150
+                    FROM skater_stats
+                    WHERE season = {int(season_value)} AND season_type = 'regular' AND SITUATION = '{situation}'AND ICETIME IS NOT NULL AND ICETIME > 150
                 ),
                 all_players_stats AS (
                     SELECT 
@@ -93,8 +103,8 @@ def get_percentile_query(db_connection, situation, player_name, season_value):
                         I_F_penalityMinutes, I_F_takeaways, I_F_giveaways, I_F_lowDangerShots, I_F_mediumDangerShots, 
                         I_F_highDangerShots, OnIce_F_xGoals, OnIce_F_goals, OnIce_A_xGoals, OnIce_A_goals, OffIce_F_xGoals, 
                         OffIce_A_xGoals, I_F_hits, shotsBlockedByPlayer, position
-                    FROM skaterstats_regular_{season_value}
-                    WHERE SITUATION = '{situation}' AND ICETIME IS NOT NULL AND ICETIME > 150
+                    FROM skater_stats
+                    WHERE season = {int(season_value)} AND season_type = 'regular' AND SITUATION = '{situation}' AND ICETIME IS NOT NULL AND ICETIME > 150
                 ),
                 player_data AS (
                     SELECT 
@@ -125,51 +135,59 @@ def get_percentile_query(db_connection, situation, player_name, season_value):
                         ROW_NUMBER() OVER (PARTITION BY ps.position_group  ORDER BY (ps.I_F_highDangerShots/ps.ICETIME) DESC) AS highDangerShots_per_60_rank,
                         ROW_NUMBER() OVER (PARTITION BY ps.position_group  ORDER BY (ps.I_F_takeaways/ps.ICETIME) DESC) AS takeaways_per_60_rank,
                         ROW_NUMBER() OVER (PARTITION BY ps.position_group  ORDER BY (ps.I_F_xGoals/ps.ICETIME) DESC) AS I_F_xGoals_per_60_rank,
-                        ROW_NUMBER() OVER (PARTITION BY ps.position_group  ORDER BY (ps.I_F_shotsOnGoal/ps.ICETIME) DESC) AS shotsOnGoal_per_60_rank
+                        ROW_NUMBER() OVER (PARTITION BY ps.position_group  ORDER BY (ps.I_F_shotsOnGoal/ps.ICETIME) DESC) AS shotsOnGoal_per_60_rank,
+                        COUNT(onIce_xGoalsPercentage) OVER () AS onIce_xGoalsPercentage_count,
+                        COUNT(((I_F_goals / ICETIME) * 3600)) OVER (PARTITION BY ps.position_group) AS goals_per_60_count,
+                        COUNT(((I_F_points / ICETIME) * 3600)) OVER (PARTITION BY ps.position_group) AS points_per_60_count,
+                        COUNT(I_F_primaryAssists) OVER (PARTITION BY ps.position_group) AS primary_assists_per_60_count,
+                        COUNT((OnIce_F_xGoals / ICETIME)) OVER () AS OnIce_F_xGoals_per_60_count,
+                        COUNT((OnIce_A_xGoals / ICETIME)) OVER () AS OnIce_A_xGoals_per_60_count,
+                        COUNT(((OnIce_F_xGoals / ICETIME) - (OffIce_F_xGoals / ((GAMES_PLAYED * 3600) - ICETIME)))) OVER () AS Offense_impact_count,
+                        COUNT(((OnIce_A_xGoals / ICETIME) - (OffIce_A_xGoals / ((GAMES_PLAYED * 3600) - ICETIME)))) OVER () AS Defense_impact_count,
+                        COUNT(((I_F_goals / I_F_shotsOnGoal) * 100)) OVER (PARTITION BY ps.position_group) AS shooting_percentage_count,
+                        COUNT((I_F_goals / I_F_xGoals)) OVER (PARTITION BY ps.position_group) AS goals_per_xg_count,
+                        COUNT(I_F_points) OVER (PARTITION BY ps.position_group) AS assists_per_60_count,
+                        COUNT(I_F_hits) OVER (PARTITION BY ps.position_group) AS hits_per_60_count,
+                        COUNT(shotsBlockedByPlayer) OVER (PARTITION BY ps.position_group) AS shotsBlockedByPlayer_per_60_count,
+                        COUNT(I_F_highDangerShots) OVER (PARTITION BY ps.position_group) AS highDangerShots_per_60_count,
+                        COUNT(I_F_takeaways) OVER (PARTITION BY ps.position_group) AS takeaways_per_60_count,
+                        COUNT(I_F_xGoals) OVER (PARTITION BY ps.position_group) AS I_F_xGoals_per_60_count,
+                        COUNT(I_F_shotsOnGoal) OVER (PARTITION BY ps.position_group) AS shotsOnGoal_per_60_count
                     FROM player_data ps
                 )
                 SELECT 
                     pr.name,
-                    (100 - (pr.onIce_xGoalsPercentage_rank / (SELECT COUNT(*) FROM player_data pd WHERE onIce_xGoalsPercentage IS NOT NULL AND ICETIME > 150) * 100)) AS onIce_xGoalsPercentage_percentile,
-                    (100 - (pr.goals_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND ((I_F_goals / ICETIME) * 3600) IS NOT NULL AND ICETIME > 150) * 100)) AS goals_per_60_percentile,
-                    (100 - (pr.points_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND ((I_F_points / ICETIME) * 3600) IS NOT NULL AND ICETIME > 150) * 100)) AS points_per_60_percentile,
-                    (100 - (pr.primary_assists_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_primaryAssists IS NOT NULL AND ICETIME > 150) * 100)) AS primary_assists_per_60_percentile,
-                    (100 - (pr.OnIce_F_xGoals_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE (OnIce_F_xGoals / ICETIME) IS NOT NULL AND ICETIME > 150) * 100)) AS OnIce_F_xGoals_per_60_percentile,
-                    (100 - (pr.OnIce_A_xGoals_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE (OnIce_A_xGoals / ICETIME) IS NOT NULL AND ICETIME > 150) * 100)) AS OnIce_A_xGoals_per_60_percentile,
-                    (100 - (pr.Offense_impact_rank / (SELECT COUNT(*) FROM player_data pd WHERE ((OnIce_F_xGoals / ICETIME) - (OffIce_F_xGoals / ((GAMES_PLAYED * 3600) - ICETIME))) IS NOT NULL AND ICETIME > 150) * 100)) AS Offense_impact_percentile,
-                    (100 - (pr.Defense_impact_rank / (SELECT COUNT(*) FROM player_data pd WHERE ((OnIce_A_xGoals / ICETIME) - (OffIce_A_xGoals / ((GAMES_PLAYED * 3600) - ICETIME))) IS NOT NULL AND ICETIME > 150) * 100)) AS Defense_impact_percentile,
-                    (100 - (pr.shooting_percentage_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND ((I_F_goals / I_F_shotsOnGoal) * 100) IS NOT NULL AND ICETIME > 150) * 100)) AS shooting_percentage_percentile,
-                    (100 - (pr.goals_per_xg_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND (I_F_goals / I_F_xGoals) IS NOT NULL AND ICETIME > 150) * 100)) AS goals_per_xg_percentile,
-                    (100 - (pr.assists_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_points IS NOT NULL AND ICETIME > 150) * 100)) AS assists_per_60_percentile,
-                    (100 - (pr.hits_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_hits IS NOT NULL AND ICETIME > 150) * 100)) AS hits_per_60_percentile,
-                    (100 - (pr.shotsBlockedByPlayer_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND shotsBlockedByPlayer IS NOT NULL AND ICETIME > 150) * 100)) AS shotsBlockedByPlayer_per_60_percentile,
-                    (100 - (pr.highDangerShots_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_highDangerShots IS NOT NULL AND ICETIME > 150) * 100)) AS highDangerShots_per_60_percentile,
-                    (100 - (pr.takeaways_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_takeaways IS NOT NULL AND ICETIME > 150) * 100)) AS takeaways_per_60_percentile,
-                    (100 - (pr.I_F_xGoals_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_xGoals IS NOT NULL AND ICETIME > 150) * 100)) AS I_F_xGoals_per_60_percentile,
-                    (100 - (pr.shotsOnGoal_per_60_rank / (SELECT COUNT(*) FROM player_data pd WHERE pd.position_group = pr.position_group AND I_F_shotsOnGoal IS NOT NULL AND ICETIME > 150) * 100)) AS shotsOnGoal_per_60_percentile
+                    (100 - (pr.onIce_xGoalsPercentage_rank / pr.onIce_xGoalsPercentage_count * 100)) AS onIce_xGoalsPercentage_percentile,
+                    (100 - (pr.goals_per_60_rank / pr.goals_per_60_count * 100)) AS goals_per_60_percentile,
+                    (100 - (pr.points_per_60_rank / pr.points_per_60_count * 100)) AS points_per_60_percentile,
+                    (100 - (pr.primary_assists_per_60_rank / pr.primary_assists_per_60_count * 100)) AS primary_assists_per_60_percentile,
+                    (100 - (pr.OnIce_F_xGoals_per_60_rank / pr.OnIce_F_xGoals_per_60_count * 100)) AS OnIce_F_xGoals_per_60_percentile,
+                    (100 - (pr.OnIce_A_xGoals_per_60_rank / pr.OnIce_A_xGoals_per_60_count * 100)) AS OnIce_A_xGoals_per_60_percentile,
+                    (100 - (pr.Offense_impact_rank / pr.Offense_impact_count * 100)) AS Offense_impact_percentile,
+                    (100 - (pr.Defense_impact_rank / pr.Defense_impact_count * 100)) AS Defense_impact_percentile,
+                    (100 - (pr.shooting_percentage_rank / pr.shooting_percentage_count * 100)) AS shooting_percentage_percentile,
+                    (100 - (pr.goals_per_xg_rank / pr.goals_per_xg_count * 100)) AS goals_per_xg_percentile,
+                    (100 - (pr.assists_per_60_rank / pr.assists_per_60_count * 100)) AS assists_per_60_percentile,
+                    (100 - (pr.hits_per_60_rank / pr.hits_per_60_count * 100)) AS hits_per_60_percentile,
+                    (100 - (pr.shotsBlockedByPlayer_per_60_rank / pr.shotsBlockedByPlayer_per_60_count * 100)) AS shotsBlockedByPlayer_per_60_percentile,
+                    (100 - (pr.highDangerShots_per_60_rank / pr.highDangerShots_per_60_count * 100)) AS highDangerShots_per_60_percentile,
+                    (100 - (pr.takeaways_per_60_rank / pr.takeaways_per_60_count * 100)) AS takeaways_per_60_percentile,
+                    (100 - (pr.I_F_xGoals_per_60_rank / pr.I_F_xGoals_per_60_count * 100)) AS I_F_xGoals_per_60_percentile,
+                    (100 - (pr.shotsOnGoal_per_60_rank / pr.shotsOnGoal_per_60_count * 100)) AS shotsOnGoal_per_60_percentile
                 FROM player_rank pr
-                WHERE pr.name = '{player_name}'
                 """
     #print(query)
-    try:
-        cursor = db_connection.cursor(dictionary=True)  # Use dictionary=True to get results as dictionaries
-        cursor.execute(query)
-        result = cursor.fetchone()  # Use fetchone() since we expect only a single row as output
-        cursor.close()
-
-        if result:
-                #print(result)
-                return result
-        else:
-                print("No data found for the player:", player_name)
-                return None
-
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        return None
-    except Exception as ex:
-        print(f"Unexpected Error: {ex}")
+    # The ranking is the same for every player of a season, so it is read (and cached) once
+    # for all of them and each card picks its own row
+    result = run_query_mysql(query, db_connection)
+    if result is None:
         return None
+    for row in result:
+        if row['name'] == player_name:
+            #print(row)
+            return row
+    print("No data found for the player:", player_name)
+    return None
 
 
 def fetch_player_card(db, player_name, season):
@@ -210,6 +228,9 @@ def fetch_player_card(db, player_name, season):
     ev_offense_xgs = []
     valid_seasons_list = []
 
+    # One query for every season's basic stats instead of two per season
+    career = fetch_career_stats(db, player_id, season if len(season) else range(2015, 2025))
+
     if len(season) == 0:
         season_value = 2015
         for i in range(10):
@@ -218,10 +239,7 @@ def fetch_player_card(db, player_name, season):
             ev_percentile_key = f"{season_value}_ev_percentile"
             total_percentile_key = f"{season_value}_percentile"
 
-            ev_query = get_basic_stats_query("5on5", player_name, season_value)
-            total_query = get_basic_stats_query("all", player_name, season_value)
-            
-            ev_data = run_query_mysql(ev_query, db)
+            ev_data = career.get((season_value, "5on5"))
 
             # If ev_data is empty or None, increment season_value and try again
             if not ev_data:
@@ -230,7 +248,7 @@ def fetch_player_card(db, player_name, season):
 
             Basic_stats_seasons[ev_key] = ev_data
             #Basic_stats_seasons[f"'{season_value}'_ev"] = run_query_mysql(ev_query, db)
-            Basic_stats_seasons[total_key] = run_query_mysql(total_query, db)
+            Basic_stats_seasons[total_key] = career.get((season_value, "all"))
 
             percentile_seasons[ev_percentile_key] = get_percentile_query(db, "5on5", player_name, season_value)
             percentile_seasons[total_percentile_key] = get_percentile_query(db, "all", player_name, season_value)
@@ -283,12 +301,8 @@ def fetch_player_card(db, player_name, season):
             ev_percentile_key = f"{season_value}_ev_percentile"
             total_percentile_key = f"{season_value}_percentile"
             
-            ev_query = get_basic_stats_query("5on5", player_name, season_value)
-            total_query = get_basic_stats_query("all", player_name, season_value)
-
-
-            Basic_stats_seasons[ev_key] = run_query_mysql(ev_query, db)
-            Basic_stats_seasons[total_key] = run_query_mysql(total_query, db)
+            Basic_stats_seasons[ev_key] = career.get((int(season_value), "5on5"))
+            Basic_stats_seasons[total_key] = career.get((int(season_value), "all"))
 
             percentile_seasons[ev_percentile_key] = get_percentile_query(db, "5on5", player_name, season_value)
             percentile_seasons[total_percentile_key] = get_percentile_query(db, "all", player_name, season_value)
@@ -7,6 +7,7 @@ import hockey_rink.rink_feature
 hockey_rink.rink_feature.urllib = urllib  # Force the module to use correct imports
 import os
 from utils.database_init import run_query_mysql, init_db
+from utils.sql_governor import governed_shot_frame, run_generated
 from chains.stats_sql_chain import get_sql_chain
 from langchain_openai import ChatOpenAI
 from openai import OpenAI 
@@ -40,8 +41,7 @@ def extract_shot_data(db, llm, sql_chain, conditions, season_lower_bound, season
                                 Return the list of shots so they can be put into a dataframe. An example query for the player Morgan Rielly between 2020 and 2023 seasons would be: SELECT * FROM SHOTS_DATA WHERE SEASON <=2023 AND SEASON >= 2020 AND  shooterName='Morgan Rielly'. 
                                 Also note to find the team of a shot, compare home team with is_home the attribute."""
     
-    query = sql_chain.invoke({"question" : template_for_sql_query})
-    shot_data = pd.DataFrame(run_query_mysql(query, db))
+    query, shot_data = run_generated(sql_chain, {"question" : template_for_sql_query}, db, governed_shot_frame)
     if shot_data.empty:
         raise ValueError("There was an error with the query. Please try again with a different query.")
     # Filter for the player name
@@ -1,15 +1,21 @@
 import pandas as pd
 import numpy as np
 from datetime import date
-from utils.database_init import run_query_mysql
+from utils.query_catalog import in_placeholders, register, run_statement
+
+
+def game_logs_statement(game_count):
+    """Catalog statement for game_count game ids and a situation; one per IN-list length."""
+    return register(f'game_logs_{game_count}', f"""
+                SELECT * FROM game_logs WHERE gameid in ({in_placeholders(game_count)}) AND situation = %s
+            """)
 
 
 def game_information(db, situation: str, game_ids: list[int]):
-    game_ids_str = ', '.join(map(str, game_ids))  # Convert list to a comma-separated string
-    query = f"""
-                SELECT * FROM game_logs WHERE gameid in ({game_ids_str}) AND situation = '{situation}'
-            """
-    result = run_query_mysql(query, db)
+    if not game_ids:
+        return "No game data found for the given situation and game IDs."
+    params = [int(game_id) for game_id in game_ids] + [situation]
+    result = run_statement(db, game_logs_statement(len(game_ids)), params)
     if not result:  # Handle empty or None results
         return "No game data found for the given situation and game IDs."
 
@@ -1,4 +1,5 @@
-from utils.database_init import get_table_info, run_query_mysql
+from utils.database_init import get_table_info
+from utils.sql_governor import run_generated_rows
 from langchain.chains.base import Chain
 from langchain_core.output_parsers import StrOutputParser
 import json
@@ -177,9 +178,8 @@ def team_record(db, llm, query: str):
 
     # Ensure proper usage of keyword arguments in invoke
     #sql_query = llm.invoke(template).content
-    sql_query = recordFind_chain.invoke({'question': query})
+    sql_query, result = run_generated_rows(recordFind_chain, {'question': query}, db)
     print(sql_query)
-    result = run_query_mysql(sql_query, db)
     # If the result is a list (from SELECT query), you can convert it into a string
     # if isinstance(result, list):
     #     result= json.dumps(result, default=decimal_to_str, indent=4) # Converts the result list into a pretty-printed JSON string
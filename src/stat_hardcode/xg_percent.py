@@ -1,54 +1,245 @@
 import pandas as pd
 import numpy as np
 from datetime import date
-from utils.database_init import run_query_mysql
+from utils.query_catalog import player_name_pattern, register, run_statement
+from utils.player_game_xg import PLAYER_GAME_XG_TABLE
+from utils.database_init import current_data_versions
+from utils.shots_parquet import SHOTS_PARQUET_DIR, has_mirror, is_current, read_shots
+
+# Player xG% sums the player_game_xg rollup (one row per player, game and strength), a few
+# hundred rows for a whole career. Line queries, and player names matching more than one
+# player, need the shots the players shared, so they join through the shot_on_ice bridge
+# table (one row per skater on the ice for a shot) on its (playerId, nhl_game_id, side)
+# index and sum xGoal per side in SQL.
+# Team xG% reads the shots Parquet mirror (utils.shots_parquet) when it has been built,
+# and otherwise the TEAM_* statements below.
+# Every query shape is a catalog statement (see utils.query_catalog): names, teams, dates
+# and game counts are bound as parameters, so MySQL prepares each shape once.
+EVEN_STRENGTH = "s.awaySkatersOnIce = s.homeSkatersOnIce"
+
+SITUATIONS = {'all': 'all', 'Even strength': 'even'}
+
+
+def situation_filter(situation):
+    if situation == 'all':
+        return "1 = 1"
+    elif situation == 'Even strength':
+        return EVEN_STRENGTH
+    raise ValueError(f"Invalid situation: {situation}. Expected 'all' or 'Even strength'.")
+
+
+def situation_key(situation):
+    situation_filter(situation)
+    return SITUATIONS[situation]
+
+
+def name_matches():
+    """Case-insensitive substring match on bio_info.name; binds player_name_pattern(name)."""
+    return "LOWER(name) LIKE LOWER(%s)"
+
+
+def player_ids_query():
+    return f"SELECT playerId FROM bio_info WHERE {name_matches()}"
+
+
+# Two rows are enough to tell a unique match from an ambiguous one
+PLAYER_IDS = register('player_xg_ids', f"{player_ids_query()} LIMIT 2")
+
+
+def player_shots_query():
+    """Distinct (game, shot, side) for every shot the player was on the ice for. Binds the player's name pattern."""
+    return f"""
+        SELECT DISTINCT nhl_game_id, shotID, side
+        FROM shot_on_ice
+        WHERE playerId IN ({player_ids_query()})
+    """
+
+
+def line_shots_query(player_count):
+    """
+    Distinct (game, shot, side) for every shot where all the players were on the ice on the same side.
+    Binds the players' name patterns twice, see line_params.
+    """
+    line_players = "\n            UNION ALL\n            ".join(
+        f"SELECT {slot} AS slot, playerId FROM bio_info WHERE {name_matches()}"
+        for slot in range(1, player_count + 1))
+    any_player = " OR ".join(name_matches() for _ in range(player_count))
+    # The IN list lets the planner search the playerId index instead of walking the whole
+    # bridge table in primary key order to save the GROUP BY sort
+    return f"""
+        SELECT o.nhl_game_id, o.shotID, o.side
+        FROM shot_on_ice AS o
+        JOIN (
+            {line_players}
+        ) AS line_players ON line_players.playerId = o.playerId
+        WHERE o.playerId IN (SELECT playerId FROM bio_info WHERE {any_player})
+        GROUP BY o.nhl_game_id, o.shotID, o.side
+        HAVING COUNT(DISTINCT line_players.slot) = {int(player_count)}
+    """
+
+
+def ngames_on_ice_query(on_ice_query, where):
+    """Binds the on-ice query's parameters twice, then the number of games."""
+    return f"""
+        SELECT on_ice.side, SUM(s.xGoal) AS xGoals
+        FROM ({on_ice_query}) AS on_ice
+        JOIN shots_data AS s ON s.nhl_game_id = on_ice.nhl_game_id AND s.shotID = on_ice.shotID
+        JOIN (
+            SELECT DISTINCT nhl_game_id
+            FROM ({on_ice_query}) AS games_on_ice
+            ORDER BY nhl_game_id DESC
+            LIMIT %s
+        ) AS recent_games ON recent_games.nhl_game_id = on_ice.nhl_game_id
+        WHERE {where}
+        GROUP BY on_ice.side
+    """
+
+
+def date_on_ice_query(on_ice_query, where):
+    """Binds the on-ice query's parameters, then the start and end dates."""
+    return f"""
+        SELECT on_ice.side, SUM(s.xGoal) AS xGoals
+        FROM ({on_ice_query}) AS on_ice
+        JOIN shots_data AS s ON s.nhl_game_id = on_ice.nhl_game_id AND s.shotID = on_ice.shotID
+        WHERE {where}
+        AND s.gameDate BETWEEN %s AND %s
+        GROUP BY on_ice.side
+    """
+
+
+def rollup_strength(situation):
+    return "1 = 1" if situation == 'all' else "strength = 'even'"
+
+
+def ngames_rollup_query(where):
+    """Binds the playerId twice, then the number of games."""
+    # The player's last n games are those with any rollup row, whatever the strength,
+    # as the bridge query counts games the player was on the ice for any shot
+    return f"""
+        SELECT SUM(xGF) AS xGF, SUM(xGA) AS xGA
+        FROM {PLAYER_GAME_XG_TABLE}
+        WHERE playerId = %s AND {where}
+        AND nhl_game_id IN (
+            SELECT nhl_game_id
+            FROM (
+                SELECT DISTINCT nhl_game_id
+                FROM {PLAYER_GAME_XG_TABLE}
+                WHERE playerId = %s
+                ORDER BY nhl_game_id DESC
+                LIMIT %s
+            ) AS recent_games
+        )
+    """
+
+
+def date_rollup_query(where):
+    """Binds the playerId, then the start and end dates."""
+    return f"""
+        SELECT SUM(xGF) AS xGF, SUM(xGA) AS xGA
+        FROM {PLAYER_GAME_XG_TABLE}
+        WHERE playerId = %s AND {where}
+        AND gameDate BETWEEN %s AND %s
+    """
+
+
+TEAM_GAMES = "(homeTeamCode = %s OR awayTeamCode = %s)"
+
+
+def ngames_team_query(where):
+    """Binds the team code four times, then the number of games."""
+    return f"""
+        SELECT teamCode, xGoal, shotID
+        FROM shots_data
+        WHERE {TEAM_GAMES} AND {where}
+        AND nhl_game_id IN (
+            SELECT DISTINCT nhl_game_id
+            FROM (
+                SELECT nhl_game_id
+                FROM shots_data
+                WHERE {TEAM_GAMES}
+                ORDER BY nhl_game_id DESC
+                LIMIT %s
+            ) AS recent_games
+        )
+    """
+
+
+def date_team_query(where):
+    """Binds the team code twice, then the start and end dates."""
+    return f"""
+        SELECT teamCode, xGoal, shotID
+        FROM shots_data
+        WHERE {TEAM_GAMES} AND {where}
+        AND gameDate BETWEEN %s AND %s
+    """
+
+
+def _team_filter(situation):
+    # The team queries compare the skater counts without the s. alias
+    return "1 = 1" if situation == 'all' else "awaySkatersOnIce = homeSkatersOnIce"
+
+
+PLAYER_NGAMES = {key: register(f'player_xg_last_games_{key}', ngames_on_ice_query(player_shots_query(), situation_filter(situation)))
+                 for situation, key in SITUATIONS.items()}
+PLAYER_DATES = {key: register(f'player_xg_dates_{key}', date_on_ice_query(player_shots_query(), situation_filter(situation)))
+                for situation, key in SITUATIONS.items()}
+PLAYER_ROLLUP_NGAMES = {key: register(f'player_xg_rollup_last_games_{key}', ngames_rollup_query(rollup_strength(situation)))
+                        for situation, key in SITUATIONS.items()}
+PLAYER_ROLLUP_DATES = {key: register(f'player_xg_rollup_dates_{key}', date_rollup_query(rollup_strength(situation)))
+                       for situation, key in SITUATIONS.items()}
+LINE_NGAMES = {count: register(f'line{count}_xg_last_games', ngames_on_ice_query(line_shots_query(count), EVEN_STRENGTH))
+               for count in (2, 3)}
+LINE_DATES = {count: register(f'line{count}_xg_dates', date_on_ice_query(line_shots_query(count), EVEN_STRENGTH))
+              for count in (2, 3)}
+TEAM_NGAMES = {key: register(f'team_xg_last_games_{key}', ngames_team_query(_team_filter(situation)))
+               for situation, key in SITUATIONS.items()}
+TEAM_DATES = {key: register(f'team_xg_dates_{key}', date_team_query(_team_filter(situation)))
+              for situation, key in SITUATIONS.items()}
+
+
+def line_params(players):
+    patterns = [player_name_pattern(player) for player in players]
+    return patterns + patterns
+
+
+def on_ice_xgoals(db, statement, params):
+    """xGoal for and against from rows of (side, xGoals)."""
+    xgoals = {row['side']: float(row['xGoals'] or 0) for row in run_statement(db, statement, params) or []}
+    return xgoals.get('shooting', 0.0), xgoals.get('opposing', 0.0)
+
+
+def player_xgoals(db, player_name, rollup_statement, rollup_params, on_ice_statement, on_ice_params):
+    """
+    xGoal for and against while the player was on the ice.
+
+    A name matching one player sums that player's player_game_xg rows, binding
+    rollup_params(playerId). A name matching several (a shared surname) counts each shot
+    any of them was on the ice for once, which only the bridge query can do.
+    """
+    ids = run_statement(db, PLAYER_IDS, [player_name_pattern(player_name)]) or []
+    if len(ids) > 1:
+        return on_ice_xgoals(db, on_ice_statement, on_ice_params)
+    if not ids:
+        return 0.0, 0.0
+    rows = run_statement(db, rollup_statement, rollup_params(ids[0]['playerId'])) or [{}]
+    return float(rows[0].get('xGF') or 0), float(rows[0].get('xGA') or 0)
+
+
+def line_players(player_one, player_two, player_three):
+    return [player_one, player_two] if player_three == 'None' else [player_one, player_two, player_three]
 
 
 def ngames_player_xgpercent(db, player_name, game_number, situation):
         """Runs a SQL query to find the expected goals percentage for a player over their last n games."""
-        if situation == 'all':
-            query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE (LOWER(shooting_team_players) LIKE LOWER('%{player_name}%') OR LOWER(opposing_team_players) LIKE LOWER('%{player_name}%'))
-            AND nhl_game_id IN (
-                SELECT nhl_game_id
-                FROM (
-                    SELECT DISTINCT nhl_game_id
-                    FROM shots_data
-                    WHERE (LOWER(shooting_team_players) LIKE LOWER('%{player_name}%') OR LOWER(opposing_team_players) LIKE LOWER('%{player_name}%'))
-                    ORDER BY nhl_game_id DESC
-                    LIMIT {game_number}
-                ) AS recent_games
-            )
-            """
-        elif situation == 'Even strength':
-             query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE (LOWER(shooting_team_players) LIKE LOWER('%{player_name}%') OR LOWER(opposing_team_players) LIKE LOWER('%{player_name}%')) AND awaySkatersOnice = homeSkatersOnIce
-            AND nhl_game_id IN (
-                SELECT nhl_game_id
-                FROM (
-                    SELECT DISTINCT nhl_game_id
-                    FROM shots_data
-                    WHERE (LOWER(shooting_team_players) LIKE LOWER('%{player_name}%') OR LOWER(opposing_team_players) LIKE LOWER('%{player_name}%'))
-                    ORDER BY nhl_game_id DESC
-                    LIMIT {game_number}
-                ) AS recent_games
-            )
-            """
-        else:
-              raise ValueError(f"Invalid situation: {situation}. Expected 'all' or 'Even strength'.")
-        shots_df = pd.DataFrame(run_query_mysql(query, db))
-        player_xGoals = shots_df.loc[shots_df['shooting_team_players'].str.contains(player_name, na=False), 'xGoal'].sum()
-        against_xGoals = shots_df.loc[shots_df['opposing_team_players'].str.contains(player_name, na=False),'xGoal'].sum()
-
-        print(shots_df.head(20))
+        key = situation_key(situation)
+        pattern = [player_name_pattern(player_name)]
+        player_xGoals, against_xGoals = player_xgoals(
+            db, player_name,
+            PLAYER_ROLLUP_NGAMES[key], lambda player_id: [player_id, player_id, int(game_number)],
+            PLAYER_NGAMES[key], pattern + pattern + [int(game_number)])
+
         print(f"expected for: {player_xGoals}")
         print(f"expected against: {against_xGoals}")
-        # Calculate the total sum of xGoal
-        #total_xGoals = shots_df['xGoal'].sum()
         total_xGoals = player_xGoals + against_xGoals
         # Avoid division by zero
         if total_xGoals == 0:
@@ -60,29 +251,13 @@ def ngames_player_xgpercent(db, player_name, game_number, situation):
 
 def date_player_xgpercent(db, player_name, start_date, end_date, situation):
     """Hardcoded SQL query to find the expected goals percentage for a player over a given date range"""
-    if situation == 'all':
-        query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE(shooting_team_players LIKE '%{player_name}%' OR opposing_team_players LIKE '%{player_name}%')
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    elif situation == 'Even strength':
-         query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE(shooting_team_players LIKE '%{player_name}%' OR opposing_team_players LIKE '%{player_name}%') AND awaySkatersOnice = homeSkatersOnIce
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    else: 
-        raise ValueError(f"Invalid situation: {situation}. Expected 'all' or 'Even strength'.")
-    shots_df = pd.DataFrame(run_query_mysql(query, db))
-                # Calculate the number of shots containing the player in shooting_team_players
-    # Calculate the sum of xGoal where the player is in shooting_team_players
-    player_xGoals = shots_df.loc[shots_df['shooting_team_players'].str.contains(player_name, na=False), 'xGoal'].sum()
+    key = situation_key(situation)
+    player_xGoals, against_xGoals = player_xgoals(
+        db, player_name,
+        PLAYER_ROLLUP_DATES[key], lambda player_id: [player_id, start_date, end_date],
+        PLAYER_DATES[key], [player_name_pattern(player_name), start_date, end_date])
 
-    # Calculate the total sum of xGoal
-    total_xGoals = shots_df['xGoal'].sum()
+    total_xGoals = player_xGoals + against_xGoals
 
     # Avoid division by zero
     if total_xGoals == 0:
@@ -92,43 +267,38 @@ def date_player_xgpercent(db, player_name, start_date, end_date, situation):
 
 
 
+def mirror_team_shots(db, teamCode, situation, game_number=None, start_date=None, end_date=None):
+    """
+    Team xG% shots (teamCode, xGoal) from the shots Parquet mirror, or None when it hasn't been
+    built or is behind shots_data's data_versions stamp in db.
+
+    Selects the same shots as the TEAM_NGAMES and TEAM_DATES statements: every shot of the
+    team's games, with the last n games taken as the games of the team's last n shot rows.
+    """
+    situation_key(situation)
+    # The versions are only read where a mirror was built
+    if not has_mirror(SHOTS_PARQUET_DIR) or not is_current(current_data_versions(db).get('shots_data', 0), SHOTS_PARQUET_DIR):
+        return None
+    dates = []
+    if start_date is not None:
+        dates = [('gameDate', '>=', date.fromisoformat(str(start_date))), ('gameDate', '<=', date.fromisoformat(str(end_date)))]
+    shots_df = read_shots(columns=['nhl_game_id', 'teamCode', 'xGoal', 'homeSkatersOnIce', 'awaySkatersOnIce'],
+                          filters=[[('homeTeamCode', '==', teamCode)] + dates, [('awayTeamCode', '==', teamCode)] + dates],
+                          root=SHOTS_PARQUET_DIR)
+    if game_number is not None:
+        recent_games = shots_df['nhl_game_id'].nlargest(int(game_number)).unique()
+        shots_df = shots_df[shots_df['nhl_game_id'].isin(recent_games)]
+    if situation != 'all':
+        shots_df = shots_df[shots_df['awaySkatersOnIce'] == shots_df['homeSkatersOnIce']]
+    return shots_df.assign(teamCode=shots_df['teamCode'].astype(str), xGoal=shots_df['xGoal'].astype(float))
+
+
 def ngames_team_xgpercent(db, teamCode, game_number, situation):
     """Runs a SQL query to find the expected goals percentage for a team over their last n games."""
-    if situation == 'all':
-        query = f"""
-        SELECT teamCode, xGoal, shotID
-        FROM shots_data
-        WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}')
-        AND nhl_game_id IN (
-            SELECT DISTINCT nhl_game_id
-            FROM (
-                SELECT nhl_game_id
-                FROM shots_data
-                WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}')
-                ORDER BY nhl_game_id DESC
-                LIMIT {game_number}
-            ) AS recent_games
-        )
-        """
-    elif situation == 'Even strength':
-        query = f"""
-        SELECT teamCode, xGoal, shotID
-        FROM shots_data
-        WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}') AND awaySkatersOnice = homeSkatersOnIce
-        AND nhl_game_id IN (
-            SELECT DISTINCT nhl_game_id
-            FROM (
-                SELECT nhl_game_id
-                FROM shots_data
-                WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}')
-                ORDER BY nhl_game_id DESC
-                LIMIT {game_number}
-            ) AS recent_games
-        )
-        """
-    else: 
-        raise ValueError(f"Invalid situation: {situation}. Expected 'all' or 'Even strength'.")
-    shots_df = pd.DataFrame(run_query_mysql(query, db))
+    shots_df = mirror_team_shots(db, teamCode, situation, game_number=game_number)
+    if shots_df is None:
+        shots_df = pd.DataFrame(run_statement(db, TEAM_NGAMES[situation_key(situation)],
+                                              [teamCode] * 4 + [int(game_number)]))
 
     # Calculate the sum of xGoal for the given team
     team_xGoals = shots_df.loc[shots_df['teamCode'] == teamCode, 'xGoal'].sum()
@@ -146,23 +316,10 @@ def ngames_team_xgpercent(db, teamCode, game_number, situation):
 
 def date_team_xgpercent(db, teamCode, start_date, end_date, situation):
     """Hardcoded SQL query to find the expected goals percentage for a player over a given date range"""
-    if situation == 'all':
-        query = f"""
-            SELECT teamCode, xGoal, shotID
-            FROM shots_data
-            WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}')
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    elif situation == 'Even strength':
-        query = f"""
-            SELECT teamCode, xGoal, shotID
-            FROM shots_data
-            WHERE (homeTeamCode = '{teamCode}' OR awayTeamCode = '{teamCode}') AND awaySkatersOnice = homeSkatersOnIce
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    else:
-        raise ValueError(f"Invalid situation: {situation}. Expected 'all' or 'Even strength'.")
-    shots_df = pd.DataFrame(run_query_mysql(query, db))
+    shots_df = mirror_team_shots(db, teamCode, situation, start_date=start_date, end_date=end_date)
+    if shots_df is None:
+        shots_df = pd.DataFrame(run_statement(db, TEAM_DATES[situation_key(situation)],
+                                              [teamCode] * 2 + [start_date, end_date]))
 
     # Calculate the sum of xGoal for the given team
     team_xGoals = shots_df.loc[shots_df['teamCode'] == teamCode, 'xGoal'].sum()
@@ -178,73 +335,11 @@ def date_team_xgpercent(db, teamCode, start_date, end_date, situation):
 
 
 def ngames_line_xgpercent(db, player_one, player_two, player_three, game_number):
-    """Runs a SQL query to find the expected goals percentage for a player over their last n games."""
-    if player_three != 'None':
-        query = f"""
-        SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-        FROM shots_data
-        WHERE (
-            (LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-            LOWER(shooting_team_players) LIKE LOWER('%{player_two}%') AND
-            LOWER(shooting_team_players) LIKE LOWER('%{player_three}%'))
-            OR
-            (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-            LOWER(opposing_team_players) LIKE LOWER('%{player_two}%') AND
-            LOWER(opposing_team_players) LIKE LOWER('%{player_three}%')) AND awaySkatersOnice = homeSkatersOnIce
-        )
-        AND nhl_game_id IN (
-        SELECT nhl_game_id
-        FROM (
-            SELECT DISTINCT nhl_game_id
-            FROM shots_data
-            WHERE (
-                (LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-                LOWER(shooting_team_players) LIKE LOWER('%{player_two}%') AND
-                LOWER(shooting_team_players) LIKE LOWER('%{player_three}%'))
-                OR
-                (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-                LOWER(opposing_team_players) LIKE LOWER('%{player_two}%') AND
-                LOWER(opposing_team_players) LIKE LOWER('%{player_three}%')) AND awaySkatersOnice = homeSkatersOnIce
-            )
-            ORDER BY nhl_game_id DESC
-            LIMIT {game_number}
-        ) AS recent_games
-        )
-        """
-    else:
-        query = f"""
-        SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-        FROM shots_data
-        WHERE (
-            (LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-            LOWER(shooting_team_players) LIKE LOWER('%{player_two}%'))
-            OR
-            (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-            LOWER(opposing_team_players) LIKE LOWER('%{player_two}%')) AND awaySkatersOnice = homeSkatersOnIce
-        )
-        AND nhl_game_id IN (
-        SELECT nhl_game_id
-        FROM (
-            SELECT DISTINCT nhl_game_id
-            FROM shots_data
-            WHERE (
-                (LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-                LOWER(shooting_team_players) LIKE LOWER('%{player_two}%'))
-                OR
-                (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-                LOWER(opposing_team_players) LIKE LOWER('%{player_two}%')) AND awaySkatersOnice = homeSkatersOnIce
-            )
-            ORDER BY nhl_game_id DESC
-            LIMIT {game_number}
-        ) AS recent_games
-        )
-        """  
-    shots_df = pd.DataFrame(run_query_mysql(query, db))
-    player_xGoals = shots_df.loc[shots_df['shooting_team_players'].str.contains(player_one, na=False), 'xGoal'].sum()
-    against_xGoals = shots_df.loc[shots_df['opposing_team_players'].str.contains(player_one, na=False),'xGoal'].sum()
+    """Runs a SQL query to find the even strength expected goals percentage for a line over their last n games."""
+    players = line_players(player_one, player_two, player_three)
+    params = line_params(players)
+    player_xGoals, against_xGoals = on_ice_xgoals(db, LINE_NGAMES[len(players)], params + params + [int(game_number)])
 
-    # Calculate the total sum of xGoal
-    #total_xGoals = shots_df['xGoal'].sum()
     total_xGoals = player_xGoals + against_xGoals
     # Avoid division by zero
     if total_xGoals == 0:
@@ -255,41 +350,14 @@ def ngames_line_xgpercent(db, player_one, player_two, player_three, game_number)
 
 
 def date_line_xgpercent(db, player_one, player_two, player_three, start_date, end_date):
-    """Hardcoded SQL query to find the expected goals percentage for a player over a given date range"""
-    if player_three != 'None':
-        query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE(LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-                    LOWER(shooting_team_players) LIKE LOWER('%{player_two}%') AND
-                    LOWER(shooting_team_players) LIKE LOWER('%{player_three}%')) AND awaySkatersOnice = homeSkatersOnIce
-                OR
-                (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-                    LOWER(opposing_team_players) LIKE LOWER('%{player_two}%') AND
-                    LOWER(opposing_team_players) LIKE LOWER('%{player_three}%')) AND awaySkatersOnice = homeSkatersOnIce
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    else:
-        query = f"""
-            SELECT teamCode, shooting_team_players, opposing_team_players, xGoal, shotID
-            FROM shots_data
-            WHERE(LOWER(shooting_team_players) LIKE LOWER('%{player_one}%') AND
-                    LOWER(shooting_team_players) LIKE LOWER('%{player_two}%')) AND awaySkatersOnice = homeSkatersOnIce
-                OR
-                (LOWER(opposing_team_players) LIKE LOWER('%{player_one}%') AND
-                    LOWER(opposing_team_players) LIKE LOWER('%{player_two}%')) AND awaySkatersOnice = homeSkatersOnIce
-            AND gameDate between '{start_date}' AND '{end_date}'
-        """
-    shots_df = pd.DataFrame(run_query_mysql(query, db))
-                # Calculate the number of shots containing the player in shooting_team_players
-    # Calculate the sum of xGoal where the player is in shooting_team_players
-    player_xGoals = shots_df.loc[shots_df['shooting_team_players'].str.contains(player_one, na=False), 'xGoal'].sum()
+    """Hardcoded SQL query to find the even strength expected goals percentage for a line over a given date range"""
+    players = line_players(player_one, player_two, player_three)
+    player_xGoals, against_xGoals = on_ice_xgoals(db, LINE_DATES[len(players)], line_params(players) + [start_date, end_date])
 
-    # Calculate the total sum of xGoal
-    total_xGoals = shots_df['xGoal'].sum()
+    total_xGoals = player_xGoals + against_xGoals
 
     # Avoid division by zero
     if total_xGoals == 0:
         return 'No shots Given those conditions'
     
-    return player_xGoals/total_xGoals
\ No newline at end of file
+    return player_xGoals/total_xGoals
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from utils.bulk_load import bulk_load
 
 # Load environment variables from .env file
 load_dotenv()
@@ -31,7 +32,8 @@ print("✔ Connected to MySQL")
 cursor.execute(f"USE {MYSQL_DATABASE};")
 
 # Use SQLAlchemy for Pandas `.to_sql()` with MySQL
-engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
+engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}",
+                       connect_args={"allow_local_infile": True})
 print("✔ SQLAlchemy engine created")
 def process_csv(file_path, table_name):
     if os.path.exists(file_path):
@@ -47,12 +49,12 @@ def process_csv(file_path, table_name):
             df_pairs = df[df["position"] == "pairing"]
             
             # Process and save each DataFrame to its respective table
-            df_lines.to_sql(f"{table_name}", engine, if_exists="replace", index=False, chunksize=5000, method="multi")
-            df_pairs.to_sql(f"pairstats_regular_2024", engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+            bulk_load(df_lines, f"{table_name}", engine, if_exists="replace")
+            bulk_load(df_pairs, f"pairstats_regular_2024", engine, if_exists="replace")
             print(f"✔ Data saved in tables '{table_name}' and 'pairstats_regular_2024'")
         else:
             # For other tables (not lines), process normally
-            df.to_sql(table_name, engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+            bulk_load(df, table_name, engine, if_exists="replace")
             print(f"✔ Data saved in table '{table_name}'")
     else:
         print(f"⚠ File not found: {file_path}")
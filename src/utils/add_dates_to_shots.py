@@ -1,83 +1,20 @@
 import pandas as pd
-import requests
+from utils.shift_index import ShiftIndex, attribute_players_on_ice
+from utils.nhl_fetch import NHLFetcher
+from utils.shots_schema import SHOTS_COLUMNS
+from utils.shift_cache import ShiftChartCache
 
 shots_data = r'C:\Users\agjri\Desktop\NHL_agent\NHL_AI_Agent\data\shots\shots_2015-2023.csv'
 shots_2024 = r'C:\Users\agjri\Desktop\shots_2024.csv'
 
-col_list = [
-    'shotID', 'homeTeamCode', 'awayTeamCode', 'season', 'isPlayoffGame', 'game_id', 
-    'homeTeamWon', 'id', 'time', 'period', 'team', 'xCord', 'yCord', 'location', 
-    'event', 'goal', 'shotDistance', 'shotType', 'shotOnEmptyNet', 
-    'goalieNameForShot', 'shooterPlayerId', 'shooterName', 'shooterLeftRight', 
-    'xCordAdjusted', 'yCordAdjusted', 'isHomeTeam', 'awaySkatersOnIce', 'homeSkatersOnIce', 
-    'xGoal', 'homeTeamGoals', 'awayTeamGoals', 'shotAngle', 
-    'playerPositionThatDidEvent', 'shootingTeamForwardsOnIce', 'shootingTeamDefencemenOnIce', 
-    'defendingTeamForwardsOnIce', 'defendingTeamDefencemenOnIce', 'teamCode'
-]
-
-def time_to_seconds(time_str):
-    if pd.isnull(time_str) or time_str == '':
-        return 0
-    try:
-        minutes, seconds = map(int, time_str.split(':'))
-        return minutes * 60 + seconds
-    except ValueError:
-        # Handle cases where the time format is not valid
-        print(f"Invalid time format: {time_str}")
-        return 0  # or another default value you prefer
-
-def fetch_shifts(nhl_game_id):
-    url = f"https://api.nhle.com/stats/rest/en/shiftcharts?cayenneExp=gameId={nhl_game_id}"
-    try:
-        print(f"Fetching shitfs for {nhl_game_id}")
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json().get('data', [])
-    except requests.RequestException as e:
-        print(f"Error fetching shifts for game {nhl_game_id}: {e}")
-        return []
-
-def get_players_on_ice(shifts_data, shot_time, shot_period, team_code):
-    """Finds the players on the ice at the given shot time and period, excluding goalies."""
-    players_on_ice = {'shooting_team': [], 'opposing_team': []}
-    
-    for shift in shifts_data:
-        start_time = time_to_seconds(shift['startTime'])
-        end_time = time_to_seconds(shift['endTime'])
-        shift_length = end_time - start_time
-        
-        if shift['period'] == shot_period and start_time <= shot_time < end_time and shift_length <= 300:
-            player_name = f"{shift['firstName']} {shift['lastName']}"
-            if shift['teamAbbrev'] == team_code:
-                players_on_ice['shooting_team'].append(player_name)
-            else:
-                players_on_ice['opposing_team'].append(player_name)
-    
-    return ', '.join(players_on_ice['shooting_team']), ', '.join(players_on_ice['opposing_team'])
+col_list = SHOTS_COLUMNS
 
 def process_shots(shots_df):
-    shifts_data_cache = {}
-    shots_df['shooting_team_players'] = ''
-    shots_df['opposing_team_players'] = ''
-
-    for idx, row in shots_df.iterrows():
-        nhl_game_id = row['nhl_game_id']
-        team_code = row['teamCode']
-        shot_time_seconds = row['time']
-        shot_period = row['period']
-
-        if shot_period > 1:
-            shot_time_seconds -= (shot_period - 1) * 1200
-      
-        if nhl_game_id not in shifts_data_cache:
-            shifts_data_cache[nhl_game_id] = fetch_shifts(nhl_game_id)
-        shifts_data = shifts_data_cache[nhl_game_id]
-
-        shooting_team_players, opposing_team_players = get_players_on_ice(shifts_data, shot_time_seconds, shot_period, team_code)
-        shots_df.at[idx, 'shooting_team_players'] = shooting_team_players
-        shots_df.at[idx, 'opposing_team_players'] = opposing_team_players
-
-    return shots_df
+    shifts_data_cache = NHLFetcher(shift_cache=ShiftChartCache()).fetch_all_shifts(shots_df['nhl_game_id'].unique())
+
+    # Parse each game's shift chart once, then attribute every shot of the game in bulk
+    shift_indexes = {nhl_game_id: ShiftIndex(shifts_data) for nhl_game_id, shifts_data in shifts_data_cache.items()}
+    return attribute_players_on_ice(shots_df, shift_indexes)
 
 
 # Read CSV with only required columns
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from utils.bulk_load import bulk_load
 
 # Load environment variables from .env file
 print("running the file")
@@ -32,7 +33,7 @@ def process_csv(file_path, table_name, season=None, is_playoff=None):
         #df["is_playoff"] = is_playoff
 
         # Write to MySQL (replace table each time)
-        df.to_sql(table_name, engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+        bulk_load(df, table_name, engine, if_exists="replace")
         print(f"✔ Data saved in table '{table_name}'")
     else:
         print(f"⚠ File not found: {file_path}")
@@ -46,7 +47,8 @@ print("using db")
 # Define seasons to process
 
 print("got to engine create")
-engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
+engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}",
+                       connect_args={"allow_local_infile": True})
 print("created")
 
 
@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from utils.shift_index import ShiftIndex, build_shot_on_ice
+from utils.nhl_fetch import NHLFetcher
+from utils.shift_cache import ShiftChartCache
+from utils.shot_on_ice import ensure_shot_on_ice_table, games_with_shot_on_ice, write_shot_on_ice
+
+# One-off migration: backfill the shot_on_ice bridge table for every season already in shots_data.
+# Games that already have bridge rows are skipped, so the script can be stopped and rerun safely.
+# Run from src with: python -m utils.add_shot_on_ice
+
+load_dotenv()
+
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+
+# Games are fetched and written in batches so an interrupted run loses little work
+BATCH_SIZE = 200
+
+
+def backfill_season(engine, fetcher, season):
+    with engine.connect() as connection:
+        shots_df = pd.read_sql(
+            text("SELECT shotID, nhl_game_id, teamCode, time, period FROM shots_data WHERE season = :season"),
+            connection, params={'season': int(season)})
+
+    game_ids = shots_df['nhl_game_id'].unique()
+    done = games_with_shot_on_ice(engine, game_ids)
+    todo = [game_id for game_id in game_ids if game_id not in done]
+    print(f"Season {season}: {len(todo)} of {len(game_ids)} games need bridge rows")
+
+    for start in range(0, len(todo), BATCH_SIZE):
+        batch = todo[start:start + BATCH_SIZE]
+        shifts_data_cache = fetcher.fetch_all_shifts(batch)
+        shift_indexes = {nhl_game_id: ShiftIndex(shifts_data) for nhl_game_id, shifts_data in shifts_data_cache.items()}
+        batch_shots = shots_df[shots_df['nhl_game_id'].isin(batch)]
+        write_shot_on_ice(engine, build_shot_on_ice(batch_shots, shift_indexes))
+
+
+if __name__ == '__main__':
+    engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}",
+                           connect_args={"allow_local_infile": True})
+    fetcher = NHLFetcher(shift_cache=ShiftChartCache())
+    ensure_shot_on_ice_table(engine)
+
+    with engine.connect() as connection:
+        seasons = [row[0] for row in connection.execute(text("SELECT DISTINCT season FROM shots_data ORDER BY season"))]
+
+    for season in seasons:
+        backfill_season(engine, fetcher, season)
+
+    fetcher.close()
+    print("✔ shot_on_ice backfill complete")
@@ -0,0 +1,254 @@
+import csv
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import MetaData, String, Table, inspect, text
+
+# Loads at least this large drop the table's secondary indexes and rebuild them afterwards,
+# which is much cheaper than maintaining every index row by row during the load
+REBUILD_INDEXES_OVER = 100_000
+
+BATCH_ROWS = 50_000
+
+SHADOW_SUFFIX = '__shadow'
+STAGING_SUFFIX = '__staging'
+
+
+def _prepare_frame(df):
+    """Bools become 0/1 and dates become ISO strings, so both load paths see plain values."""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_bool_dtype(df[column]):
+            df[column] = df[column].astype('Int8')
+        elif pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df
+
+
+def _write_load_file(df, path, batch_rows):
+    """Write df as CSV in batches; NULL is the unquoted word NULL, which LOAD DATA reads as NULL."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, len(df), batch_rows):
+            df.iloc[start:start + batch_rows].to_csv(f, header=False, index=False, na_rep='NULL',
+                                                     quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+
+
+def _load_data_infile(engine, df, table_name, batch_rows):
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        _write_load_file(df, path, batch_rows)
+        columns = ', '.join(f"`{column}`" for column in df.columns)
+        load_path = path.replace('\\', '/')
+        statement = (f"LOAD DATA LOCAL INFILE '{load_path}' INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+                     "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                     f"LINES TERMINATED BY '\\n' ({columns})")
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(statement)
+            # LOAD DATA LOCAL downgrades truncated or out-of-range values to warnings
+            cursor.execute("SHOW COUNT(*) WARNINGS")
+            warnings = cursor.fetchone()[0]
+            if warnings:
+                cursor.execute("SHOW WARNINGS LIMIT 3")
+                sample = '; '.join(row[2] for row in cursor.fetchall())
+                print(f"⚠ LOAD DATA into '{table_name}' raised {warnings} warnings, e.g. {sample}")
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+    finally:
+        os.remove(path)
+
+
+def _executemany(engine, df, table_name, batch_rows):
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    with engine.begin() as connection:
+        for start in range(0, len(df), batch_rows):
+            batch = df.iloc[start:start + batch_rows]
+            records = batch.astype(object).where(batch.notna(), None).to_dict('records')
+            connection.execute(table.insert(), records)
+
+
+def _secondary_indexes(engine, table_name):
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    return [index for index in table.indexes if not index.unique]
+
+
+def bulk_load(df, table_name, engine, if_exists="append", batch_rows=BATCH_ROWS,
+              rebuild_indexes_over=REBUILD_INDEXES_OVER, dtype=None):
+    """
+    Bulk load a DataFrame into a table.
+
+    On MySQL the rows are written to a temporary CSV and loaded with LOAD DATA LOCAL INFILE,
+    which needs an engine created with connect_args={'allow_local_infile': True}. If the
+    server or driver refuses local infile, and on other databases, rows are inserted with
+    batched executemany calls instead of the giant multi-row statements of to_sql(method="multi").
+
+    Args:
+        df: Rows to load; columns must match the table's
+        table_name: Target table
+        engine: SQLAlchemy engine
+        if_exists: "append" adds to the table, "replace" recreates it from df's dtypes first
+        batch_rows: Rows per CSV write or executemany batch
+        rebuild_indexes_over: Drop and rebuild non-unique indexes for loads of at least this many rows
+        dtype: Optional column -> SQLAlchemy type overrides used when the table is created
+
+    Returns:
+        int: Number of rows loaded
+    """
+    if if_exists == "replace" or not inspect(engine).has_table(table_name):
+        # Same column types as before, pandas just no longer inserts the rows itself
+        df.head(0).to_sql(table_name, engine, if_exists="replace", index=False, dtype=dtype)
+    if df.empty:
+        return 0
+
+    df = _prepare_frame(df)
+    started = time.perf_counter()
+
+    dropped = []
+    if len(df) >= rebuild_indexes_over:
+        dropped = _secondary_indexes(engine, table_name)
+        with engine.begin() as connection:
+            for index in dropped:
+                index.drop(connection)
+
+    try:
+        method = "executemany"
+        if engine.dialect.name == 'mysql':
+            try:
+                _load_data_infile(engine, df, table_name, batch_rows)
+                method = "LOAD DATA"
+            except Exception as e:
+                print(f"⚠ LOAD DATA LOCAL INFILE unavailable for '{table_name}', using executemany: {e}")
+        if method == "executemany":
+            _executemany(engine, df, table_name, batch_rows)
+    finally:
+        if dropped:
+            with engine.begin() as connection:
+                for index in dropped:
+                    index.create(connection)
+
+    elapsed = time.perf_counter() - started
+    print(f"✔ Loaded {len(df)} rows into '{table_name}' via {method} in {elapsed:.1f}s "
+          f"({len(df) / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return len(df)
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _index_definitions(engine, table_name):
+    """(name, columns, unique) for each index of a table, or [] if the table doesn't exist."""
+    if not inspect(engine).has_table(table_name):
+        return []
+    table = Table(table_name, MetaData(), autoload_with=engine)
+    return [(index.name, [column.name for column in index.columns], index.unique) for index in table.indexes]
+
+
+def _create_index_sql(engine, table_name, name, columns, unique):
+    column_list = ', '.join(_quote(engine, column) for column in columns)
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX {_quote(engine, name)} ON {_quote(engine, table_name)} ({column_list})"
+
+
+def _key_dtypes(df, key_columns):
+    """Text key columns become VARCHAR, since MySQL can't index pandas' default TEXT columns."""
+    return {column: String(64) for column in key_columns if not pd.api.types.is_numeric_dtype(df[column])}
+
+
+def has_unique_key(engine, table_name, key_columns):
+    return any(unique and columns == list(key_columns)
+               for _, columns, unique in _index_definitions(engine, table_name))
+
+
+def swap_load(df, table_name, engine, unique_key=None):
+    """
+    Replace a table's contents without readers ever seeing it missing or half loaded.
+
+    Rows are bulk loaded into a shadow table, the live table's indexes are rebuilt on it,
+    and the two are swapped atomically: one RENAME TABLE on MySQL, one transaction on SQLite.
+
+    Args:
+        df: New contents of the table
+        table_name: Live table to replace
+        engine: SQLAlchemy engine
+        unique_key: Optional columns to enforce a unique key on (see upsert)
+
+    Returns:
+        int: Number of rows loaded
+    """
+    shadow = f"{table_name}{SHADOW_SUFFIX}"
+    indexes = _index_definitions(engine, table_name)
+    if unique_key and not has_unique_key(engine, table_name, unique_key):
+        indexes.append((f"uq_{table_name}_key", list(unique_key), True))
+
+    live_exists = inspect(engine).has_table(table_name)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {_quote(engine, shadow)}"))
+    loaded = bulk_load(df, shadow, engine, if_exists="replace", dtype=_key_dtypes(df, unique_key or []))
+
+    live, shadow_q, old = _quote(engine, table_name), _quote(engine, shadow), _quote(engine, f"{table_name}__old")
+    if engine.dialect.name == 'mysql':
+        with engine.begin() as connection:
+            # Index names are per table in MySQL, so the shadow gets them before it goes live
+            for name, columns, unique in indexes:
+                connection.execute(text(_create_index_sql(engine, shadow, name, columns, unique)))
+            if live_exists:
+                connection.execute(text(f"RENAME TABLE {live} TO {old}, {shadow_q} TO {live}"))
+                connection.execute(text(f"DROP TABLE {old}"))
+            else:
+                connection.execute(text(f"RENAME TABLE {shadow_q} TO {live}"))
+    else:
+        # SQLite DDL is transactional and index names are global, so swap and index in one transaction
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {live}"))
+            connection.execute(text(f"ALTER TABLE {shadow_q} RENAME TO {live}"))
+            for name, columns, unique in indexes:
+                connection.execute(text(_create_index_sql(engine, table_name, name, columns, unique)))
+
+    print(f"✔ Swapped '{table_name}' in from its shadow table")
+    return loaded
+
+
+def upsert(df, table_name, engine, key_columns):
+    """
+    Insert new rows and update changed ones by key, leaving the table online throughout.
+
+    Rows are bulk loaded into a staging table and merged with one INSERT ... SELECT ...
+    ON DUPLICATE KEY UPDATE (ON CONFLICT on SQLite). A table without a unique key on
+    key_columns is first rebuilt from df through swap_load with that key added.
+
+    Returns:
+        int: Number of rows upserted
+    """
+    key_columns = list(key_columns)
+    df = df.drop_duplicates(subset=key_columns, keep='last')
+    if not has_unique_key(engine, table_name, key_columns):
+        print(f"⚠ '{table_name}' has no unique key on {key_columns}, rebuilding it through a shadow table")
+        return swap_load(df, table_name, engine, unique_key=key_columns)
+
+    staging = f"{table_name}{STAGING_SUFFIX}"
+    bulk_load(df, staging, engine, if_exists="replace")
+
+    columns = ', '.join(_quote(engine, column) for column in df.columns)
+    updates = [column for column in df.columns if column not in key_columns]
+    live, staging_q = _quote(engine, table_name), _quote(engine, staging)
+    if engine.dialect.name == 'mysql':
+        assignments = ', '.join(f"{_quote(engine, c)} = VALUES({_quote(engine, c)})" for c in updates)
+        statement = f"INSERT INTO {live} ({columns}) SELECT {columns} FROM {staging_q} ON DUPLICATE KEY UPDATE {assignments}"
+    else:
+        assignments = ', '.join(f"{_quote(engine, c)} = excluded.{_quote(engine, c)}" for c in updates)
+        keys = ', '.join(_quote(engine, column) for column in key_columns)
+        # WHERE true keeps SQLite from parsing ON CONFLICT as a join constraint
+        statement = (f"INSERT INTO {live} ({columns}) SELECT {columns} FROM {staging_q} WHERE true "
+                     f"ON CONFLICT ({keys}) DO UPDATE SET {assignments}")
+
+    with engine.begin() as connection:
+        connection.execute(text(statement))
+        connection.execute(text(f"DROP TABLE {staging_q}"))
+    print(f"✔ Upserted {len(df)} rows into '{table_name}'")
+    return len(df)
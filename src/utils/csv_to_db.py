@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from utils.bulk_load import bulk_load
 
 # Load environment variables from .env file
 print("running the file")
@@ -45,7 +46,8 @@ seasons = range(2015, 2024)  # Adjust range as needed
 
 # Use SQLAlchemy for Pandas `.to_sql()` with MySQL
 print("got to engine create")
-engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
+engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}",
+                       connect_args={"allow_local_infile": True})
 print("created")
 # Function to process CSV files and save to MySQL
 def process_csv(file_path, table_name, season=None, is_playoff=None):
@@ -59,7 +61,7 @@ def process_csv(file_path, table_name, season=None, is_playoff=None):
         #df["is_playoff"] = is_playoff
 
         # Write to MySQL (replace table each time)
-        df.to_sql(table_name, engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+        bulk_load(df, table_name, engine, if_exists="replace")
         print(f"✔ Data saved in table '{table_name}'")
     else:
         print(f"⚠ File not found: {file_path}")
@@ -86,13 +88,13 @@ def process_csv(file_path, table_name, season=None, is_playoff=None):
 #             df_pairs = df[df["position"] == "pairing"]
             
 #             if not df_lines.empty:
-#                 df_lines.to_sql(f"LineStats_{game_type}_{season}", engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+#                 bulk_load(df_lines, f"LineStats_{game_type}_{season}", engine, if_exists="replace")
 #                 print(f"✔ LineStats_{game_type}_{season} table saved.")
 #             else:
 #                 print(f"⚠ No line data found in {lines_csv}.")
             
 #             if not df_pairs.empty:
-#                 df_pairs.to_sql(f"PairStats_{game_type}_{season}", engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+#                 bulk_load(df_pairs, f"PairStats_{game_type}_{season}", engine, if_exists="replace")
 #                 print(f"✔ PairStats_{game_type}_{season} table saved.")
 #             else:
 #                 print(f"⚠ No pair data found in {lines_csv}.")
@@ -1,35 +1,39 @@
-import mysql.connector
 import pandas as pd
 import os
 import requests
-import zipfile
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
-import io
-from datetime import datetime, date
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Retrieve MySQL connection details from environment variables
-MYSQL_HOST = os.getenv("MYSQL_HOST")
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
-
-# Connect to MySQL
-conn = mysql.connector.connect(
-    host=MYSQL_HOST,
-    user=MYSQL_USER,
-    password=MYSQL_PASSWORD
-)
-cursor = conn.cursor()
+from utils.bulk_load import bulk_load, swap_load, upsert
+from datetime import datetime
+from utils.shift_index import ShiftIndex, attribute_players_on_ice, build_shot_on_ice
+from utils.nhl_fetch import NHLFetcher
+from utils.shift_cache import ShiftChartCache
+from utils.game_dates import load_game_calendar, resolve_game_dates
+from utils.shot_on_ice import SHOT_ON_ICE_TABLE, write_shot_on_ice
+from utils.player_game_xg import PLAYER_GAME_XG_TABLE, write_player_game_xg
+from utils.ingest_watermark import seed_watermark, ingested_game_ids, mark_games_ingested, delete_game_rows
+from utils.shots_stream import iter_shots_archive
+from utils.shots_schema import ensure_shots_table, ensure_season_partitions, coerce_shots_frame
+from utils.shots_parquet import MIRROR_ON_INGEST, SHOTS_PARQUET_DIR, mirror_version, stamp_mirror, write_shots_parquet
+from utils.fetch_manifest import FetchManifest
+from utils.ingest_dag import TaskDAG
+from utils.unified_stats import (STATS_KINDS, backfill_unified_stats, ensure_compat_view, parse_stats_table,
+                                 write_unified_stats)
+from utils.query_cache import SCHEMA_TABLE, bump_data_versions, data_version
+
+# Append-only tables are merged by key instead of swapped; the key must identify a row
+UPSERT_KEYS = {
+    'game_logs': ['gameId', 'playerTeam', 'situation'],
+}
+
 
 def get_game_type_or_exit():
     today = datetime.today()
     year = today.year
-    
+
     april_20 = datetime(year, 4, 20)
     july_1 = datetime(year, 7, 1)
     sept_1 = datetime(year, 9, 1)
@@ -41,250 +45,216 @@ def get_game_type_or_exit():
         exit(0)
     else:
         return "regular"
-    
-game_type = get_game_type_or_exit()
-# Create database if it doesn't exist
-#cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_DATABASE};")
-cursor.execute(f"USE {MYSQL_DATABASE};")
-
-# Use SQLAlchemy for Pandas `.to_sql()` with MySQL
-engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
-
-# Define the URLs for the CSV files
-urls = {
-    f'skaterstats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/skaters.csv",
-    f'goaliestats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/goalies.csv",
-    f'linestats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/lines.csv",
-    f'teamstats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/teams.csv",
-    f'shots_data': f"https://peter-tanner.com/moneypuck/downloads/shots_2024.zip",  # New shots data URL
-    f'game_logs': f"https://moneypuck.com/moneypuck/playerData/careers/gameByGame/all_teams.csv"
-}
 
-required_columns = [
-    'shotID', 'homeTeamCode', 'awayTeamCode', 'season', 'isPlayoffGame', 'game_id', 
-    'homeTeamWon', 'id', 'time', 'period', 'team', 'xCord', 'yCord', 'location', 
-    'event', 'goal', 'shotDistance', 'shotType', 'shotOnEmptyNet', 
-    'goalieNameForShot', 'shooterPlayerId', 'shooterName', 'shooterLeftRight', 
-    'xCordAdjusted', 'yCordAdjusted', 'isHomeTeam', 'awaySkatersOnIce', 'homeSkatersOnIce', 
-    'xGoal', 'homeTeamGoals', 'awayTeamGoals', 'shotAngle', 
-    'playerPositionThatDidEvent', 'shootingTeamForwardsOnIce', 'shootingTeamDefencemenOnIce', 
-    'defendingTeamForwardsOnIce', 'defendingTeamDefencemenOnIce', 'teamCode'
-]
-
-def time_to_seconds(time_str):
-    if pd.isnull(time_str):
-        return 0
-    minutes, seconds = map(int, time_str.split(':'))
-    return minutes * 60 + seconds
-
-def fetch_shifts(nhl_game_id):
-    url = f"https://api.nhle.com/stats/rest/en/shiftcharts?cayenneExp=gameId={nhl_game_id}"
-    try:
-        print(f"Fetching shitfs for {nhl_game_id}")
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json().get('data', [])
-    except requests.RequestException as e:
-        print(f"Error fetching shifts for game {nhl_game_id}: {e}")
-        return []
-
-def get_players_on_ice(shifts_data, shot_time, shot_period, team_code):
-    """Finds the players on the ice at the given shot time and period, excluding goalies."""
-    players_on_ice = {'shooting_team': [], 'opposing_team': []}
-    
-    for shift in shifts_data:
-        start_time = time_to_seconds(shift['startTime'])
-        end_time = time_to_seconds(shift['endTime'])
-        shift_length = end_time - start_time
-        
-        if shift['period'] == shot_period and start_time <= shot_time < end_time and shift_length <= 300:
-            player_name = f"{shift['firstName']} {shift['lastName']}"
-            if shift['teamAbbrev'] == team_code:
-                players_on_ice['shooting_team'].append(player_name)
-            else:
-                players_on_ice['opposing_team'].append(player_name)
-    
-    return ', '.join(players_on_ice['shooting_team']), ', '.join(players_on_ice['opposing_team'])
-
-def process_shots(shots_df):
-    shifts_data_cache = {}
-    shots_df['shooting_team_players'] = ''
-    shots_df['opposing_team_players'] = ''
-
-    for idx, row in shots_df.iterrows():
-        nhl_game_id = row['nhl_game_id']
-        team_code = row['teamCode']
-        shot_time_seconds = row['time']
-        shot_period = row['period']
-
-        if shot_period > 1:
-            shot_time_seconds -= (shot_period - 1) * 1200
-      
-        if nhl_game_id not in shifts_data_cache:
-            shifts_data_cache[nhl_game_id] = fetch_shifts(nhl_game_id)
-        shifts_data = shifts_data_cache[nhl_game_id]
-
-        shooting_team_players, opposing_team_players = get_players_on_ice(shifts_data, shot_time_seconds, shot_period, team_code)
-        shots_df.at[idx, 'shooting_team_players'] = shooting_team_players
-        shots_df.at[idx, 'opposing_team_players'] = opposing_team_players
-
-    return shots_df
-
-
-def fetch_game_date(nhl_game_id):
-    url = f"https://api-web.nhle.com/v1/gamecenter/{nhl_game_id}/landing"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        game_data = response.json()
-        return game_data.get('gameDate', None)
-    except requests.RequestException as e:
-        print(f"Error fetching data for {nhl_game_id}: {e}")
-        return None
 
-def add_game_dates(df):
-    # Extract unique game IDs
-    unique_game_ids = df['nhl_game_id'].unique()
-    game_date_map = {game_id: fetch_game_date(game_id) for game_id in unique_game_ids}
-    
-    # Map game dates back to the original dataframe
-    df['gameDate'] = df['nhl_game_id'].map(game_date_map)
-    return df
+def source_urls(game_type):
+    # Define the URLs for the CSV files
+    return {
+        f'skaterstats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/skaters.csv",
+        f'goaliestats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/goalies.csv",
+        f'linestats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/lines.csv",
+        f'teamstats_{game_type}_2024': f"https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/{game_type}/teams.csv",
+        # game_logs is written before shots_data so new shots can take their dates from it
+        f'game_logs': f"https://moneypuck.com/moneypuck/playerData/careers/gameByGame/all_teams.csv",
+        f'shots_data': f"https://peter-tanner.com/moneypuck/downloads/shots_2024.zip"  # New shots data URL
+    }
+
+
+def create_mysql_engine():
+    # Load environment variables from .env file
+    load_dotenv()
+    MYSQL_HOST = os.getenv("MYSQL_HOST")
+    MYSQL_USER = os.getenv("MYSQL_USER")
+    MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+    MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+    return create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}",
+                         connect_args={"allow_local_infile": True})
+
+
+def process_shots(fetcher, shots_df):
+    # Dated games tell the fetcher which shift charts are final without a gamecenter request each
+    game_dates = shots_df.drop_duplicates('nhl_game_id').set_index('nhl_game_id')['gameDate'].dropna().to_dict()
+    shifts_data_cache = fetcher.fetch_all_shifts(shots_df['nhl_game_id'].unique(), game_dates)
+
+    # Parse each game's shift chart once, then attribute every shot of the game in bulk
+    shift_indexes = {nhl_game_id: ShiftIndex(shifts_data) for nhl_game_id, shifts_data in shifts_data_cache.items()}
+    # The shot_on_ice bridge rows come from the same indexes, one row per skater on the ice
+    return attribute_players_on_ice(shots_df, shift_indexes), build_shot_on_ice(shots_df, shift_indexes)
+
+
+def add_game_dates(engine, fetcher, df):
+    # Resolve dates with a local join against game_logs, and only ask the NHL API for games it doesn't have yet
+    calendar = load_game_calendar(engine, df['nhl_game_id'].unique())
+    return resolve_game_dates(df, calendar, fetch_missing=fetcher.fetch_all_game_dates)
+
+
+def parse_csv(content):
+    # Runs in a worker process, so it only takes and returns picklable values
+    return pd.read_csv(BytesIO(content))  # Read directly into a DataFrame from memory
+
+
+def parse_lines_csv(content):
+    df = parse_csv(content)
+    # Separate into lines and pairs
+    return df[df["position"] == "line"], df[df["position"] == "pairing"]
+
+
+def update_table(engine, df, table_name):
+    written = write_table(engine, df, table_name)
+    # Cached query results over these tables (and their column lists) must not be served again
+    bump_data_versions(engine, written + [SCHEMA_TABLE])
+
+
+def write_table(engine, df, table_name):
+    """Write df to table_name; returns the names of the tables whose contents changed."""
+    # Serving queries never see a missing or half-loaded table: keyed tables are upserted in place,
+    # and season summary tables are rebuilt in a shadow table and swapped in with one RENAME
+    parsed = parse_stats_table(table_name)
+    if parsed:
+        print(f"Merging '{table_name}' into its multi-season table...")
+        # Older seasons still only in their per-year tables (before the migration) come along first
+        backfill_unified_stats(engine, parsed[0])
+        write_unified_stats(engine, df, table_name)
+        written = [STATS_KINDS[parsed[0]][0], table_name]
+        if ensure_compat_view(engine, table_name):
+            return written
+        # Not migrated yet (see utils.migrate_unified_stats): keep the per-year table current too
+    if table_name in UPSERT_KEYS:
+        print(f"Upserting '{table_name}' on {UPSERT_KEYS[table_name]}...")
+        upsert(df, table_name, engine, UPSERT_KEYS[table_name])
+    else:
+        print(f"Reloading '{table_name}' through a shadow table...")
+        swap_load(df, table_name, engine)
+    return written if parsed else [table_name]
+
+
+def process_shots_data(engine, fetcher, fetched, table_name, parquet_root=None):
+    # Compact column types instead of the TEXT/DOUBLE/BIGINT pandas would infer
+    ensure_shots_table(engine, table_name)
+    # Games already in the table are tracked in ingested_games, so existing rows are never read back
+    seed_watermark(engine, table_name)
+    saved = 0
+    # Only a mirror that matched shots_data before this run matches it after; any other
+    # mirror still gets the new rows but stays unstamped, so readers keep using MySQL
+    mirror_current = bool(parquet_root) and mirror_version(parquet_root) == data_version(engine, table_name)
+
+    # Stream the archive member in chunks of whole games, so memory stays flat as the season grows
+    for chunk in iter_shots_archive(fetched.body):
+        chunk = chunk[chunk['isPlayoffGame'] == 1]
+        ingested = ingested_game_ids(engine, table_name, chunk['nhl_game_id'].unique())
+        new_records = chunk[~chunk['nhl_game_id'].isin(ingested)]
+        if new_records.empty:
+            continue
+
+        new_records = add_game_dates(engine, fetcher, new_records)
+        new_records, on_ice = process_shots(fetcher, new_records)
+
+        # Clear anything a failed earlier run wrote for these games, then mark them once both writes succeed
+        delete_game_rows(engine, [table_name, SHOT_ON_ICE_TABLE, PLAYER_GAME_XG_TABLE], new_records['nhl_game_id'].unique())
+        new_records = coerce_shots_frame(new_records)
+        ensure_season_partitions(engine, table_name, new_records['season'].unique())
+        bulk_load(new_records, table_name, engine)
+        write_shot_on_ice(engine, on_ice)
+        # Per-player per-game xG for the xG% tools, rolled up from the rows just written
+        write_player_game_xg(engine, new_records['nhl_game_id'].unique(), table_name)
+        if parquet_root:
+            # Columnar copy for the analytics tools; it replaces its own rows of these games too
+            write_shots_parquet(new_records, parquet_root)
+        mark_games_ingested(engine, table_name, new_records['nhl_game_id'].value_counts())
+        saved += len(new_records)
+
+    if saved:
+        bump_data_versions(engine, [table_name, SHOT_ON_ICE_TABLE, PLAYER_GAME_XG_TABLE])
+        if mirror_current:
+            stamp_mirror(parquet_root, data_version(engine, table_name))
+        print(f"✔ {saved} rows saved in table '{table_name}'")
+    else:
+        print(f"No new records to add for '{table_name}'.")
+    fetched.body.close()
 
 
-def download_csv(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        return pd.read_csv(BytesIO(response.content))  # Read directly into a DataFrame from memory
-    else:
-        print(f"⚠ Failed to download CSV from {url}")
+def parse_stage(parse_pool, parser, fetched):
+    # None when the source is unchanged since its last successful update (or failed to download)
+    if fetched is None:
         return None
+    return parse_pool.submit(parser, fetched.body.getvalue()).result()
 
-def download_and_extract_zip(url):
-    # Download the zip file content
-    response = requests.get(url)
-    if response.status_code == 200:
-        # Extract the zip file in memory using BytesIO
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
-            zip_ref.extractall("/tmp")  # Extract to a temporary directory
-            extracted_files = zip_ref.namelist()  # List of extracted files
-            return extracted_files
-    else:
-        print(f"⚠ Failed to download ZIP from {url}")
-        return None
 
-def get_existing_data(table_name):
-    try:
-        if table_name == 'shots_data':
-            query = f"SELECT * FROM {table_name} WHERE season=2024 AND isPlayoffGame=1;"
-        else:
-            query =  f"SELECT * FROM {table_name};"
-        return pd.read_sql(query, engine)
-    except Exception as e:
-        if "doesn't exist" in str(e).lower() or "no such table" in str(e).lower():
-            print(f"Table '{table_name}' does not exist yet.")
-            return pd.DataFrame()
-        else:
-            raise Exception(f"Unknown error querying table '{table_name}': {e}")
-
-def update_table(df, table_name):
-    # Retrieve existing data from the table
-    existing_data = get_existing_data(table_name)
-    
-    # Compare existing data with new data and find rows that need to be inserted
-    if existing_data.empty:
-        print(f"Table '{table_name}' is empty. Inserting all data.")
-        df.to_sql(table_name, engine, if_exists="replace", index=False, chunksize=5000, method="multi")
-    else:
-        print(f"Updating '{table_name}' with new data...")
-        df = df.drop(columns=['_merge'], errors='ignore')
-        existing_data = existing_data.drop(columns=['_merge'], errors='ignore')
-
-        # Perform a left join to identify records that need to be inserted/updated
-        merged = pd.merge(df, existing_data, how="left", indicator=True)
-        new_records = merged[merged['_merge'] == 'left_only'].drop('_merge', axis=1)
-    
-
-        new_records = new_records.drop(columns=['_merge'], errors='ignore')
-        #Insert the new records into the table
-        if not new_records.empty:
-            if table_name == "game_logs":
-                new_records.to_sql(table_name, engine, if_exists="append", index=False, chunksize=5000, method="multi")
-            else:
-                df.to_sql(table_name, engine, if_exists="replace", index=False, chunksize=5000, method="multi")
+def write_stage(engine, manifest, table_names, fetched, parsed):
+    if fetched is None:
+        return 0
+    frames = parsed if isinstance(parsed, tuple) else (parsed,)
+    for df, table_name in zip(frames, table_names):
+        update_table(engine, df, table_name)
+    # Only now is the source recorded as ingested, so a failed write is retried next run
+    manifest.commit(fetched)
+    return sum(len(df) for df in frames)
+
+
+def write_shots_stage(engine, fetcher, manifest, table_name, parquet_root, fetched, *_):
+    if fetched is None:
+        return 0
+    process_shots_data(engine, fetcher, fetched, table_name, parquet_root)
+    manifest.commit(fetched)
+    return 1
+
+
+def build_dag(engine, fetcher, manifest, urls, parse_pool, game_type="regular", parquet_root=None):
+    """
+    Ingestion graph: download every source concurrently, parse CSVs in the process pool,
+    and write each table under its own lock. shots_data waits for game_logs, whose
+    dates it joins against, and is mirrored to Parquet under parquet_root if given.
+    """
+    dag = TaskDAG()
+    for table_name, url in urls.items():
+        download = dag.add(f"download:{table_name}", partial(manifest.fetch, url, to_file="shots_data" in table_name))
+        if "shots_data" in table_name:
+            deps = [download] + (["write:game_logs"] if "game_logs" in urls else [])
+            dag.add(f"write:{table_name}", partial(write_shots_stage, engine, fetcher, manifest, table_name, parquet_root),
+                    deps=deps, lock=table_name)
+            continue
+
+        if f"linestats_{game_type}_2024" in table_name:
+            parser, table_names = parse_lines_csv, [table_name, f"pairstats_{game_type}_2024"]
         else:
-            print(f"No new records to add for '{table_name}'.")
-
-            
-
-def process_csv(url, table_name):
-    # Download the CSV file into memory
-    df = download_csv(url)
-    
-    if df is not None:
-        # Update the database with the new data
-        update_table(df, table_name)
-
-def process_shots_data(zip_url, table_name):
-    # Download the ZIP file from the URL
-    response = requests.get(zip_url)
-    with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-        # Extract the CSV file from the ZIP
-        zip_ref.extractall("/tmp")
-
-    # Get the CSV filename in the extracted directory (assuming only one CSV file in ZIP)
-    csv_filename = [f for f in os.listdir("/tmp") if f.endswith('.csv')][0]
-    csv_file_path = os.path.join("/tmp", csv_filename)
-    
-    if os.path.exists(csv_file_path):
-        print(f"Processing {csv_file_path}...")
-        
-        # Read the CSV into a DataFrame
-        df = pd.read_csv(csv_file_path, encoding="utf-8", low_memory=False)
-
-        df = df[required_columns]
-
-        df['nhl_game_id'] = df['season'].astype(str) + df['game_id'].astype(str).str.zfill(6)
-        df['nhl_game_id'] = df['nhl_game_id'].astype(int)
-        
-        existing_data = get_existing_data(table_name)
-        #existing_data = existing_data[existing_data['season'] == 2024]
-        df = df.drop(columns=['_merge'], errors='ignore')
-        existing_data = existing_data.drop(columns=['_merge'], errors='ignore')
-        df = df[df['isPlayoffGame'] == 1]
-        merge_keys = required_columns + ['nhl_game_id']
-
-        merged = pd.merge(df, existing_data, how="left", indicator=True)
-        new_records = merged[merged['_merge'] == 'left_only'].drop('_merge', axis=1)
-
-        new_records = process_shots(new_records)
-        new_records = add_game_dates(new_records)
-        # Write to MySQL (replace table each time)
-
-        new_records.to_sql(table_name, engine, if_exists="append", index=False, chunksize=5000, method="multi")
-        print(f"✔ Data saved in table '{table_name}'")
-        
-        # Clean up the extracted files
-        os.remove(csv_file_path)
-    else:
-        print(f"⚠ File not found: {csv_file_path}")
-
-def process_lines_csv(url, table_name):
-    # Download the CSV file into memory
-    df = download_csv(url)
-    
-    if df is not None:
-        # Separate into lines and pairs
-        df_lines = df[df["position"] == "line"]  # Filter rows for lines
-        df_pairs = df[df["position"] == "pairing"]  # Filter rows for pairings
-        
-        # Now, handle lines (just like the other DataFrames)
-        update_table(df_lines, f"{table_name}")  # Update the 'lines' table
-        
-        # Handle pairs (just like the other DataFrames)
-        update_table(df_pairs, f"pairstats_{game_type}_2024")  # Update the 'pairs' table
-        
-        print(f"✔ Lines and pairs data from {table_name} processed and added to database.")
+            parser, table_names = parse_csv, [table_name]
+        parse = dag.add(f"parse:{table_name}", partial(parse_stage, parse_pool, parser), deps=[download])
+        dag.add(f"write:{table_name}", partial(write_stage, engine, manifest, table_names),
+                deps=[download, parse], lock=table_name)
+    return dag
+
+
+def main(engine, fetcher, urls=None, game_type="regular", manifest=None, max_workers=6, parse_workers=2,
+         parquet_root=None):
+    """
+    Update every table from its source.
+
+    Args:
+        engine: SQLAlchemy engine to write to
+        fetcher: NHLFetcher (or anything with fetch_all_shifts and fetch_all_game_dates)
+        urls: table name -> source URL, defaults to source_urls(game_type)
+        game_type: "regular" or "playoffs"
+        manifest: FetchManifest, defaults to one stored in engine's database
+        max_workers: Threads running download, parse and write stages
+        parse_workers: Processes parsing CSVs
+        parquet_root: Directory of the shots Parquet mirror, None to skip it
+
+    Returns:
+        The TaskDAG that ran, with its per-stage timings
+    """
+    urls = urls or source_urls(game_type)
+    # ETag, Last-Modified and content hash of every source as last ingested, so unchanged
+    # MoneyPuck files are skipped before they are parsed or written
+    manifest = manifest or FetchManifest(engine)
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+        dag = build_dag(engine, fetcher, manifest, urls, parse_pool, game_type, parquet_root)
+        try:
+            dag.run(max_workers=max_workers)
+        finally:
+            dag.report()
+    print("All specified tables have been updated in the database.")
+    return dag
+
 
 def ping_url(url):
     try:
@@ -293,16 +263,19 @@ def ping_url(url):
         print("Website is reachable!" if response.ok else "Website is not reachable!")
     except requests.RequestException as e:
         print(f"Failed to reach the website. Error: {e}")
-# Modify the main processing loop to handle the linestats_{game_type}_2024 URL differently
-for table_name, url in urls.items():
-    if f"linestats_{game_type}_2024" in table_name:
-        process_lines_csv(url, table_name)
-    elif "shots_data" in table_name:  # Process the ZIP for shots_data
-        process_shots_data(url, table_name)
-    else:
-        process_csv(url, table_name)
 
-print("All specified tables have been updated in the database.")
-ping_url('https://nhlchatbot.streamlit.app/')
 
-print("Streamlit app up")
\ No newline at end of file
+if __name__ == '__main__':
+    game_type = get_game_type_or_exit()
+    engine = create_mysql_engine()
+    # Shared keep-alive session and thread pool for the per-game NHL API calls.
+    # Shift charts of final games are kept on disk so reruns never download them again.
+    fetcher = NHLFetcher(shift_cache=ShiftChartCache())
+    try:
+        main(engine, fetcher, game_type=game_type, parquet_root=SHOTS_PARQUET_DIR if MIRROR_ON_INGEST else None)
+    finally:
+        fetcher.close()
+
+    ping_url('https://nhlchatbot.streamlit.app/')
+
+    print("Streamlit app up")
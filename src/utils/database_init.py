@@ -5,12 +5,19 @@ from mysql.connector import errorcode
 from langchain_community.vectorstores import Chroma
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from utils.throttling import ThrottledChatOpenAI, ThrottledOpenAIEmbeddings
+from utils.db_pool import ConnectionPool, checkout
+from utils.query_cache import DATA_VERSIONS_QUERY, QueryCache, is_read
+from utils.query_metrics import QUERY_METRICS, note_execution
+from functools import partial
 import os
 import pandas as pd
+import time
 
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+# After the swap, so embedded SQLite databases get pysqlite3's newer SQLite too
+from utils import embedded_db
 
 # Retrieve MySQL credentials from .env
 
@@ -24,15 +31,32 @@ load_dotenv()
 
 model = ThrottledChatOpenAI(model="gpt-4o")
 
-def init_db(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD,MYSQL_DATABASE):
-    """Initialize and return the database connection"""
-    return mysql.connector.connect(
+# Results of read queries, shared by every session of this process (see utils.query_cache)
+QUERY_CACHE = QueryCache.from_env()
+
+def init_db(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD,MYSQL_DATABASE, **pool_settings):
+    """
+    Initialize and return the database connection pool.
+
+    Every query checks a connection out of the pool for its own duration (see checkout),
+    so concurrent sessions don't queue on one connection and a dropped connection is
+    replaced instead of breaking every later query. The pool is sized by MYSQL_POOL_SIZE,
+    MYSQL_POOL_TIMEOUT and MYSQL_POOL_PING_AFTER, or by pool_settings.
+
+    With DB_BACKEND set to 'duckdb' or 'sqlite' the pool serves the embedded database file
+    at EMBEDDED_DB_PATH instead (see utils.embedded_db) and the MySQL settings are unused.
+    """
+    if embedded_db.DB_BACKEND in embedded_db.BACKENDS:
+        return embedded_db.embedded_pool(embedded_db.EMBEDDED_DB_PATH, embedded_db.DB_BACKEND, **pool_settings)
+    connect = partial(
+        mysql.connector.connect,
         host=MYSQL_HOST,
         user=MYSQL_USER,
         password=MYSQL_PASSWORD,
         database=MYSQL_DATABASE,
         ssl_disabled=True
     )
+    return ConnectionPool.from_env(connect, **pool_settings)
 
 def find_persistent_dir(db_name):
     """Find the persistent directory for vector database storage.
@@ -83,72 +107,109 @@ def init_vector_db(db_name, api_key):
 
 def get_table_info(db_connection, table_names=None):
     """Retrieve schema information for specific tables or list all tables."""
-    cursor = db_connection.cursor(dictionary=True)
+    if table_names:
+        if isinstance(table_names, list):
+            # For each table in the list, fetch its column information
+            # Returns a dictionary with table names as keys and column info as values
+            return {table_name: _cached_select(_columns_query(table_name), db_connection) for table_name in table_names}
+        # If a single table name is passed (non-list), behave as before
+        return {table_names: _cached_select(_columns_query(table_names), db_connection)}
+    query = """
+        SELECT TABLE_NAME
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+    """
+    return _cached_select(query, db_connection)  # Returns list of tables in the database
+
+
+def _columns_query(table_name):
+    return f"""
+        SELECT COLUMN_NAME, DATA_TYPE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = '{table_name}' AND TABLE_SCHEMA = DATABASE()
+    """
+
 
+def _select(query, db_connection):
+    with checkout(db_connection) as connection:
+        return _run_query(query, connection)
+
+
+def _cached_select(query, db_connection):
+    with QUERY_METRICS.measure(query) as measurement:
+        return measurement.result(QUERY_CACHE.fetch(query, measurement.run(lambda query: _select(query, db_connection)),
+                                                    read_versions=lambda: read_data_versions(db_connection)))
+
+
+def current_data_versions(db_connection):
+    """{table: version} as QUERY_CACHE last read it from data_versions, for serving derived copies of tables."""
+    return QUERY_CACHE.versions(lambda: read_data_versions(db_connection))
+
+
+def read_data_versions(db_connection):
+    """{table: version} from the data_versions table ingestion maintains, or None if it can't be read."""
     try:
-        if table_names:
-            if isinstance(table_names, list):
-                # For each table in the list, fetch its column information
-                table_schemas = {}
-                for table_name in table_names:
-                    query = f"""
-                        SELECT COLUMN_NAME, DATA_TYPE
-                        FROM INFORMATION_SCHEMA.COLUMNS
-                        WHERE TABLE_NAME = '{table_name}' AND TABLE_SCHEMA = DATABASE()
-                    """
-                    cursor.execute(query)
-                    result = cursor.fetchall()
-                    table_schemas[table_name] = result  # Store the schema for each table in a dictionary
-                return table_schemas  # Returns a dictionary with table names as keys and column info as values
-            else:
-                # If a single table name is passed (non-list), behave as before
-                query = f"""
-                    SELECT COLUMN_NAME, DATA_TYPE
-                    FROM INFORMATION_SCHEMA.COLUMNS
-                    WHERE TABLE_NAME = '{table_names}' AND TABLE_SCHEMA = DATABASE()
-                """
-                cursor.execute(query)
-                result = cursor.fetchall()
-                return {table_names: result}  # Returns schema for the specified single table
-        else:
-            query = """
-                SELECT TABLE_NAME
-                FROM INFORMATION_SCHEMA.TABLES
-                WHERE TABLE_SCHEMA = DATABASE()
-            """
-            cursor.execute(query)
-            result = cursor.fetchall()
-            return result  # Returns list of tables in the database
-    finally:
-        cursor.close()
+        return {row['table_name']: row['version'] for row in _select(DATA_VERSIONS_QUERY, db_connection)}
+    except mysql.connector.Error:
+        # No data_versions table yet: cached results only expire by TTL
+        return None
+
 
 # db = init_db()
 # # Get schema for a list of tables (e.g., 'players' and 'games')
 # tables_schema = get_table_info(db, ['skaterstats_regular_2023', 'goaliestats_regular_2023'])
 # print("Schemas for 'players' and 'goalie' tables:", tables_schema)
-def run_query_mysql(query, db_connection):
-    """Run a query on the MySQL database and return the result."""
-    
+def run_query_mysql(query, db_connection, use_cache=True):
+    """
+    Run a query on the MySQL database (or the embedded one init_db opened) and return the result.
+
+    Reads are answered from QUERY_CACHE when the same query already ran and none of its
+    tables changed since; use_cache=False always asks the database. Every call is timed
+    into QUERY_METRICS (see utils.query_metrics).
+    """
+    try:
+        with QUERY_METRICS.measure(query) as measurement:
+            run = measurement.run(lambda query: _run_with_retry(query, db_connection))
+            if use_cache:
+                return measurement.result(QUERY_CACHE.fetch(query, run, read_versions=lambda: read_data_versions(db_connection)))
+            return measurement.result(run(query))
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        return None
+
+
+def _run_with_retry(query, db_connection):
+    # A pooled connection lost mid-query is replaced by the pool, so a read is retried once on a fresh one
+    attempts = 2 if isinstance(db_connection, ConnectionPool) and is_read(query) else 1
+    for attempt in range(attempts):
+        try:
+            return _select(query, db_connection)
+        except (mysql.connector.OperationalError, mysql.connector.InterfaceError) as err:
+            if attempt + 1 == attempts:
+                raise
+            print(f"⚠ Lost the database connection ({err}), retrying")
+
+
+def _run_query(query, db_connection):
     # Establish a cursor to execute the query
     cursor = db_connection.cursor(dictionary=True)  # dictionary=True to return results as dictionaries
     
     try:
         # Execute the query
+        started = time.perf_counter()
         cursor.execute(query)
+        executed = time.perf_counter()
         
-        # If it's a SELECT query, fetch the results
-        if query.strip().lower().startswith("select"):
+        # If it's a SELECT query (or one starting with a CTE), fetch the results
+        if is_read(query):
             result = cursor.fetchall()  # Fetch all rows
         else:
             result = None  # For non-SELECT queries (INSERT, UPDATE, DELETE)
             db_connection.commit()  # Commit changes for non-SELECT queries (e.g., INSERT, UPDATE)
+        note_execution(executed - started, time.perf_counter() - executed)
         
         return result
     
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        return None
-    
     finally:
         # Close the cursor to free up resources
-        cursor.close()
\ No newline at end of file
+        cursor.close()
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection could be checked out of the pool in time."""
+
+
+class PoolStats:
+    """Checkout counters of a ConnectionPool, updated under the pool's lock."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.waited = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.discarded = 0
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats['mean_wait_seconds'] = self.wait_seconds / self.checkouts if self.checkouts else 0.0
+        return stats
+
+
+def _ping(connection):
+    """Default health check: mysql.connector's ping, reconnecting once if the server dropped us."""
+    connection.ping(reconnect=True, attempts=2, delay=0.2)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections shared by every Streamlit session.
+
+    Connections are opened lazily up to size. A connection that sat idle longer than
+    ping_after seconds is health checked on checkout, and replaced with a new one if the
+    check fails. A connection that raises while checked out is checked before going back
+    to the pool, so one dropped connection never poisons later requests.
+    Time spent waiting for a free connection is kept in stats.
+
+    Args:
+        connect: Callable opening a new DB-API connection, e.g. partial(mysql.connector.connect, ...)
+        size: Most connections open at once
+        timeout: Seconds to wait for a free connection before PoolTimeout
+        ping_after: Idle seconds after which a connection is health checked on checkout
+        health_check: Callable raising if a connection is unusable; defaults to mysql.connector's ping
+        slow_wait: Checkouts waiting longer than this many seconds are logged
+    """
+
+    def __init__(self, connect, size=5, timeout=10.0, ping_after=30.0, health_check=_ping, slow_wait=1.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.health_check = health_check
+        self.slow_wait = slow_wait
+        self.stats = PoolStats()
+        self._idle = []  # (connection, returned_at); most recently used last
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        # Notified whenever a connection is returned or a slot frees up, so waiters recheck both
+        self._available = threading.Condition(self._lock)
+
+    @classmethod
+    def from_env(cls, connect, **overrides):
+        """Pool sized by MYSQL_POOL_SIZE, MYSQL_POOL_TIMEOUT and MYSQL_POOL_PING_AFTER, unless overridden."""
+        settings = {
+            'size': int(os.getenv("MYSQL_POOL_SIZE", 5)),
+            'timeout': float(os.getenv("MYSQL_POOL_TIMEOUT", 10)),
+            'ping_after': float(os.getenv("MYSQL_POOL_PING_AFTER", 30)),
+        }
+        settings.update(overrides)
+        return cls(connect, **settings)
+
+    @property
+    def in_use(self):
+        return self._opened - len(self._idle)
+
+    def _open(self):
+        try:
+            return self.connect()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _discard(self, connection):
+        with self._available:
+            self._opened -= 1
+            self.stats.discarded += 1
+            self._available.notify()
+        self._close(connection)
+
+    def _healthy(self, connection):
+        try:
+            self.health_check(connection)
+            return True
+        except Exception as e:
+            print(f"⚠ Dropping unhealthy database connection: {e}")
+            return False
+
+    def _checkout(self):
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self._available:
+            # Take an idle connection or a free slot, whichever turns up first
+            while not self._idle and self._opened >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats.timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                      f"({self.size} in use); raise MYSQL_POOL_SIZE?")
+                self._available.wait(remaining)
+            if self._idle:
+                connection, returned_at = self._idle.pop()
+            else:
+                self._opened += 1
+                connection = returned_at = None
+        if connection is None:
+            connection = self._open()
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.stats.checkouts += 1
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+            if waited >= 0.001:
+                self.stats.waited += 1
+        if waited >= self.slow_wait:
+            print(f"⚠ Waited {waited:.2f}s for a database connection")
+
+        if returned_at is not None and time.monotonic() - returned_at >= self.ping_after and not self._healthy(connection):
+            # The replacement takes over the dead connection's slot, so no waiter can claim it in between
+            self._close(connection)
+            with self._lock:
+                self.stats.discarded += 1
+                self.stats.reconnects += 1
+            connection = self._open()
+        return connection
+
+    def _checkin(self, connection, failed):
+        if self._closed:
+            self._discard(connection)
+            return
+        # After an error the connection may be dead or mid-transaction; only healthy ones go back
+        if failed:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            if not self._healthy(connection):
+                self._discard(connection)
+                return
+        with self._available:
+            self._idle.append((connection, time.monotonic()))
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of the with block."""
+        connection = self._checkout()
+        failed = False
+        try:
+            yield connection
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._checkin(connection, failed)
+
+    def close(self):
+        """Close every idle connection; checked-out ones are closed when returned after this."""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+@contextmanager
+def checkout(db):
+    """
+    A connection for one query: checked out of db if it is a ConnectionPool, or db itself
+    if it is already a connection (one-off scripts pass a raw connection).
+    """
+    if isinstance(db, ConnectionPool):
+        with db.connection() as connection:
+            yield connection
+    else:
+        yield db
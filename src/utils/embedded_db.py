@@ -0,0 +1,452 @@
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import mysql.connector
+import pandas as pd
+from utils.db_pool import ConnectionPool
+from utils.paths import project_root
+from utils.query_cache import DATA_VERSIONS_DDL, DATA_VERSIONS_TABLE
+from utils.shots_parquet import SHOTS_PARQUET_DIR
+from utils.shots_schema import shots_index_ddl
+from utils.sql_dialect import BACKENDS, translate
+from utils.unified_stats import STATS_KINDS, lookup_index, parse_stats_table, per_year_table
+
+try:
+    import duckdb
+except ImportError:  # Only the 'duckdb' backend needs it; MySQL and SQLite work without it
+    duckdb = None
+
+# Embedded stand-ins for the MySQL server: one DuckDB or SQLite file built from the same
+# CSV and Parquet sources ingestion loads into MySQL. init_db serves from it when
+# DB_BACKEND is 'duckdb' or 'sqlite'; connections speak the slice of mysql.connector the
+# app uses, and MySQL-isms in the queries are translated by utils.sql_dialect.
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+
+
+def default_data_dir():
+    """data under the project root, where csv_to_db's source files live."""
+    return os.path.join(project_root(), 'data')
+
+
+def default_db_path():
+    """data/nhl.duckdb under the project root, unless EMBEDDED_DB_PATH is set (a relative one is taken from the project root too)."""
+    return os.path.join(project_root(), os.getenv("EMBEDDED_DB_PATH", os.path.join('data', 'nhl.duckdb')))
+
+
+# Resolved from the project root, so the build (run from src) and the app (run from the
+# repository root) agree on the file
+EMBEDDED_DB_PATH = default_db_path()
+
+# mysql.connector errno for a query stopped by its time limit, so callers handle both alike
+QUERY_INTERRUPTED = 3024
+
+# Rows inserted per executemany when a frame is loaded into SQLite
+INSERT_BATCH = 10_000
+
+# MoneyPuck file per per-year table name, relative to the data directory (csv_to_db's layout)
+_STATS_FILES = {
+    'skater': "skaters/{season}/skaters_{season_type}_{season}.csv",
+    'goalie': "goalies/{season}/goalies_{season_type}_{season}.csv",
+    'team': "teams/{season}/teams_{season_type}_{season}.csv",
+    # Lines and pairs share one file and are told apart by its position column
+    'line': "pairings/{season}/pairings_{season_type}_{season}.csv",
+    'pair': "pairings/{season}/pairings_{season_type}_{season}.csv",
+}
+_PAIRINGS_POSITION = {'line': 'line', 'pair': 'pairing'}
+_TABLE_FILES = {
+    'bio_info': "bio_information/allPlayersLookup.csv",
+    'game_logs': "game_logs/all_teams.csv",
+}
+
+
+def _require_duckdb():
+    if duckdb is None:
+        raise ImportError("The embedded DuckDB backend needs duckdb; install it with: pip install duckdb")
+
+
+def _check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedded backend {backend!r}; expected one of {BACKENDS}")
+
+
+# Each distinct statement is translated once per process, like a prepared statement is parsed once
+_translate = lru_cache(maxsize=1024)(translate)
+
+
+def _is_interrupt(err):
+    return 'interrupt' in str(err).lower()
+
+
+def _database_error(err):
+    """A backend error as mysql.connector's, so every existing except clause handles it."""
+    errno = QUERY_INTERRUPTED if _is_interrupt(err) else None
+    return mysql.connector.errors.DatabaseError(msg=str(err), errno=errno)
+
+
+@contextmanager
+def sqlite_time_limit(connection, timeout_ms):
+    """Interrupt queries on an sqlite3 connection that run past timeout_ms."""
+    deadline = time.monotonic() + timeout_ms / 1000
+    connection.set_progress_handler(lambda: int(time.monotonic() > deadline), 1000)
+    try:
+        yield
+    finally:
+        connection.set_progress_handler(None, 1000)
+
+
+@contextmanager
+def time_limit(connection, timeout_ms):
+    """
+    Stop queries on an embedded or sqlite3 connection after timeout_ms. MySQL connections
+    are left alone; their queries carry a MAX_EXECUTION_TIME hint instead.
+    """
+    if not timeout_ms:
+        yield
+    elif isinstance(connection, EmbeddedConnection):
+        with connection.time_limit(timeout_ms):
+            yield
+    elif type(connection).__module__.split('.')[0] in ('sqlite3', 'pysqlite3'):
+        with sqlite_time_limit(connection, timeout_ms):
+            yield
+    else:
+        yield
+
+
+class EmbeddedCursor:
+    """Cursor over an embedded connection with mysql.connector's execute/fetch interface."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._dictionary = dictionary
+        self._result = None
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, operation, params=None):
+        query = _translate(operation, self._connection.dialect, params is not None)
+        try:
+            if self._connection.dialect == 'duckdb':
+                result = self._connection.raw.execute(query, list(params) if params is not None else None)
+            else:
+                result = self._connection.raw.execute(query, tuple(params) if params is not None else ())
+        except Exception as err:
+            if not isinstance(err, self._connection.errors):
+                raise
+            raise _database_error(err) from err
+        self._result = result
+        self.description = result.description
+        self.rowcount = getattr(result, 'rowcount', -1)
+        return self
+
+    def _rows(self, rows):
+        if not self._dictionary or not rows:
+            return [tuple(row) for row in rows]
+        columns = [description[0] for description in self.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _fetch(self, fetch, *args):
+        if self._result is None or self.description is None:
+            return []
+        try:
+            return fetch(*args)
+        except Exception as err:
+            if not isinstance(err, self._connection.errors):
+                raise
+            raise _database_error(err) from err
+
+    def fetchall(self):
+        return self._rows(self._fetch(self._result.fetchall))
+
+    def fetchmany(self, size=1):
+        return self._rows(self._fetch(self._result.fetchmany, size))
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def close(self):
+        self._result = None
+
+
+class EmbeddedConnection:
+    """
+    An embedded DuckDB or SQLite connection behind the slice of mysql.connector's
+    connection the app uses: cursor(dictionary=..., buffered=..., prepared=...), commit,
+    rollback, ping and close. Cursors execute through sql_dialect.translate.
+
+    Args:
+        raw: duckdb or sqlite3 connection
+        dialect: 'duckdb' or 'sqlite'
+    """
+
+    def __init__(self, raw, dialect):
+        _check_backend(dialect)
+        self.raw = raw
+        self.dialect = dialect
+        self.errors = duckdb.Error if dialect == 'duckdb' else (sqlite3.Error, raw_sqlite_error(raw))
+        self._closed = False
+
+    def cursor(self, dictionary=False, buffered=None, prepared=False):
+        # Embedded results are read straight from the engine, so buffered and prepared change nothing
+        return EmbeddedCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except self.errors as err:
+            # DuckDB autocommits statements outside a transaction and refuses a bare COMMIT
+            if 'no transaction' not in str(err):
+                raise _database_error(err) from err
+
+    def rollback(self):
+        try:
+            self.raw.rollback()
+        except Exception:
+            pass  # No open transaction
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        self.cursor().execute("SELECT 1").fetchall()
+
+    def is_connected(self):
+        return not self._closed
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self._closed = True
+        self.raw.close()
+
+    @contextmanager
+    def time_limit(self, timeout_ms):
+        """Interrupt queries that run longer than timeout_ms within the with block."""
+        if self.dialect == 'sqlite':
+            with sqlite_time_limit(self.raw, timeout_ms):
+                yield
+            return
+        timer = threading.Timer(timeout_ms / 1000, self.raw.interrupt)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        finally:
+            timer.cancel()
+
+
+def raw_sqlite_error(connection):
+    # database_init swaps pysqlite3 in for sqlite3, so the error class comes from the connection's own module
+    module = sys.modules.get(type(connection).__module__.split('.')[0])
+    return getattr(module, 'Error', sqlite3.Error)
+
+
+def embedded_connector(path, backend, read_only=True):
+    """Callable opening a new EmbeddedConnection to the database file at path."""
+    _check_backend(backend)
+    if backend == 'duckdb':
+        _require_duckdb()
+        # One database instance per process; each pooled connection is a cursor on it
+        database = duckdb.connect(str(path), read_only=read_only)
+        return lambda: EmbeddedConnection(database.cursor(), 'duckdb')
+
+    def connect():
+        if read_only:
+            raw = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            raw = sqlite3.connect(str(path), check_same_thread=False)
+        return EmbeddedConnection(raw, 'sqlite')
+    return connect
+
+
+def embedded_pool(path=EMBEDDED_DB_PATH, backend=DB_BACKEND, read_only=True, **pool_settings):
+    """
+    ConnectionPool over an embedded database file, sized like init_db's MySQL pool.
+
+    Raises:
+        FileNotFoundError: The file hasn't been built yet (see build_embedded_db)
+    """
+    if not Path(path).is_file():
+        raise FileNotFoundError(f"No embedded {backend} database at '{path}'; build it with: "
+                                f"python -m utils.embedded_db --backend {backend} --path {path}")
+    return ConnectionPool.from_env(embedded_connector(path, backend, read_only), **pool_settings)
+
+
+def _sqlite_type(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _sqlite_value(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):  # numpy scalar
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _sqlite_insert(connection, table_name, df):
+    placeholders = ', '.join(['?'] * len(df.columns))
+    for start in range(0, len(df), INSERT_BATCH):
+        rows = df.iloc[start:start + INSERT_BATCH].astype(object).itertuples(index=False, name=None)
+        connection.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})',
+                               [tuple(_sqlite_value(value) for value in row) for row in rows])
+
+
+def load_frame(connection, backend, table_name, df):
+    """Create table_name on a raw duckdb or sqlite3 connection and fill it with df."""
+    if backend == 'duckdb':
+        connection.register('_frame', df)
+        try:
+            connection.execute(f'CREATE TABLE "{table_name}" AS SELECT * FROM _frame')
+        finally:
+            connection.unregister('_frame')
+        return
+    columns = ', '.join(f'"{column}" {_sqlite_type(df[column])}' for column in df.columns)
+    connection.execute(f'CREATE TABLE "{table_name}" ({columns})')
+    _sqlite_insert(connection, table_name, df)
+
+
+def _read_source(path):
+    if str(path).endswith('.parquet'):
+        return pd.read_parquet(path)
+    df = pd.read_csv(path, encoding="utf-8", low_memory=False)
+    # MoneyPuck's teams file repeats the team column; pandas renames the copy team.1
+    return df.loc[:, ~df.columns.str.contains(r'\.\d+$')]
+
+
+def _unified_frames(stats_sources):
+    """{multi-season table: one frame of every per-year file with season and season_type added}."""
+    frames = {}
+    for table_name, path in sorted(stats_sources.items()):
+        kind, season_type, season = parse_stats_table(table_name)
+        df = _read_source(path)
+        if kind in _PAIRINGS_POSITION and 'position' in df.columns:
+            df = df[df['position'] == _PAIRINGS_POSITION[kind]]
+        frames.setdefault(kind, []).append(df.assign(season=season, season_type=season_type))
+    return {kind: pd.concat(parts, ignore_index=True, sort=False) for kind, parts in frames.items()}
+
+
+def _load_shots(connection, backend, shots_dir):
+    if backend == 'duckdb':
+        pattern = str(Path(shots_dir) / '**' / '*.parquet')
+        connection.execute(f"CREATE TABLE shots_data AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)")
+    else:
+        from utils.shots_parquet import shots_dataset
+        dataset = shots_dataset(shots_dir)
+        created = False
+        for batch in dataset.to_batches():
+            df = batch.to_pandas()
+            if not created:
+                load_frame(connection, backend, 'shots_data', df.iloc[:0])
+                created = True
+            _sqlite_insert(connection, 'shots_data', df)
+    for ddl in shots_index_ddl():
+        connection.execute(ddl)
+
+
+def build_embedded_db(path, backend='duckdb', sources=None, shots_dir=SHOTS_PARQUET_DIR):
+    """
+    Build an embedded database file from the ingestion sources.
+
+    Per-year stats files are merged into their multi-season tables with the per-year names
+    as views (as unified_stats does on MySQL), shots_data is loaded from the Parquet mirror,
+    and every table starts at version 1 in data_versions. The file is built next to path
+    and moved into place at the end, so a running app never opens a half-built database.
+
+    Args:
+        path: Database file to write
+        backend: 'duckdb' or 'sqlite'
+        sources: {table name: CSV or Parquet file}; per-year stats names such as
+                 skaterstats_regular_2023 go into skater_stats. Defaults to default_sources().
+        shots_dir: Root of the shots Parquet mirror, or None to leave shots_data out
+
+    Returns:
+        list of the tables written
+    """
+    _check_backend(backend)
+    sources = default_sources() if sources is None else sources
+    stats_sources = {name: source for name, source in sources.items() if parse_stats_table(name)}
+    building = Path(f"{path}.building")
+    building.unlink(missing_ok=True)
+    if backend == 'duckdb':
+        _require_duckdb()
+        connection = duckdb.connect(str(building))
+    else:
+        connection = sqlite3.connect(str(building))
+
+    written = []
+    try:
+        for kind, df in _unified_frames(stats_sources).items():
+            table_name = STATS_KINDS[kind][0]
+            load_frame(connection, backend, table_name, df)
+            index_name, columns = lookup_index(kind)
+            connection.execute(f'CREATE INDEX {index_name} ON {table_name} ({", ".join(columns)})')
+            for season_type, season in df[['season_type', 'season']].drop_duplicates().itertuples(index=False):
+                connection.execute(f'CREATE VIEW "{per_year_table(kind, season_type, season)}" AS SELECT * FROM {table_name} '
+                                   f"WHERE season = {int(season)} AND season_type = '{season_type}'")
+            written.append(table_name)
+            print(f"✔ Loaded {len(df)} rows into '{table_name}'")
+        for table_name, source in sources.items():
+            if table_name in stats_sources:
+                continue
+            df = _read_source(source)
+            load_frame(connection, backend, table_name, df)
+            written.append(table_name)
+            print(f"✔ Loaded {len(df)} rows into '{table_name}'")
+        if shots_dir is not None and Path(shots_dir).is_dir():
+            _load_shots(connection, backend, shots_dir)
+            written.append('shots_data')
+            print("✔ Loaded 'shots_data' from the Parquet mirror")
+
+        connection.execute(DATA_VERSIONS_DDL)
+        now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0).isoformat(sep=' ')
+        connection.executemany(f"INSERT INTO {DATA_VERSIONS_TABLE} (table_name, version, updated_at) VALUES (?, 1, ?)",
+                               [(table_name.lower(), now) for table_name in written])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(building, path)
+    return written
+
+
+def default_sources(data_dir=None):
+    """{table name: file} for every source file present under data_dir (default_data_dir()), in csv_to_db's layout."""
+    data_dir = Path(data_dir or default_data_dir())
+    sources = {}
+    for kind, pattern in _STATS_FILES.items():
+        for season_dir in sorted((data_dir / Path(pattern).parts[0]).glob('[0-9][0-9][0-9][0-9]')):
+            for season_type in ('regular', 'playoffs'):
+                path = data_dir / pattern.format(season=season_dir.name, season_type=season_type)
+                if path.is_file():
+                    sources[per_year_table(kind, season_type, int(season_dir.name))] = path
+    for table_name, relative in _TABLE_FILES.items():
+        if (data_dir / relative).is_file():
+            sources[table_name] = data_dir / relative
+    return sources
+
+
+if __name__ == '__main__':
+    # Full build from the CSV files and the shots mirror. Run from src with: python -m utils.embedded_db
+    parser = argparse.ArgumentParser(description="Build the embedded database init_db serves from when DB_BACKEND is set.")
+    parser.add_argument('--backend', choices=BACKENDS, default=DB_BACKEND if DB_BACKEND in BACKENDS else 'duckdb')
+    parser.add_argument('--path', default=EMBEDDED_DB_PATH)
+    parser.add_argument('--data-dir', default=default_data_dir())
+    parser.add_argument('--shots-dir', default=SHOTS_PARQUET_DIR)
+    args = parser.parse_args()
+    tables = build_embedded_db(args.path, args.backend, default_sources(args.data_dir), args.shots_dir)
+    print(f"✔ Built {args.path} ({args.backend}) with {len(tables)} tables")
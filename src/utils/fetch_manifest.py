@@ -0,0 +1,121 @@
+import hashlib
+import io
+import tempfile
+from datetime import datetime, timezone
+
+import requests
+from sqlalchemy import text
+
+FETCH_MANIFEST_TABLE = 'fetch_manifest'
+
+FETCH_MANIFEST_DDL = f"""
+CREATE TABLE IF NOT EXISTS {FETCH_MANIFEST_TABLE} (
+    source VARCHAR(255) NOT NULL PRIMARY KEY,
+    etag VARCHAR(255),
+    last_modified VARCHAR(64),
+    sha256 CHAR(64) NOT NULL,
+    updated_at DATETIME NOT NULL
+)
+"""
+
+
+class FetchedSource:
+    """A downloaded source whose body has changed since it was last committed to the manifest."""
+
+    def __init__(self, url, body, etag, last_modified, sha256):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.sha256 = sha256
+
+
+class FetchManifest:
+    """
+    Per-source ETag, Last-Modified and content hash of the last successfully ingested download.
+
+    fetch sends a conditional GET and returns None when the server answers 304 or the body
+    hashes to what was ingested last time, so unchanged sources skip parsing and DB writes.
+    The manifest lives in the database because the nightly job runs on a fresh machine, and
+    an entry is only written by commit, after the source's tables were updated.
+    """
+
+    def __init__(self, engine, session=None, timeout=120, block_size=1 << 20):
+        """
+        Initialize the manifest, creating its table if needed.
+
+        Args:
+            engine: SQLAlchemy engine holding the fetch_manifest table
+            session: Optional requests.Session used for downloads
+            timeout: Per-request timeout in seconds
+            block_size: Bytes per streamed block
+        """
+        self.engine = engine
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.block_size = block_size
+        with engine.begin() as connection:
+            connection.execute(text(FETCH_MANIFEST_DDL))
+            rows = connection.execute(text(f"SELECT source, etag, last_modified, sha256 FROM {FETCH_MANIFEST_TABLE}"))
+            self.entries = {row.source: dict(row._mapping) for row in rows}
+
+    def _conditional_headers(self, url):
+        entry = self.entries.get(url)
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def fetch(self, url, to_file=False):
+        """
+        Download url unless it is unchanged since the last commit.
+
+        Args:
+            url: Source URL
+            to_file: Spool the body to an anonymous temporary file instead of memory
+
+        Returns:
+            FetchedSource with a rewound, file-like body, or None if the source is unchanged
+            or the download failed
+        """
+        # Closing the streamed response hands its connection back to the session's pool on every path
+        with self.session.get(url, headers=self._conditional_headers(url), stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                print(f"✔ Not modified since last update, skipping: {url}")
+                return None
+            if not response.ok:
+                print(f"⚠ Failed to download {url} (status {response.status_code})")
+                return None
+
+            digest = hashlib.sha256()
+            body = tempfile.TemporaryFile() if to_file else io.BytesIO()
+            for block in response.iter_content(chunk_size=self.block_size):
+                digest.update(block)
+                body.write(block)
+            body.seek(0)
+            fetched = FetchedSource(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                    digest.hexdigest())
+
+        entry = self.entries.get(url)
+        if entry is not None and entry['sha256'] == fetched.sha256:
+            print(f"✔ Content unchanged since last update, skipping: {url}")
+            # Store the new validators so the next run can stop at a 304
+            self.commit(fetched)
+            body.close()
+            return None
+        return fetched
+
+    def commit(self, fetched):
+        """Record a source as ingested. Call only after its tables were written successfully."""
+        entry = {'source': fetched.url, 'etag': fetched.etag, 'last_modified': fetched.last_modified,
+                 'sha256': fetched.sha256}
+        with self.engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {FETCH_MANIFEST_TABLE} WHERE source = :source"),
+                               {'source': fetched.url})
+            connection.execute(text(f"INSERT INTO {FETCH_MANIFEST_TABLE} (source, etag, last_modified, sha256, updated_at) "
+                                    "VALUES (:source, :etag, :last_modified, :sha256, :updated_at)"),
+                               {**entry, 'updated_at': datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)})
+        self.entries[fetched.url] = entry
@@ -0,0 +1,76 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+def normalize_game_dates(dates):
+    """
+    Normalize game dates to 'YYYY-MM-DD' strings, the format the gamecenter API returns.
+
+    MoneyPuck's all_teams.csv stores gameDate as an integer like 20241015, while the
+    game_logs table may hold integers, strings or dates depending on how it was loaded.
+    """
+    dates = pd.Series(dates)
+    as_text = dates.astype(str).str.replace(r'\.0$', '', regex=True)
+    compact = as_text.str.fullmatch(r'\d{8}')
+    parsed = pd.to_datetime(as_text.where(compact), format='%Y%m%d', errors='coerce')
+    parsed = parsed.fillna(pd.to_datetime(dates.where(~compact), errors='coerce'))
+    return parsed.dt.strftime('%Y-%m-%d').where(parsed.notna(), None)
+
+
+def game_calendar_from_logs(game_logs):
+    """Reduce a game logs DataFrame (one row per team and situation) to one row per gameId."""
+    if game_logs is None or game_logs.empty:
+        return pd.DataFrame(columns=['gameId', 'gameDate'])
+    calendar = game_logs[['gameId', 'gameDate']].dropna().drop_duplicates(subset='gameId')
+    calendar = calendar.assign(gameId=calendar['gameId'].astype('int64'),
+                               gameDate=normalize_game_dates(calendar['gameDate']).to_numpy())
+    return calendar.dropna().reset_index(drop=True)
+
+
+def load_game_calendar(engine, game_ids):
+    """
+    Read gameId -> gameDate for the given games from the game_logs table.
+
+    Only the id range of the requested games is read, so the lookup stays small.
+    """
+    game_ids = pd.Series(game_ids).dropna().astype('int64')
+    if game_ids.empty:
+        return game_calendar_from_logs(None)
+    query = text("SELECT DISTINCT gameId, gameDate FROM game_logs WHERE gameId BETWEEN :low AND :high")
+    try:
+        with engine.connect() as connection:
+            game_logs = pd.read_sql(query, connection, params={'low': int(game_ids.min()), 'high': int(game_ids.max())})
+    except Exception as e:
+        if "doesn't exist" in str(e).lower() or "no such table" in str(e).lower():
+            print("Table 'game_logs' does not exist yet.")
+            return game_calendar_from_logs(None)
+        raise
+    return game_calendar_from_logs(game_logs)
+
+
+def resolve_game_dates(df, calendar, fetch_missing=None):
+    """
+    Add a gameDate column to df with a vectorized join on nhl_game_id.
+
+    Args:
+        df: DataFrame with an nhl_game_id column
+        calendar: DataFrame with gameId and gameDate columns (see game_calendar_from_logs)
+        fetch_missing: Optional callable taking a list of game ids and returning a
+            {game_id: gameDate} dict, used only for games missing from the calendar
+
+    Returns:
+        df with gameDate filled in as 'YYYY-MM-DD' strings
+    """
+    date_map = pd.Series(calendar['gameDate'].to_numpy(), index=calendar['gameId'].astype('int64').to_numpy())
+    date_map = date_map[~date_map.index.duplicated()]
+    game_ids = df['nhl_game_id'].astype('int64')
+    game_dates = game_ids.map(date_map)
+
+    missing = game_ids[game_dates.isna()].unique().tolist()
+    if missing and fetch_missing is not None:
+        print(f"Resolving {len(missing)} game dates from the NHL API")
+        fetched = pd.Series(fetch_missing(missing), dtype=object)
+        game_dates = game_dates.fillna(game_ids.map(fetched))
+
+    df['gameDate'] = game_dates.to_numpy()
+    return df
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TaskFailed(RuntimeError):
+    """Raised by TaskDAG.run when one or more tasks failed; dependents of a failed task are skipped."""
+
+    def __init__(self, errors, skipped):
+        self.errors = errors
+        self.skipped = skipped
+        names = ', '.join(f"{name} ({error})" for name, error in errors.items())
+        super().__init__(f"{len(errors)} task(s) failed: {names}")
+
+
+class TaskDAG:
+    """
+    Minimal dependency graph runner for the ingestion stages.
+
+    Each task runs on a thread pool as soon as all of its dependencies have finished, and
+    receives their results as positional arguments in the order the dependencies were
+    listed. Tasks that share a lock key never run at the same time, which is how DB writes
+    are serialized per table while downloads and parses of other sources carry on.
+    Wall-clock seconds of every task are kept in timings.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.results = {}
+        self.timings = {}
+        self.lock_waits = {}
+        self._locks = defaultdict(threading.Lock)
+
+    def add(self, name, func, deps=(), lock=None):
+        """
+        Add a task.
+
+        Args:
+            name: Unique task name, e.g. "download:game_logs"
+            func: Callable taking the results of deps as positional arguments
+            deps: Names of tasks that must finish first
+            lock: Optional key; tasks with the same key run one at a time
+        """
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self.tasks[name] = (func, list(deps), lock)
+        return name
+
+    def _check(self):
+        for name, (_, deps, _) in self.tasks.items():
+            for dep in deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task {name} depends on unknown task {dep}")
+        # Kahn's algorithm, only to reject cycles before anything runs
+        remaining = {name: set(deps) for name, (_, deps, _) in self.tasks.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between tasks: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _run_task(self, name, args):
+        func, _, lock = self.tasks[name]
+        if lock is None:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.timings[name] = time.perf_counter() - started
+        waiting = time.perf_counter()
+        with self._locks[lock]:
+            started = time.perf_counter()
+            self.lock_waits[name] = started - waiting
+            try:
+                return func(*args)
+            finally:
+                self.timings[name] = time.perf_counter() - started
+
+    def run(self, max_workers=6):
+        """
+        Run every task, respecting dependencies.
+
+        Returns:
+            dict: task name -> result, also kept in results
+
+        Raises:
+            TaskFailed: if any task raised, after every task not depending on it has run
+        """
+        self._check()
+        results, errors, skipped = self.results, {}, []
+        pending = dict(self.tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = pending[name][1]
+                    if any(dep in errors or dep in skipped for dep in deps):
+                        skipped.append(name)
+                        del pending[name]
+                    elif all(dep in results for dep in deps):
+                        args = [results[dep] for dep in deps]
+                        running[executor.submit(self._run_task, name, args)] = name
+                        del pending[name]
+                if not running:
+                    # Everything left depends on a failed task; the loop above just skipped it
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"⚠ Task {name} failed: {e}")
+                        errors[name] = e
+
+        if errors:
+            raise TaskFailed(errors, skipped)
+        return results
+
+    def report(self):
+        """Print per-stage timings, slowest first."""
+        print("Stage timings:")
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            waited = self.lock_waits.get(name, 0.0)
+            print(f"  {name:<40} {seconds:7.2f}s" + (f"  (waited {waited:.2f}s for lock)" if waited >= 0.01 else ""))
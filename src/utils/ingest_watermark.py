@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+WATERMARK_TABLE = 'ingested_games'
+
+WATERMARK_DDL = f"""
+CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+    table_name VARCHAR(64) NOT NULL,
+    nhl_game_id INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    ingested_at DATETIME NOT NULL,
+    PRIMARY KEY (table_name, nhl_game_id)
+)
+"""
+
+
+def ensure_watermark_table(engine):
+    """Create the ingested_games metadata table if it doesn't exist."""
+    with engine.begin() as connection:
+        connection.execute(text(WATERMARK_DDL))
+
+
+def _game_id_range(game_ids):
+    game_ids = pd.Series(game_ids).dropna().astype('int64')
+    if game_ids.empty:
+        return None
+    return {'low': int(game_ids.min()), 'high': int(game_ids.max())}, set(game_ids.tolist())
+
+
+def ingested_game_ids(engine, table_name, game_ids):
+    """
+    The subset of game_ids already ingested into table_name.
+
+    Only the primary key range of the requested games is read, so the lookup costs the
+    same no matter how many games the table already holds.
+    """
+    id_range = _game_id_range(game_ids)
+    if id_range is None:
+        return set()
+    params, requested = id_range
+    query = text(f"SELECT nhl_game_id FROM {WATERMARK_TABLE} "
+                 "WHERE table_name = :table_name AND nhl_game_id BETWEEN :low AND :high")
+    with engine.connect() as connection:
+        rows = connection.execute(query, {'table_name': table_name, **params})
+        return {row[0] for row in rows} & requested
+
+
+def mark_games_ingested(engine, table_name, row_counts):
+    """
+    Record games as ingested into table_name.
+
+    Args:
+        row_counts: Mapping (or Series) of nhl_game_id to the number of rows written
+    """
+    row_counts = pd.Series(row_counts)
+    if row_counts.empty:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    rows = [{'table_name': table_name, 'nhl_game_id': int(game_id), 'row_count': int(count), 'ingested_at': now}
+            for game_id, count in row_counts.items()]
+    with engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM {WATERMARK_TABLE} WHERE table_name = :table_name AND nhl_game_id = :nhl_game_id"),
+                           [{'table_name': row['table_name'], 'nhl_game_id': row['nhl_game_id']} for row in rows])
+        connection.execute(text(f"INSERT INTO {WATERMARK_TABLE} (table_name, nhl_game_id, row_count, ingested_at) "
+                                "VALUES (:table_name, :nhl_game_id, :row_count, :ingested_at)"), rows)
+
+
+def delete_game_rows(engine, table_names, game_ids):
+    """
+    Delete the rows of the given games from each table that exists.
+
+    Run before writing a batch of games so that rows left behind by a run that failed
+    before marking its games ingested are replaced rather than duplicated.
+    """
+    id_range = _game_id_range(game_ids)
+    if id_range is None:
+        return
+    existing_tables = set(inspect(engine).get_table_names())
+    game_ids = [{'nhl_game_id': game_id} for game_id in sorted(id_range[1])]
+    with engine.begin() as connection:
+        for table_name in table_names:
+            if table_name in existing_tables:
+                connection.execute(text(f"DELETE FROM {table_name} WHERE nhl_game_id = :nhl_game_id"), game_ids)
+
+
+def seed_watermark(engine, table_name):
+    """
+    Seed the watermark of table_name from the games it already holds.
+
+    Runs once per table: when the table has rows but no watermark entries yet, every game
+    in it is marked ingested with a single INSERT ... SELECT on the server.
+    """
+    ensure_watermark_table(engine)
+    if not inspect(engine).has_table(table_name):
+        return 0
+    with engine.begin() as connection:
+        seeded = connection.execute(text(f"SELECT 1 FROM {WATERMARK_TABLE} WHERE table_name = :table_name LIMIT 1"),
+                                    {'table_name': table_name}).first()
+        if seeded is not None:
+            return 0
+        result = connection.execute(text(
+            f"INSERT INTO {WATERMARK_TABLE} (table_name, nhl_game_id, row_count, ingested_at) "
+            f"SELECT :table_name, nhl_game_id, COUNT(*), :ingested_at FROM {table_name} GROUP BY nhl_game_id"),
+            {'table_name': table_name, 'ingested_at': datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)})
+    print(f"✔ Seeded watermark for '{table_name}' with {result.rowcount} games")
+    return result.rowcount
@@ -0,0 +1,50 @@
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from utils.shots_schema import SHOTS_INDEXES, shots_table_ddl
+from utils.migrate_shots_schema import copy_seasons, table_size
+
+# One-off migration: rebuild shots_data partitioned by season, with the covering indexes in
+# SHOTS_INDEXES. Rows are copied season by season into shots_data__partitioned before any
+# secondary index exists, the indexes are then built in one ALTER TABLE (a sorted build per
+# index instead of row-by-row inserts), and the table is swapped in with one RENAME TABLE.
+# The old table is kept as shots_data__unpartitioned until it is dropped by hand.
+# Run from src with: python -m utils.migrate_shots_partitions
+
+load_dotenv()
+
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+
+TABLE = 'shots_data'
+PARTITIONED_TABLE = f'{TABLE}__partitioned'
+OLD_TABLE = f'{TABLE}__unpartitioned'
+
+
+def add_indexes_sql(table_name):
+    return f"ALTER TABLE {table_name} " + ", ".join(
+        f"ADD INDEX {name} ({', '.join(columns)})" for name, columns in SHOTS_INDEXES.items())
+
+
+def migrate(engine):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {PARTITIONED_TABLE}"))
+        connection.execute(text(shots_table_ddl(PARTITIONED_TABLE, indexes=False)))
+    copy_seasons(engine, TABLE, PARTITIONED_TABLE)
+
+    with engine.begin() as connection:
+        connection.execute(text(add_indexes_sql(PARTITIONED_TABLE)))
+        print(f"✔ Built indexes {', '.join(SHOTS_INDEXES)}")
+        connection.execute(text(f"ANALYZE TABLE {TABLE}, {PARTITIONED_TABLE}")).fetchall()
+        before, after = table_size(connection, TABLE), table_size(connection, PARTITIONED_TABLE)
+        connection.execute(text(f"RENAME TABLE {TABLE} TO {OLD_TABLE}, {PARTITIONED_TABLE} TO {TABLE}"))
+
+    print(f"Data + index size: {before[2] / 1e6:.1f} MB -> {after[2] / 1e6:.1f} MB")
+    print(f"✔ '{TABLE}' is now partitioned by season; drop '{OLD_TABLE}' once it is no longer needed")
+
+
+if __name__ == '__main__':
+    engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
+    migrate(engine)
@@ -0,0 +1,67 @@
+import os
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from utils.shots_schema import SHOTS_TABLE_COLUMNS, shots_table_ddl
+
+# One-off migration: rebuild shots_data with the compact typed schema from utils/shots_schema.py.
+# Rows are copied season by season into shots_data__typed, which is then swapped in with one
+# RENAME TABLE. The old table is kept as shots_data__untyped until it is dropped by hand.
+# Run from src with: python -m utils.migrate_shots_schema
+
+load_dotenv()
+
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+
+TABLE = 'shots_data'
+TYPED_TABLE = f'{TABLE}__typed'
+OLD_TABLE = f'{TABLE}__untyped'
+
+
+def table_size(connection, table_name):
+    """Rows (estimated), average row length and data + index bytes from information_schema."""
+    return connection.execute(text(
+        "SELECT TABLE_ROWS, AVG_ROW_LENGTH, DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"), {'table_name': table_name}).first()
+
+
+def copy_seasons(engine, source, target):
+    """Copy every row of source into target, one season per transaction."""
+    columns = ', '.join(SHOTS_TABLE_COLUMNS)
+    with engine.connect() as connection:
+        seasons = [row[0] for row in connection.execute(text(f"SELECT DISTINCT season FROM {source} ORDER BY season"))]
+
+    for season in seasons:
+        # One transaction per season keeps the undo log small. Strict mode makes a value that
+        # doesn't fit its new column fail the copy instead of being clipped with a warning;
+        # only duplicate (nhl_game_id, shotID) rows are skipped, by the no-op update.
+        with engine.begin() as connection:
+            connection.execute(text("SET SESSION sql_mode = CONCAT_WS(',', @@SESSION.sql_mode, 'STRICT_ALL_TABLES')"))
+            result = connection.execute(text(
+                f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} WHERE season = :season "
+                "ON DUPLICATE KEY UPDATE shotID = shotID"),
+                {'season': season})
+        print(f"✔ Copied {result.rowcount} shots from season {season}")
+
+
+def migrate(engine):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {TYPED_TABLE}"))
+        connection.execute(text(shots_table_ddl(TYPED_TABLE)))
+    copy_seasons(engine, TABLE, TYPED_TABLE)
+
+    with engine.begin() as connection:
+        connection.execute(text(f"ANALYZE TABLE {TABLE}, {TYPED_TABLE}")).fetchall()
+        before, after = table_size(connection, TABLE), table_size(connection, TYPED_TABLE)
+        connection.execute(text(f"RENAME TABLE {TABLE} TO {OLD_TABLE}, {TYPED_TABLE} TO {TABLE}"))
+
+    print(f"Average row length: {before[1]} -> {after[1]} bytes")
+    print(f"Data + index size: {before[2] / 1e6:.1f} MB -> {after[2] / 1e6:.1f} MB")
+    print(f"✔ '{TABLE}' now uses the typed schema; drop '{OLD_TABLE}' once it is no longer needed")
+
+
+if __name__ == '__main__':
+    engine = create_engine(f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}")
+    migrate(engine)
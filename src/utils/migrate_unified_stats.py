@@ -0,0 +1,38 @@
+import os
+import pandas as pd
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from utils.unified_stats import ensure_compat_view, per_year_tables, write_unified_stats
+
+# One-off migration: load every per-year stats table (skaterstats_regular_2024, ...) into
+# the multi-season tables of utils/unified_stats.py, then replace each per-year table with
+# a view of the same name. The tables are kept as <name>__per_year until dropped by hand.
+# Run from src with: python -m utils.migrate_unified_stats
+
+PER_YEAR_SUFFIX = '__per_year'
+
+
+def migrate(engine, replace_tables=True):
+    tables = per_year_tables(engine)
+    for table_name in tables:
+        df = pd.read_sql(text(f"SELECT * FROM {table_name}"), engine)
+        write_unified_stats(engine, df, table_name)
+        print(f"✔ Merged {len(df)} rows of '{table_name}'")
+
+    if not replace_tables:
+        return tables
+    for table_name in tables:
+        # ALTER TABLE ... RENAME TO is the same statement on MySQL and SQLite
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {table_name} RENAME TO {table_name}{PER_YEAR_SUFFIX}"))
+        ensure_compat_view(engine, table_name)
+    print(f"✔ {len(tables)} per-year tables are now views; drop the '*{PER_YEAR_SUFFIX}' tables once they are no longer needed")
+    return tables
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    engine = create_engine(f"mysql+mysqlconnector://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
+                           f"@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}",
+                           connect_args={"allow_local_infile": True})
+    migrate(engine)
@@ -0,0 +1,169 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+NHL_STATS_API = "https://api.nhle.com/stats/rest/en"
+NHL_WEB_API = "https://api-web.nhle.com/v1"
+
+# gameState values from the gamecenter endpoint for games whose shift chart can no longer change
+FINAL_GAME_STATES = {'OFF', 'FINAL'}
+
+# Games played at least this many days ago are taken as final without asking the gamecenter
+FINAL_AFTER_DAYS = 2
+
+
+class NHLFetcher:
+    """
+    Concurrent fetcher for per-game NHL API data over one keep-alive session.
+
+    Requests run on a bounded thread pool and share a pooled requests.Session, so a
+    night of updates pays connection and TLS setup once per host instead of once per
+    game. Each host is limited to a fixed number of in-flight requests, and transient
+    failures are retried with exponential backoff. With a shift_cache, shift charts of
+    final games are read from disk and never downloaded twice.
+    """
+
+    def __init__(self, stats_base_url=NHL_STATS_API, web_base_url=NHL_WEB_API, max_workers=8,
+                 per_host_limit=4, retries=3, backoff_factor=0.5, timeout=30, session=None,
+                 shift_cache=None):
+        """
+        Initialize the fetcher.
+
+        Args:
+            stats_base_url: Base URL of the NHL stats REST API (shift charts)
+            web_base_url: Base URL of the NHL web API (gamecenter)
+            max_workers: Size of the thread pool used by the fetch_all_* methods
+            per_host_limit: Maximum concurrent requests to a single host
+            retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff factor between retries, in seconds
+            timeout: Per-request timeout in seconds
+            session: Optional pre-configured requests.Session
+            shift_cache: Optional ShiftChartCache for shift charts of final games
+        """
+        self.stats_base_url = stats_base_url.rstrip('/')
+        self.web_base_url = web_base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.session = session or self._create_session(retries, backoff_factor)
+        self.shift_cache = shift_cache
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+        # Landing payload fields by game id, so a game's date and state cost one request
+        self._landing = {}
+
+    def _create_session(self, retries, backoff_factor):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def get_json(self, url):
+        """GET a URL through the shared session, respecting the per-host limit."""
+        with self._host_limit(url):
+            response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_shifts(self, nhl_game_id, game_date=None):
+        if self.shift_cache is not None:
+            cached = self.shift_cache.get(nhl_game_id)
+            if cached is not None:
+                return cached
+
+        url = f"{self.stats_base_url}/shiftcharts?cayenneExp=gameId={nhl_game_id}"
+        try:
+            print(f"Fetching shifts for {nhl_game_id}")
+            shifts_data = self.get_json(url).get('data', [])
+        except requests.RequestException as e:
+            print(f"Error fetching shifts for game {nhl_game_id}: {e}")
+            return []
+
+        if self.shift_cache is not None and shifts_data:
+            self.shift_cache.put(nhl_game_id, shifts_data, final=self.is_final(nhl_game_id, game_date))
+        return shifts_data
+
+    def is_final(self, nhl_game_id, game_date=None):
+        """
+        Whether a game's shift chart can no longer change. Games dated FINAL_AFTER_DAYS or
+        more ago are; only recent or undated games are checked against the gamecenter.
+        """
+        if game_date:
+            played = pd.to_datetime(game_date, errors='coerce')
+            if not pd.isna(played) and played.date() <= date.today() - timedelta(days=FINAL_AFTER_DAYS):
+                return True
+        return self.fetch_game_state(nhl_game_id) in FINAL_GAME_STATES
+
+    def fetch_landing(self, nhl_game_id):
+        """gameDate and gameState from the gamecenter landing endpoint, fetched once per game."""
+        if nhl_game_id not in self._landing:
+            url = f"{self.web_base_url}/gamecenter/{nhl_game_id}/landing"
+            try:
+                landing = self.get_json(url)
+            except requests.RequestException as e:
+                print(f"Error fetching data for {nhl_game_id}: {e}")
+                return {}
+            self._landing[nhl_game_id] = {'gameDate': landing.get('gameDate'), 'gameState': landing.get('gameState')}
+        return self._landing[nhl_game_id]
+
+    def fetch_game_state(self, nhl_game_id):
+        """gameState from the gamecenter endpoint, e.g. 'FUT', 'LIVE', 'OFF' or 'FINAL'."""
+        return self.fetch_landing(nhl_game_id).get('gameState')
+
+    def fetch_game_date(self, nhl_game_id):
+        return self.fetch_landing(nhl_game_id).get('gameDate')
+
+    def fetch_many(self, fetch, game_ids):
+        """
+        Run fetch for every game id on the thread pool.
+
+        Returns:
+            dict: game id -> result, in the same order as game_ids
+        """
+        game_ids = list(dict.fromkeys(game_ids))
+        if not game_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(game_ids))) as executor:
+            results = executor.map(fetch, game_ids)
+            return dict(zip(game_ids, results))
+
+    def fetch_all_shifts(self, game_ids, game_dates=None):
+        """
+        Shift charts for every game id, keyed like the shifts_data_cache in process_shots.
+        game_dates ({game id: gameDate}) spares the gamecenter request for games known to be final.
+        """
+        game_dates = game_dates or {}
+        try:
+            return self.fetch_many(lambda nhl_game_id: self.fetch_shifts(nhl_game_id, game_dates.get(nhl_game_id)),
+                                   game_ids)
+        finally:
+            if self.shift_cache is not None:
+                self.shift_cache.flush()
+
+    def fetch_all_game_dates(self, game_ids):
+        """Game dates for every game id, keyed like the game_date_map in add_game_dates."""
+        return self.fetch_many(self.fetch_game_date, game_ids)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,6 @@
+import os
+
+
+def project_root():
+    """The repository root (the directory holding src and data), whatever directory the code runs from."""
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,137 @@
+import os
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+from dotenv import load_dotenv
+
+from utils.query_cache import bump_data_versions
+from utils.shot_on_ice import SHOT_ON_ICE_TABLE, games_with_shot_on_ice
+
+# One row per (player, game, strength) with the expected and actual goals for and against
+# while the player was on the ice, rolled up from the shot_on_ice bridge and shots_data.
+# The player xG% tools sum a few hundred of these rows instead of joining every shot of a
+# player's career. Strengths are disjoint ('even' or 'uneven'); 'all' is their sum.
+# gameDate is NULL for games whose date lookup failed at ingestion, as it is in shots_data:
+# they count toward last-n-games but match no date range, as with the shot-level queries.
+# Backfill an existing database from src with: python -m utils.player_game_xg
+
+PLAYER_GAME_XG_TABLE = 'player_game_xg'
+
+MYSQL_DDL = f"""
+CREATE TABLE IF NOT EXISTS {PLAYER_GAME_XG_TABLE} (
+    playerId INT NOT NULL,
+    nhl_game_id INT NOT NULL,
+    gameDate DATE NULL,
+    season SMALLINT UNSIGNED NOT NULL,
+    strength ENUM('even', 'uneven') NOT NULL,
+    xGF DOUBLE NOT NULL,
+    xGA DOUBLE NOT NULL,
+    GF SMALLINT UNSIGNED NOT NULL,
+    GA SMALLINT UNSIGNED NOT NULL,
+    PRIMARY KEY (playerId, nhl_game_id, strength),
+    KEY idx_player_game_xg_date (playerId, gameDate)
+)
+"""
+
+SQLITE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {PLAYER_GAME_XG_TABLE} (
+        playerId INTEGER NOT NULL,
+        nhl_game_id INTEGER NOT NULL,
+        gameDate TEXT,
+        season INTEGER NOT NULL,
+        strength TEXT NOT NULL CHECK (strength IN ('even', 'uneven')),
+        xGF REAL NOT NULL,
+        xGA REAL NOT NULL,
+        GF INTEGER NOT NULL,
+        GA INTEGER NOT NULL,
+        PRIMARY KEY (playerId, nhl_game_id, strength)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_player_game_xg_date ON {PLAYER_GAME_XG_TABLE} (playerId, gameDate)",
+]
+
+STRENGTH = "CASE WHEN s.awaySkatersOnIce = s.homeSkatersOnIce THEN 'even' ELSE 'uneven' END"
+
+# Games are rolled up in batches so the IN list stays a reasonable size
+BATCH_SIZE = 500
+
+
+def rollup_query(shots_table='shots_data'):
+    """INSERT ... SELECT of the rollup rows for the games bound to :game_ids."""
+    def side_sum(column, side):
+        return f"COALESCE(SUM(CASE WHEN o.side = '{side}' THEN s.{column} END), 0)"
+    return text(f"""
+        INSERT INTO {PLAYER_GAME_XG_TABLE} (playerId, nhl_game_id, gameDate, season, strength, xGF, xGA, GF, GA)
+        SELECT o.playerId, o.nhl_game_id, MIN(s.gameDate), MIN(s.season), {STRENGTH},
+               {side_sum('xGoal', 'shooting')}, {side_sum('xGoal', 'opposing')},
+               {side_sum('goal', 'shooting')}, {side_sum('goal', 'opposing')}
+        FROM {SHOT_ON_ICE_TABLE} AS o
+        JOIN {shots_table} AS s ON s.nhl_game_id = o.nhl_game_id AND s.shotID = o.shotID
+        WHERE o.nhl_game_id IN :game_ids
+        GROUP BY o.playerId, o.nhl_game_id, {STRENGTH}
+    """).bindparams(bindparam('game_ids', expanding=True))
+
+
+def undated_query(shots_table='shots_data'):
+    """Number of the games bound to :game_ids that have shots without a gameDate."""
+    return text(f"""
+        SELECT COUNT(DISTINCT nhl_game_id) FROM {shots_table}
+        WHERE nhl_game_id IN :game_ids AND gameDate IS NULL
+    """).bindparams(bindparam('game_ids', expanding=True))
+
+
+def ensure_player_game_xg_table(engine):
+    """Create the rollup table and its (playerId, gameDate) index if they don't exist."""
+    statements = SQLITE_DDL if engine.dialect.name == 'sqlite' else [MYSQL_DDL]
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def games_with_player_game_xg(engine):
+    """Set of nhl_game_ids that already have rollup rows."""
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text(f"SELECT DISTINCT nhl_game_id FROM {PLAYER_GAME_XG_TABLE}"))}
+
+
+def write_player_game_xg(engine, game_ids, shots_table='shots_data'):
+    """
+    Roll up the given games from shot_on_ice and shots_data.
+
+    Run after both have been written for these games, and after delete_game_rows has
+    cleared any rollup rows an earlier run left for them.
+
+    Returns:
+        int: Rollup rows written
+    """
+    game_ids = sorted(pd.Series(game_ids).dropna().astype('int64').unique().tolist())
+    if not game_ids:
+        return 0
+    ensure_player_game_xg_table(engine)
+    query = rollup_query(shots_table)
+    written = undated = 0
+    with engine.begin() as connection:
+        for start in range(0, len(game_ids), BATCH_SIZE):
+            batch = {'game_ids': game_ids[start:start + BATCH_SIZE]}
+            written += connection.execute(query, batch).rowcount
+            undated += connection.execute(undated_query(shots_table), batch).scalar()
+    if undated:
+        print(f"⚠ {undated} games rolled up into '{PLAYER_GAME_XG_TABLE}' without a gameDate")
+    return written
+
+
+def backfill_player_game_xg(engine, shots_table='shots_data'):
+    """Roll up every game that has bridge rows but no rollup rows yet."""
+    ensure_player_game_xg_table(engine)
+    todo = games_with_shot_on_ice(engine) - games_with_player_game_xg(engine)
+    print(f"{len(todo)} games need '{PLAYER_GAME_XG_TABLE}' rows")
+    return write_player_game_xg(engine, sorted(todo), shots_table)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    engine = create_engine(f"mysql+mysqlconnector://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
+                           f"@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}")
+    written = backfill_player_game_xg(engine)
+    bump_data_versions(engine, [PLAYER_GAME_XG_TABLE])
+    print(f"✔ {written} rows written to '{PLAYER_GAME_XG_TABLE}'")
@@ -0,0 +1,325 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from utils.unified_stats import STATS_KINDS, parse_stats_table
+
+# Ingestion bumps a table's version here whenever it writes the table; cached results are
+# keyed by the versions of the tables they read, so a write makes them unreachable.
+DATA_VERSIONS_TABLE = 'data_versions'
+
+DATA_VERSIONS_DDL = f"""
+CREATE TABLE IF NOT EXISTS {DATA_VERSIONS_TABLE} (
+    table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at DATETIME NOT NULL
+)
+"""
+
+DATA_VERSIONS_QUERY = f"SELECT table_name, version FROM {DATA_VERSIONS_TABLE}"
+
+# Pseudo-table the INFORMATION_SCHEMA lookups depend on; bumped whenever a load may have changed a schema
+SCHEMA_TABLE = 'information_schema'
+
+# Seconds a result may be served at most. Versions catch loads that go through ingestion;
+# the TTL bounds staleness from anything else (manual loads, a missing data_versions table).
+DEFAULT_TTL = 600
+TABLE_TTLS = {
+    SCHEMA_TABLE: 3600,
+    'bio_info': 3600,
+    'game_logs': 1800,
+    'shots_data': 1800,
+    'shot_on_ice': 1800,
+}
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_WHITESPACE = re.compile(r"\s+")
+_FROM_LIST = re.compile(
+    r"\bFROM\s+([^\s(].*?)(?=\b(?:WHERE|GROUP|ORDER|LIMIT|HAVING|WINDOW|UNION|JOIN|INNER|LEFT|RIGHT|CROSS|NATURAL|"
+    r"STRAIGHT_JOIN|ON|USING|FOR|INTO)\b|[()]|;|$)", re.IGNORECASE)
+_TABLE_AFTER_KEYWORD = re.compile(r"\b(?:JOIN|INTO|UPDATE|TABLE)\s+([`\w.]+)", re.IGNORECASE)
+_READ = re.compile(r"^\(?\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+# Results of these depend on more than the tables read
+_VOLATILE = re.compile(r"\b(?:NOW|CURDATE|CURTIME|CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|SYSDATE|UTC_DATE|"
+                       r"UTC_TIMESTAMP|RAND|UUID|LAST_INSERT_ID|CONNECTION_ID|FOUND_ROWS)\b|\bFOR\s+UPDATE\b",
+                       re.IGNORECASE)
+
+
+def normalize_sql(query):
+    """Query text with whitespace collapsed and trailing semicolons dropped; string literals are left as is."""
+    parts = []
+    position = 0
+    for match in _STRING.finditer(query):
+        parts.append(_WHITESPACE.sub(' ', query[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(_WHITESPACE.sub(' ', query[position:]))
+    return ''.join(parts).strip().rstrip(';').rstrip()
+
+
+def _table_name(reference):
+    name = reference.replace('`', '').lower()
+    schema, _, table = name.rpartition('.')
+    return SCHEMA_TABLE if schema == SCHEMA_TABLE else table
+
+
+def referenced_tables(query):
+    """
+    Lowercase names of the tables a query reads or writes.
+
+    Per-year stats names also pull in the multi-season table their view reads from. CTE
+    names are picked up as well, which only adds a table that never gets a version.
+    """
+    query = _STRING.sub("''", query)
+    references = _TABLE_AFTER_KEYWORD.findall(query)
+    for from_list in _FROM_LIST.findall(query):
+        references += [item.split()[0] for item in from_list.split(',') if item.strip()]
+
+    tables = set()
+    for reference in references:
+        table = _table_name(reference)
+        tables.add(table)
+        parsed = parse_stats_table(table)
+        if parsed:
+            tables.add(STATS_KINDS[parsed[0]][0])
+    return tuple(sorted(tables))
+
+
+def is_read(query):
+    return bool(_READ.match(query.lstrip()))
+
+
+def result_bytes(rows):
+    """Rough memory footprint of a result: the rows and the values in them."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else row
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+    return size
+
+
+def _copy(rows):
+    # Callers own what they get back; a cached result must not change under the next caller
+    if not isinstance(rows, list):
+        return rows
+    return [dict(row) if isinstance(row, dict) else row for row in rows]
+
+
+class CacheStats:
+    """Hit and miss counters of a QueryCache, updated under the cache's lock."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.uncached = 0
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        lookups = self.hits + self.misses
+        stats['hit_ratio'] = self.hits / lookups if lookups else 0.0
+        return stats
+
+
+class _Entry:
+    __slots__ = ('rows', 'tables', 'expires_at', 'size')
+
+    def __init__(self, rows, tables, expires_at, size):
+        self.rows = rows
+        self.tables = tables
+        self.expires_at = expires_at
+        self.size = size
+
+
+class QueryCache:
+    """
+    LRU cache of read query results, bounded by their estimated size in memory.
+
+    Results are keyed by normalized query text plus the data_versions stamp of every table
+    the query reads, and expire after the smallest TTL of those tables. The versions are
+    re-read at most every version_check seconds; entries of tables whose version moved are
+    dropped then. Writes sent through the cache invalidate the tables they touch.
+
+    Args:
+        max_bytes: Memory budget for cached results; 0 disables caching
+        ttls: table -> TTL in seconds, on top of TABLE_TTLS
+        default_ttl: TTL of tables not in ttls
+        version_check: Seconds between reads of the data_versions table
+        max_entry_fraction: Results larger than this share of max_bytes are not cached
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, ttls=None, default_ttl=DEFAULT_TTL, version_check=30.0,
+                 max_entry_fraction=0.125):
+        self.max_bytes = max_bytes
+        self.ttls = {**TABLE_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.version_check = version_check
+        self.max_entry_bytes = max_bytes * max_entry_fraction
+        self.stats = CacheStats()
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._versions_read_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Cache sized by QUERY_CACHE_MAX_MB, QUERY_CACHE_TTL and QUERY_CACHE_VERSION_CHECK, unless overridden."""
+        settings = {
+            'max_bytes': int(float(os.getenv("QUERY_CACHE_MAX_MB", 64)) * 2**20),
+            'default_ttl': float(os.getenv("QUERY_CACHE_TTL", DEFAULT_TTL)),
+            'version_check': float(os.getenv("QUERY_CACHE_VERSION_CHECK", 30)),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl(self, tables):
+        return min((self.ttls.get(table, self.default_ttl) for table in tables), default=self.default_ttl)
+
+    def _refresh_versions(self, read_versions):
+        now = time.monotonic()
+        if read_versions is None or (self._versions_read_at is not None
+                                     and now - self._versions_read_at < self.version_check):
+            return self._versions
+        versions = read_versions()
+        self._versions_read_at = now
+        if versions is None:
+            return self._versions
+        versions = {table.lower(): version for table, version in versions.items()}
+        changed = {table for table in versions.keys() | self._versions.keys()
+                   if versions.get(table) != self._versions.get(table)}
+        self._versions = versions
+        if changed:
+            self.invalidate(changed)
+        return versions
+
+    def versions(self, read_versions):
+        """{table: version} from data_versions, re-read at most every version_check seconds."""
+        return self._refresh_versions(read_versions)
+
+    def fetch(self, query, run, read_versions=None, params=None):
+        """
+        Result of query, from the cache if possible.
+
+        Args:
+            query: SQL text
+            run: Callable running query against the database and returning its rows
+            read_versions: Callable returning {table: version} from data_versions, or None if unavailable
+            params: Values bound to the query's placeholders, part of the key
+
+        Returns:
+            What run returned, or a copy of the cached result
+        """
+        normalized = normalize_sql(query)
+        tables = referenced_tables(normalized)
+        if not is_read(normalized):
+            try:
+                return run(query)
+            finally:
+                self.invalidate(tables)
+        if self.max_bytes <= 0 or not tables or _VOLATILE.search(normalized):
+            with self._lock:
+                self.stats.uncached += 1
+            return run(query)
+
+        versions = self._refresh_versions(read_versions)
+        key = (normalized, tuple(params or ()), tuple(versions.get(table, 0) for table in tables))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return _copy(entry.rows)
+            if entry is not None:
+                self._remove(key)
+                self.stats.expired += 1
+            self.stats.misses += 1
+
+        rows = run(query)
+        if isinstance(rows, list):
+            self._put(key, _copy(rows), tables, now + self.ttl(tables))
+        return rows
+
+    def _put(self, key, rows, tables, expires_at):
+        size = result_bytes(rows)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self.stats.uncached += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(rows, frozenset(tables), expires_at, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key).size
+
+    def invalidate(self, tables=None):
+        """Drop cached results reading any of tables, or every result if tables is None."""
+        with self._lock:
+            if tables is None:
+                stale = list(self._entries)
+            else:
+                tables = {table.lower() for table in tables}
+                stale = [key for key, entry in self._entries.items() if entry.tables & tables]
+            for key in stale:
+                self._remove(key)
+            self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def metrics(self):
+        stats = self.stats.as_dict()
+        stats.update(entries=len(self._entries), bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
+
+
+def ensure_data_versions_table(engine):
+    """Create the data_versions metadata table if it doesn't exist."""
+    with engine.begin() as connection:
+        connection.execute(text(DATA_VERSIONS_DDL))
+
+
+def bump_data_versions(engine, table_names):
+    """
+    Record that the given tables changed, so cached results reading them are not served again.
+
+    Called by ingestion after it writes a table. Serving processes notice within their
+    cache's version_check interval.
+    """
+    names = sorted({name.lower() for name in table_names})
+    if not names:
+        return
+    ensure_data_versions_table(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    with engine.begin() as connection:
+        for name in names:
+            updated = connection.execute(
+                text(f"UPDATE {DATA_VERSIONS_TABLE} SET version = version + 1, updated_at = :now WHERE table_name = :name"),
+                {'name': name, 'now': now}).rowcount
+            if not updated:
+                connection.execute(
+                    text(f"INSERT INTO {DATA_VERSIONS_TABLE} (table_name, version, updated_at) VALUES (:name, 1, :now)"),
+                    {'name': name, 'now': now})
+
+
+def data_version(engine, table_name):
+    """Current data_versions stamp of table_name; 0 if it has never been bumped."""
+    ensure_data_versions_table(engine)
+    with engine.connect() as connection:
+        version = connection.execute(text(f"SELECT version FROM {DATA_VERSIONS_TABLE} WHERE table_name = :name"),
+                                     {'name': table_name.lower()}).scalar()
+    return version or 0
@@ -0,0 +1,113 @@
+import threading
+import time
+import weakref
+
+import mysql.connector
+from utils import database_init
+from utils.db_pool import checkout
+from utils.query_metrics import QUERY_METRICS, note_execution
+
+# Named statements with %s placeholders, run as server-side prepared statements. Each
+# pooled connection prepares a statement once and re-executes it with new values, so
+# MySQL parses and plans it once per connection instead of once per distinct literal.
+CATALOG = {}
+
+# connection -> {statement name: prepared cursor}
+_PREPARED = weakref.WeakKeyDictionary()
+_PREPARED_LOCK = threading.Lock()
+
+
+def register(name, sql):
+    """Add a statement to the catalog and return its name."""
+    if CATALOG.get(name, sql) != sql:
+        raise ValueError(f"Statement '{name}' is already registered with different SQL")
+    CATALOG[name] = sql
+    return name
+
+
+def in_placeholders(count):
+    """'%s, %s, ...' for an IN list of count values."""
+    if count < 1:
+        raise ValueError("An IN list needs at least one value")
+    return ', '.join(['%s'] * count)
+
+
+def _cursors(connection):
+    with _PREPARED_LOCK:
+        try:
+            return _PREPARED.setdefault(connection, {})
+        except TypeError:  # Not weak-referenceable: prepare per call
+            return {}
+
+
+def _execute(cursor, sql, params):
+    started = time.perf_counter()
+    cursor.execute(sql, params)
+    executed = time.perf_counter()
+    rows = [dict(row) for row in cursor.fetchall()]
+    note_execution(executed - started, time.perf_counter() - executed)
+    return rows
+
+
+def _run_prepared(db_connection, name, sql, params):
+    with checkout(db_connection) as connection:
+        cursors = _cursors(connection)
+        cursor = cursors.get(name)
+        if cursor is not None:
+            try:
+                return _execute(cursor, sql, params)
+            except mysql.connector.Error:
+                # A reconnect (see ConnectionPool's health check) drops the session's prepared
+                # statements; prepare everything again on this connection
+                for stale in cursors.values():
+                    try:
+                        stale.close()
+                    except Exception:
+                        pass
+                cursors.clear()
+        cursor = cursors[name] = connection.cursor(prepared=True, dictionary=True)
+        return _execute(cursor, sql, params)
+
+
+def run_statement(db_connection, name, params=(), use_cache=True):
+    """
+    Run a catalog statement and return its rows as dicts, like run_query_mysql.
+
+    Args:
+        db_connection: ConnectionPool or connection
+        name: Catalog name of the statement
+        params: Values for its %s placeholders, in order
+        use_cache: Serve repeated (statement, params) from database_init.QUERY_CACHE
+
+    Returns:
+        list of dicts, or None if the query failed
+    """
+    sql = CATALOG[name]
+    params = tuple(params)
+
+    try:
+        with QUERY_METRICS.measure(sql) as measurement:
+            run = measurement.run(lambda _: _run_prepared(db_connection, name, sql, params))
+            if use_cache:
+                return measurement.result(database_init.QUERY_CACHE.fetch(
+                    sql, run, read_versions=lambda: database_init.read_data_versions(db_connection), params=params))
+            return measurement.result(run(sql))
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        return None
+
+
+PLAYER_ID_BY_NAME = register('player_id_by_name', "SELECT playerId FROM bio_info WHERE name LIKE %s")
+
+
+def player_name_pattern(player_name):
+    """LIKE pattern matching player_name anywhere in a name, as the f-string lookups did."""
+    return f"%{player_name}%"
+
+
+def find_player_id(db, player_name):
+    """playerId of the first bio_info row whose name contains player_name, or None."""
+    result = run_statement(db, PLAYER_ID_BY_NAME, [player_name_pattern(player_name)])
+    if result and isinstance(result, list) and isinstance(result[0], dict):
+        return result[0].get("playerId")
+    return None
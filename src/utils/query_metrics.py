@@ -0,0 +1,399 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from utils.query_cache import result_bytes
+
+# Per-query instrumentation for the database layer. Every query run through
+# run_query_mysql, a catalog statement, the SQL governor or fetch_frame leaves one record:
+# the tool that asked for it, the query's fingerprint (its text with literals replaced),
+# execution and fetch time, rows, approximate bytes and whether the cache answered.
+# Records feed a latency histogram per (tool, fingerprint), a rolling window of recent
+# records for finding the worst offenders, and a log of slow queries.
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Queries slower than this (end to end, in seconds) are written to the slow query log
+SLOW_QUERY_SECONDS = 1.0
+SLOW_QUERY_LOG = "logs/slow_queries.log"
+
+# Most recent records kept for top()
+WINDOW = 10_000
+
+# Most (tool, fingerprint) series kept. Generated SQL has no fixed set of shapes, so past
+# this a tool's new shapes share its OVERFLOW_FINGERPRINT series; existing series keep
+# counting, so the exported counters never go backwards.
+MAX_SERIES = 2000
+OVERFLOW_FINGERPRINT = 'other'
+
+# Longest query text written to the slow log
+_LOGGED_QUERY_CHARS = 4000
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Tool named by tool_scope for the queries run inside it
+_TOOL = contextvars.ContextVar('query_tool', default=None)
+# Measurement whose query is executing right now, for note_execution
+_MEASUREMENT = contextvars.ContextVar('query_measurement', default=None)
+
+
+def fingerprint(query):
+    """
+    query with comments dropped, literals and placeholders replaced by ?, value lists
+    collapsed and whitespace normalized, so one query shape is one series whatever its values.
+    """
+    text = _COMMENT.sub(' ', query)
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _VALUE_LIST.sub('(?+)', text)
+    return _WHITESPACE.sub(' ', text).strip().rstrip(';').rstrip()
+
+
+def fingerprint_id(text):
+    """Short stable id of a fingerprint, for metric labels and log lines."""
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def _caller():
+    # The first frame outside utils: the tool function, chain step or script that ran the query
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not (module.startswith(('utils.', 'src.utils.', 'contextlib')) or module in ('utils', 'src.utils')):
+            code = frame.f_code
+            return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def current_tool():
+    """Tool the running query is attributed to: the innermost tool_scope, else the calling function."""
+    return _TOOL.get() or _caller()
+
+
+@contextmanager
+def tool_scope(name):
+    """Attribute every query run inside the with block to name."""
+    token = _TOOL.set(name)
+    try:
+        yield
+    finally:
+        _TOOL.reset(token)
+
+
+def instrument_tool(tool):
+    """Run a LangChain tool's function in a tool_scope named after the tool; returns the tool."""
+    func = tool.func
+
+    @wraps(func)
+    def scoped(*args, **kwargs):
+        with tool_scope(tool.name):
+            return func(*args, **kwargs)
+
+    tool.func = scoped
+    return tool
+
+
+def note_execution(execute_seconds, fetch_seconds):
+    """Report time spent executing a query and fetching its rows to the measurement running it, if any."""
+    measurement = _MEASUREMENT.get()
+    if measurement is not None:
+        measurement.execute_seconds += execute_seconds
+        measurement.fetch_seconds += fetch_seconds
+
+
+def approximate_bytes(result):
+    """Rough in-memory size of a query result: a list of rows or a DataFrame."""
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=False, deep=False).sum())
+    return result_bytes(result) if isinstance(result, list) else 0
+
+
+class Measurement:
+    """One query being measured; see QueryMetrics.measure."""
+
+    def __init__(self, query, tool):
+        self.query = query
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.execute_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.ran = False
+        self.rows = None
+        self.bytes = None
+
+    def run(self, run):
+        """
+        Wrap a cache's run callable: time spent in it is this query's, and a query whose
+        run was never called was answered by the cache.
+        """
+        @wraps(run)
+        def measured(*args, **kwargs):
+            self.ran = True
+            token = _MEASUREMENT.set(self)
+            try:
+                return run(*args, **kwargs)
+            finally:
+                _MEASUREMENT.reset(token)
+        return measured
+
+    def result(self, result):
+        """Record the rows the query returned; returns result."""
+        if result is not None:
+            self.rows = len(result)
+            self.bytes = approximate_bytes(result)
+        return result
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'seconds', 'execute_seconds', 'fetch_seconds', 'rows', 'bytes',
+                 'cache_hits', 'errors', 'query')
+
+    def __init__(self, query, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.execute_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.query = query
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)] if values else 0.0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class QueryMetrics:
+    """
+    Latency histograms and recent records of the queries this process ran, thread-safe.
+
+    Args:
+        buckets: Upper bounds of the latency buckets, in seconds
+        window: Most recent records kept for top()
+        slow_seconds: Queries at least this slow are written to slow_log; None logs none
+        slow_log: Path of the slow query log (JSON lines, rotated at 10 MB), or None
+        max_series: Most (tool, fingerprint) series kept before new shapes go to OVERFLOW_FINGERPRINT
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=WINDOW, slow_seconds=SLOW_QUERY_SECONDS, slow_log=SLOW_QUERY_LOG,
+                 max_series=MAX_SERIES):
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self.slow_seconds = slow_seconds
+        self.slow_log = slow_log
+        self.recent = deque(maxlen=window)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._slow_logger = None
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """
+        Metrics set by QUERY_SLOW_MS, QUERY_SLOW_LOG, QUERY_METRICS_WINDOW and
+        QUERY_METRICS_MAX_SERIES, unless overridden.
+        """
+        settings = {
+            'slow_seconds': float(os.getenv("QUERY_SLOW_MS", SLOW_QUERY_SECONDS * 1000)) / 1000,
+            'slow_log': os.getenv("QUERY_SLOW_LOG", SLOW_QUERY_LOG) or None,
+            'window': int(os.getenv("QUERY_METRICS_WINDOW", WINDOW)),
+            'max_series': int(os.getenv("QUERY_METRICS_MAX_SERIES", MAX_SERIES)),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @contextmanager
+    def measure(self, query, tool=None):
+        """
+        Measure one query for the duration of the with block, which yields a Measurement.
+        Pass the database call through measurement.run and its result through
+        measurement.result; an exception is recorded as an error and re-raised.
+        """
+        measurement = Measurement(query, tool or current_tool())
+        try:
+            yield measurement
+        except BaseException as err:
+            self.record(measurement, error=getattr(err, 'reason', None) or type(err).__name__)
+            raise
+        self.record(measurement)
+
+    def record(self, measurement, error=None):
+        seconds = time.perf_counter() - measurement.started
+        shape = fingerprint(measurement.query)
+        record = {
+            'tool': measurement.tool,
+            'fingerprint': fingerprint_id(shape),
+            'seconds': seconds,
+            'execute_seconds': measurement.execute_seconds,
+            'fetch_seconds': measurement.fetch_seconds,
+            'rows': measurement.rows or 0,
+            'bytes': measurement.bytes or 0,
+            'cache_hit': not measurement.ran and error is None,
+            'error': error,
+        }
+        bucket = next((index for index, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            key = (record['tool'], record['fingerprint'])
+            if key not in self._series and len(self._series) >= self.max_series:
+                key = (record['tool'], OVERFLOW_FINGERPRINT)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(shape if key[1] != OVERFLOW_FINGERPRINT else None,
+                                                     len(self.buckets))
+            series.buckets[bucket] += 1
+            series.count += 1
+            series.seconds += seconds
+            series.execute_seconds += record['execute_seconds']
+            series.fetch_seconds += record['fetch_seconds']
+            series.rows += record['rows']
+            series.bytes += record['bytes']
+            series.cache_hits += record['cache_hit']
+            series.errors += error is not None
+            self.recent.append(record)
+        if self.slow_log and self.slow_seconds is not None and seconds >= self.slow_seconds:
+            self._log_slow(record, measurement.query)
+        return record
+
+    def _log_slow(self, record, query):
+        with self._lock:
+            if self._slow_logger is None:
+                Path(self.slow_log).parent.mkdir(parents=True, exist_ok=True)
+                logger = logging.getLogger(f"{__name__}.slow.{id(self)}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                logger.addHandler(RotatingFileHandler(self.slow_log, maxBytes=10 * 2**20, backupCount=3, encoding='utf-8'))
+                self._slow_logger = logger
+        entry = dict(record, at=datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                     query=query[:_LOGGED_QUERY_CHARS])
+        self._slow_logger.info(json.dumps(entry, default=str))
+
+    def top(self, n=10):
+        """
+        The n (tool, fingerprint) series of the rolling window that took the most time in total,
+        with their count, p50/p95/max seconds, rows, bytes and cache hit ratio.
+        """
+        with self._lock:
+            records = list(self.recent)
+            shapes = {key: series.query for key, series in self._series.items()}
+        grouped = {}
+        for record in records:
+            grouped.setdefault((record['tool'], record['fingerprint']), []).append(record)
+        summaries = []
+        for (tool, query_id), group in grouped.items():
+            seconds = [record['seconds'] for record in group]
+            summaries.append({
+                'tool': tool,
+                'fingerprint': query_id,
+                'query': shapes.get((tool, query_id)),
+                'count': len(group),
+                'total_seconds': sum(seconds),
+                'p50_seconds': _percentile(seconds, 0.5),
+                'p95_seconds': _percentile(seconds, 0.95),
+                'max_seconds': max(seconds),
+                'rows': sum(record['rows'] for record in group),
+                'bytes': sum(record['bytes'] for record in group),
+                'cache_hit_ratio': sum(record['cache_hit'] for record in group) / len(group),
+                'errors': sum(record['error'] is not None for record in group),
+            })
+        return sorted(summaries, key=lambda summary: summary['total_seconds'], reverse=True)[:n]
+
+    def render(self):
+        """Every series in the Prometheus text exposition format, for a /metrics endpoint."""
+        with self._lock:
+            series = [(key, value.buckets[:], value.count, value.seconds, value.execute_seconds, value.fetch_seconds,
+                       value.rows, value.bytes, value.cache_hits, value.errors) for key, value in self._series.items()]
+        lines = ['# HELP nhl_query_seconds End-to-end query latency by tool and query fingerprint',
+                 '# TYPE nhl_query_seconds histogram']
+        counters = {
+            'nhl_query_execute_seconds_total': ('Time executing queries', 4),
+            'nhl_query_fetch_seconds_total': ('Time fetching result rows', 5),
+            'nhl_query_rows_total': ('Rows returned', 6),
+            'nhl_query_bytes_total': ('Approximate bytes returned', 7),
+            'nhl_query_cache_hits_total': ('Queries answered by the result cache', 8),
+            'nhl_query_errors_total': ('Queries that failed or were rejected', 9),
+        }
+        for (tool, query_id), buckets, count, seconds, *_ in series:
+            labels = f'tool="{_label(tool)}",fingerprint="{query_id}"'
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += observed
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'nhl_query_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'nhl_query_seconds_sum{{{labels}}} {seconds}')
+            lines.append(f'nhl_query_seconds_count{{{labels}}} {count}')
+        for name, (description, position) in counters.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for entry in series:
+                (tool, query_id) = entry[0]
+                lines.append(f'{name}{{tool="{_label(tool)}",fingerprint="{query_id}"}} {entry[position]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.recent.clear()
+
+
+# Shared by every session of this process
+QUERY_METRICS = QueryMetrics.from_env()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = QUERY_METRICS
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body, content_type = self.metrics.render(), 'text/plain; version=0.0.4'
+        elif self.path.split('?')[0] == '/metrics/top':
+            body, content_type = json.dumps(self.metrics.top(25), indent=2, default=str), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the app's own output
+
+
+def serve_metrics(port, host='127.0.0.1', metrics=QUERY_METRICS):
+    """
+    Serve metrics.render() at /metrics and the worst query series as JSON at /metrics/top
+    from a daemon thread; returns the server.
+    """
+    handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='query-metrics', daemon=True).start()
+    print(f"✔ Serving query metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,192 @@
+import os
+import re
+import time
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+from utils.db_pool import checkout
+from utils.query_metrics import QUERY_METRICS, note_execution
+
+try:
+    import pyarrow as pa
+except ImportError:  # Only the 'arrow' backend of fetch_columns needs pyarrow
+    pa = None
+
+# Rows fetched from the server per round trip
+BATCH_SIZE = 50_000
+
+# Default cap for callers that pull shot-level data for plots; a query past it is refused
+# rather than held in memory
+MAX_ROWS = int(os.getenv("QUERY_STREAM_MAX_ROWS", 1_000_000))
+
+
+# A trailing top-level LIMIT: LIMIT n, LIMIT offset, n or LIMIT n OFFSET m
+_LIMIT = re.compile(r"\bLIMIT\s+(?:(\d+)\s*,\s*)?(\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+
+
+class ResultTooLarge(RuntimeError):
+    """Raised when a streamed query returns more rows than its max_rows."""
+
+
+def top_level(query):
+    """query with quoted text, comments and everything inside parentheses blanked, positions kept."""
+    masked, depth, i = [], 0, 0
+    while i < len(query):
+        char = query[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < len(query) and query[end] != char:
+                end += 2 if query[end] == '\\' else 1
+            masked.append(' ' * (min(end, len(query) - 1) - i + 1))
+            i = end + 1
+            continue
+        if query.startswith('--', i) or query.startswith('#', i):
+            end = query.find('\n', i)
+            end = len(query) if end == -1 else end
+            masked.append(' ' * (end - i))
+            i = end
+            continue
+        if query.startswith('/*', i):
+            end = query.find('*/', i + 2)
+            end = len(query) if end == -1 else end + 2
+            masked.append(' ' * (end - i))
+            i = end
+            continue
+        if char == '(':
+            depth += 1
+        masked.append(char if depth == 0 else ' ')
+        if char == ')':
+            depth = max(depth - 1, 0)
+        i += 1
+    return ''.join(masked)
+
+
+def capped_query(query, max_rows):
+    """
+    query limited to max_rows + 1 rows on the server, so refusing an oversized result
+    never reads more than one row past the cap.
+
+    The cap is the query's own top-level LIMIT, lowered or added, rather than a derived
+    table around it: MySQL refuses a derived table with two columns of the same name,
+    which SELECT a.*, b.* over a join easily returns.
+    """
+    query = query.strip().rstrip(';').rstrip()
+    cap = int(max_rows) + 1
+    limit = _LIMIT.search(top_level(query))
+    if limit is None:
+        return f"{query}\nLIMIT {cap}"
+    if int(limit.group(2)) > cap:
+        return query[:limit.start(2)] + str(cap) + query[limit.end(2):]
+    return query
+
+
+def iter_query_batches(query, db_connection, batch_size=BATCH_SIZE, max_rows=None):
+    """
+    Stream a query's rows from an unbuffered cursor, batch_size tuples at a time.
+
+    Yields:
+        (column names, list of row tuples); one empty batch if the query has no rows
+
+    Raises:
+        ResultTooLarge: The query has more than max_rows rows
+    """
+    if max_rows is not None:
+        query = capped_query(query, max_rows)
+    with checkout(db_connection) as connection:
+        # Unbuffered and without dictionary=True: rows come off the wire as tuples, one batch at a time
+        cursor = connection.cursor(buffered=False)
+        exhausted = False
+        started = time.perf_counter()
+        execute_seconds = fetch_seconds = 0.0
+        try:
+            cursor.execute(query)
+            execute_seconds = time.perf_counter() - started
+            columns = [description[0] for description in cursor.description]
+            fetched = 0
+            while True:
+                fetch_started = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                fetch_seconds += time.perf_counter() - fetch_started
+                if not rows:
+                    exhausted = True
+                    if not fetched:
+                        # Still report the columns of an empty result
+                        yield columns, []
+                    break
+                fetched += len(rows)
+                if max_rows is not None and fetched > max_rows:
+                    raise ResultTooLarge(f"Query returned more than {max_rows} rows; narrow it down")
+                yield columns, rows
+        finally:
+            note_execution(execute_seconds, fetch_seconds)
+            if not exhausted and hasattr(connection, 'consume_results'):
+                # An unbuffered result must be read to the end before the connection can run another query
+                try:
+                    connection.consume_results()
+                except Exception:
+                    pass
+            cursor.close()
+
+
+def iter_query_frames(query, db_connection, batch_size=BATCH_SIZE, max_rows=None):
+    """A query's rows as a generator of DataFrame chunks of up to batch_size rows."""
+    for columns, rows in iter_query_batches(query, db_connection, batch_size, max_rows):
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def fetch_columns(query, db_connection, backend='numpy', batch_size=BATCH_SIZE, max_rows=None):
+    """
+    A query's result as columns, built batch by batch without a dict per row.
+
+    Args:
+        backend: 'numpy' for {column: ndarray}, 'arrow' for a pyarrow.Table
+
+    Returns:
+        {column: numpy array} or pyarrow.Table
+    """
+    if backend not in ('numpy', 'arrow'):
+        raise ValueError(f"Unknown backend {backend!r}")
+    if backend == 'arrow' and pa is None:
+        raise ImportError("pyarrow is required for backend='arrow'; install it with pip install pyarrow")
+
+    columns, chunks = [], []
+    for columns, rows in iter_query_batches(query, db_connection, batch_size, max_rows):
+        if not chunks:
+            chunks = [[] for _ in columns]
+        for chunk, values in zip(chunks, zip(*rows)):
+            chunk.append(pa.array(values) if backend == 'arrow' else np.asarray(values))
+
+    if backend == 'arrow':
+        return pa.table({name: _arrow_column(chunk) for name, chunk in zip(columns, chunks)})
+    return {name: np.concatenate(chunk) if chunk else np.array([]) for name, chunk in zip(columns, chunks)}
+
+
+def _arrow_column(chunks):
+    # A batch that is all NULL infers the null type; give it the type of the other batches
+    types = {chunk.type for chunk in chunks if chunk.type != pa.null()}
+    if len(types) != 1:
+        return pa.chunked_array(chunks, type=pa.null() if not types else None)
+    column_type = types.pop()
+    return pa.chunked_array([chunk.cast(column_type) for chunk in chunks], type=column_type)
+
+
+def fetch_frame(query, db_connection, batch_size=BATCH_SIZE, max_rows=None):
+    """A query's result as one DataFrame, streamed in batches."""
+    with QUERY_METRICS.measure(query) as measurement:
+        frames = measurement.run(lambda: list(iter_query_frames(query, db_connection, batch_size, max_rows)))()
+        return measurement.result(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+
+
+def fetch_shot_frame(query, db_connection):
+    """
+    Shot-level rows for plots and xG tables, capped at MAX_ROWS. An empty DataFrame if the
+    query failed, as pd.DataFrame(run_query_mysql(...)) gave; ValueError past the cap.
+    """
+    try:
+        return fetch_frame(query, db_connection, max_rows=MAX_ROWS)
+    except ResultTooLarge as err:
+        raise ValueError(f"{err}. Please try again with a narrower query.") from err
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        return pd.DataFrame()
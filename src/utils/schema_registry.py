@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+
+from utils.paths import project_root
+from utils.database_init import get_table_info, read_data_versions, run_query_mysql
+from utils.query_cache import SCHEMA_TABLE
+
+SNAPSHOT_FORMAT = 1
+
+# Every column of every table in one pass, instead of one INFORMATION_SCHEMA query per table per question
+COLUMNS_QUERY = """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+
+def default_snapshot_path():
+    """data/schema/snapshot.json under the project root, unless SCHEMA_SNAPSHOT_PATH is set."""
+    return os.getenv("SCHEMA_SNAPSHOT_PATH", os.path.join(project_root(), 'data', 'schema', 'snapshot.json'))
+
+
+class SchemaRegistry:
+    """
+    Column lists of every table, loaded once and rendered into prompt fragments.
+
+    The schema is tagged with the information_schema version ingestion bumps in
+    data_versions (see utils.query_cache). It is reloaded only when that version moves,
+    checked at most every version_check seconds, and saved to a snapshot file so a restart
+    with an unchanged schema doesn't read INFORMATION_SCHEMA at all.
+
+    Args:
+        db: ConnectionPool or connection
+        snapshot_path: JSON snapshot file, defaults to default_snapshot_path(); '' disables it
+        version_check: Seconds between reads of the schema version
+    """
+
+    def __init__(self, db, snapshot_path=None, version_check=60.0):
+        self.db = db
+        self.snapshot_path = default_snapshot_path() if snapshot_path is None else snapshot_path
+        self.version_check = version_check
+        self.version = None
+        self.tables = None  # table name -> [{'COLUMN_NAME': ..., 'DATA_TYPE': ...}]
+        self.loads = 0
+        self._lower_names = {}
+        self._prompts = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _schema_version(self):
+        versions = read_data_versions(self.db)
+        return None if versions is None else versions.get(SCHEMA_TABLE)
+
+    def _set_tables(self, tables, version):
+        self.tables = tables
+        self.version = version
+        self._lower_names = {name.lower(): name for name in tables}
+        self._prompts = {}
+
+    def _read_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Schema snapshot unreadable, ignoring it: {e}")
+            return None
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            return None
+        return snapshot
+
+    def _write_snapshot(self):
+        if not self.snapshot_path:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': SNAPSHOT_FORMAT, 'version': self.version, 'tables': self.tables}, f, indent=1)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _read_database(self):
+        rows = run_query_mysql(COLUMNS_QUERY, self.db, use_cache=False)
+        if rows is None:
+            return None
+        tables = {}
+        for row in rows:
+            tables.setdefault(row['TABLE_NAME'], []).append(
+                {'COLUMN_NAME': row['COLUMN_NAME'], 'DATA_TYPE': row['DATA_TYPE']})
+        return tables
+
+    def load(self, version=None):
+        """Load the schema from the snapshot if it is for the current version, else from the database."""
+        with self._lock:
+            version = self._schema_version() if version is None else version
+            self._checked_at = time.monotonic()
+            snapshot = self._read_snapshot()
+            if snapshot is not None and version is not None and snapshot['version'] == version:
+                self._set_tables(snapshot['tables'], version)
+                return self
+
+            tables = self._read_database()
+            if tables is None:
+                if snapshot is not None and self.tables is None:
+                    # Better an older schema than none; reloaded once the database answers
+                    print("⚠ Could not read the schema, using the snapshot")
+                    self._set_tables(snapshot['tables'], None)
+                return self
+            self._set_tables(tables, version)
+            self.loads += 1
+            print(f"✔ Loaded the schema of {len(tables)} tables (version {version})")
+            if version is not None:
+                self._write_snapshot()
+            return self
+
+    def _refresh_if_changed(self):
+        if self.tables is not None and self._checked_at is not None \
+                and time.monotonic() - self._checked_at < self.version_check:
+            return
+        version = self._schema_version()
+        self._checked_at = time.monotonic()
+        if self.tables is None or (version is not None and version != self.version):
+            self.load(version)
+
+    def table_info(self, table_names):
+        """Same shape as get_table_info(db, table_names): {table name: [column rows]}."""
+        self._refresh_if_changed()
+        if self.tables is None:
+            return get_table_info(self.db, table_names)
+        if not isinstance(table_names, list):
+            table_names = [table_names]
+        return {name: self.tables.get(name, self.tables.get(self._lower_names.get(name.lower()), []))
+                for name in table_names}
+
+    def prompt(self, table_names):
+        """table_info rendered for a prompt's {schema} slot, formatted once per schema version."""
+        self._refresh_if_changed()
+        key = tuple(table_names) if isinstance(table_names, list) else table_names
+        fragment = self._prompts.get(key)
+        if fragment is None:
+            fragment = str(self.table_info(table_names))
+            if self.tables is not None:
+                self._prompts[key] = fragment
+        return fragment
+
+
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def schema_registry(db):
+    """The SchemaRegistry of db, created and loaded on first use."""
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(id(db))
+        if registry is None or registry.db is not db:
+            registry = _REGISTRIES[id(db)] = SchemaRegistry(db)
+    if registry.tables is None:
+        registry.load()
+    return registry
+
+
+def schema_prompt(db, table_names):
+    """Prompt fragment describing table_names, for the SQL chains."""
+    return schema_registry(db).prompt(table_names)
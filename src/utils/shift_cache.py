@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from utils.paths import project_root
+
+MANIFEST_VERSION = 1
+
+
+def default_cache_dir():
+    """data/shifts/cache under the project root."""
+    return os.path.join(project_root(), 'data', 'shifts', 'cache')
+
+
+class ShiftChartCache:
+    """
+    Persistent, content-addressed cache of NHL shift charts keyed by nhl_game_id.
+
+    Each shift chart is stored once as gzip-compressed canonical JSON under
+    objects/<sha256>.json.gz, and manifest.json maps every game id to its content
+    hash. Reads verify the hash and drop entries that fail the check. Only final
+    games are cached, since a shift chart can still change while a game is live.
+    """
+
+    def __init__(self, cache_dir=None, flush_every=100):
+        """
+        Initialize the cache, creating the directory layout if needed.
+
+        Args:
+            cache_dir: Directory for the manifest and objects. Defaults to data/shifts/cache
+            flush_every: Write the manifest after this many new entries (see flush)
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.flush_every = flush_every
+        self._pending = 0
+        self.objects_dir = os.path.join(self.cache_dir, 'objects')
+        self.manifest_path = os.path.join(self.cache_dir, 'manifest.json')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'version': MANIFEST_VERSION, 'games': {}}
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Shift chart cache manifest unreadable, starting empty: {e}")
+            return {'version': MANIFEST_VERSION, 'games': {}}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {'version': MANIFEST_VERSION, 'games': {}}
+        return manifest
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.json.gz")
+
+    def __contains__(self, nhl_game_id):
+        return str(nhl_game_id) in self._manifest['games']
+
+    def __len__(self):
+        return len(self._manifest['games'])
+
+    def get(self, nhl_game_id):
+        """
+        Return the cached shift chart for a game, or None on a miss or failed integrity check.
+        """
+        entry = self._manifest['games'].get(str(nhl_game_id))
+        if entry is None:
+            return None
+        try:
+            with open(self._object_path(entry['sha256']), 'rb') as f:
+                payload = gzip.decompress(f.read())
+        except (OSError, EOFError, zlib.error) as e:
+            # zlib.error: the gzip header is intact but the compressed stream is not
+            print(f"⚠ Shift chart cache entry for {nhl_game_id} unreadable: {e}")
+            self.evict(nhl_game_id)
+            return None
+        if hashlib.sha256(payload).hexdigest() != entry['sha256']:
+            print(f"⚠ Shift chart cache entry for {nhl_game_id} failed its integrity check")
+            self.evict(nhl_game_id)
+            return None
+        return json.loads(payload)
+
+    def put(self, nhl_game_id, shifts_data, final):
+        """
+        Store a game's shift chart if the game is final and the chart is not empty.
+
+        Returns:
+            bool: True if the chart was cached
+        """
+        if not final or not shifts_data:
+            return False
+        payload = json.dumps(shifts_data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(payload))
+            os.replace(tmp_path, object_path)
+        with self._lock:
+            self._manifest['games'][str(nhl_game_id)] = {
+                'sha256': digest,
+                'shifts': len(shifts_data),
+                'cached_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            }
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush_locked()
+        return True
+
+    def flush(self):
+        """Write pending manifest entries to disk."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self._write_manifest()
+            self._pending = 0
+
+    def evict(self, nhl_game_id):
+        """Remove a game from the manifest. Objects shared with other games are kept."""
+        with self._lock:
+            entry = self._manifest['games'].pop(str(nhl_game_id), None)
+            if entry is None:
+                return
+            self._write_manifest()
+            self._pending = 0
+            still_used = any(e['sha256'] == entry['sha256'] for e in self._manifest['games'].values())
+        if not still_used and os.path.exists(self._object_path(entry['sha256'])):
+            os.remove(self._object_path(entry['sha256']))
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+# Shifts longer than this are data errors in the NHL shift charts and are ignored
+MAX_SHIFT_LENGTH = 300
+
+
+def time_to_seconds(time_str):
+    """Convert an 'MM:SS' shift chart time into seconds into the period."""
+    if pd.isnull(time_str) or time_str == '':
+        return 0
+    try:
+        minutes, seconds = map(int, time_str.split(':'))
+        return minutes * 60 + seconds
+    except ValueError:
+        print(f"Invalid time format: {time_str}")
+        return 0
+
+
+class _PeriodShifts:
+    """Parsed shifts for a single period, kept in shift chart order."""
+
+    def __init__(self, starts, ends, names, teams, player_ids):
+        self.starts = starts
+        self.ends = ends
+        self.names = names
+        self.teams = teams
+        self.player_ids = player_ids
+        # Permutation that sorts the shifts by start time, used for binary search lookups
+        self.by_start = np.argsort(starts, kind="stable")
+        self.sorted_starts = starts[self.by_start]
+
+
+class ShiftIndex:
+    """
+    Index of a single game's shift chart for on-ice player lookups.
+
+    The shift chart is parsed once into NumPy start/end arrays per period, so each shot
+    can be resolved with a binary search instead of re-parsing every shift of the game.
+    Results are identical to scanning the raw shift chart in order.
+    """
+
+    def __init__(self, shifts_data, max_shift_length=MAX_SHIFT_LENGTH):
+        """
+        Build the index from the raw shift chart rows.
+
+        Args:
+            shifts_data: List of shift dicts as returned by the NHL shiftcharts endpoint
+            max_shift_length: Shifts longer than this many seconds are dropped
+        """
+        self.max_shift_length = max_shift_length
+        self.periods = {}
+
+        grouped = {}
+        for shift in shifts_data:
+            start_time = time_to_seconds(shift['startTime'])
+            end_time = time_to_seconds(shift['endTime'])
+            # A shift can only contain a shot if it ends after it starts
+            if end_time <= start_time or end_time - start_time > max_shift_length:
+                continue
+            rows = grouped.setdefault(shift['period'], ([], [], [], [], []))
+            rows[0].append(start_time)
+            rows[1].append(end_time)
+            rows[2].append(f"{shift['firstName']} {shift['lastName']}")
+            rows[3].append(shift['teamAbbrev'])
+            rows[4].append(shift.get('playerId') or 0)
+
+        for period, (starts, ends, names, teams, player_ids) in grouped.items():
+            self.periods[period] = _PeriodShifts(
+                np.array(starts, dtype=np.int32),
+                np.array(ends, dtype=np.int32),
+                np.array(names, dtype=object),
+                np.array(teams, dtype=object),
+                np.array(player_ids, dtype=np.int64),
+            )
+
+    def __len__(self):
+        return sum(len(p.starts) for p in self.periods.values())
+
+    def on_ice_positions(self, shot_time, shot_period):
+        """Return the positions (in shift chart order) of the shifts on the ice at shot_time."""
+        shifts = self.periods.get(shot_period)
+        if shifts is None:
+            return None, np.empty(0, dtype=np.intp)
+
+        # Any matching shift starts in (shot_time - max_shift_length, shot_time]
+        lo = np.searchsorted(shifts.sorted_starts, shot_time - self.max_shift_length, side="right")
+        hi = np.searchsorted(shifts.sorted_starts, shot_time, side="right")
+        candidates = shifts.by_start[lo:hi]
+        positions = np.sort(candidates[shifts.ends[candidates] > shot_time])
+        return shifts, positions
+
+    def on_ice_mask(self, shot_times, shot_period):
+        """
+        Broadcast an array of shot times against every shift of a period.
+
+        Returns:
+            The period's shifts (or None) and a boolean matrix of shape (shots, shifts)
+            that is True where the shift was on the ice at the shot time.
+        """
+        shifts = self.periods.get(shot_period)
+        if shifts is None:
+            return None, np.zeros((len(shot_times), 0), dtype=bool)
+        shot_times = np.asarray(shot_times)[:, None]
+        return shifts, (shifts.starts[None, :] <= shot_times) & (shot_times < shifts.ends[None, :])
+
+    def players_on_ice(self, shot_time, shot_period, team_code):
+        """Finds the players on the ice at the given shot time and period, excluding goalies."""
+        shifts, positions = self.on_ice_positions(shot_time, shot_period)
+        if shifts is None or len(positions) == 0:
+            return '', ''
+
+        same_team = shifts.teams[positions] == team_code
+        names = shifts.names[positions]
+        return ', '.join(names[same_team]), ', '.join(names[~same_team])
+
+
+def shot_period_seconds(shots_df):
+    """Seconds into the period for each shot, from MoneyPuck's seconds into the game."""
+    times = shots_df['time'].to_numpy()
+    periods = shots_df['period'].to_numpy()
+    return np.where(periods > 1, times - (periods - 1) * 1200, times)
+
+
+def attribute_players_on_ice(shots_df, shift_indexes):
+    """
+    Fill shooting_team_players and opposing_team_players for every shot.
+
+    Shots are grouped by nhl_game_id and each period's shot times are broadcast against
+    the game's shift intervals in one NumPy operation. Both columns are written in a
+    single bulk assignment at the end.
+
+    Args:
+        shots_df: Shots with nhl_game_id, teamCode, time and period columns
+        shift_indexes: Mapping of nhl_game_id to the game's ShiftIndex
+
+    Returns:
+        The same DataFrame with both player columns assigned
+    """
+    shooting_players = np.full(len(shots_df), '', dtype=object)
+    opposing_players = np.full(len(shots_df), '', dtype=object)
+
+    shot_times = shot_period_seconds(shots_df)
+    periods = shots_df['period'].to_numpy()
+    team_codes = shots_df['teamCode'].to_numpy()
+
+    for nhl_game_id, game_positions in shots_df.groupby('nhl_game_id', sort=False).indices.items():
+        shift_index = shift_indexes.get(nhl_game_id)
+        if shift_index is None:
+            continue
+        game_periods = periods[game_positions]
+        for period in np.unique(game_periods):
+            positions = game_positions[game_periods == period]
+            shifts, on_ice = shift_index.on_ice_mask(shot_times[positions], period)
+            if shifts is None:
+                continue
+            same_team = shifts.teams[None, :] == team_codes[positions][:, None]
+            shooting = on_ice & same_team
+            opposing = on_ice & ~same_team
+            for row, position in enumerate(positions):
+                shooting_players[position] = ', '.join(shifts.names[shooting[row]])
+                opposing_players[position] = ', '.join(shifts.names[opposing[row]])
+
+    shots_df['shooting_team_players'] = shooting_players
+    shots_df['opposing_team_players'] = opposing_players
+    return shots_df
+
+
+def build_shot_on_ice(shots_df, shift_indexes):
+    """
+    Build the rows of the shot_on_ice bridge table, one per skater on the ice for a shot.
+
+    Uses the same per-game broadcast as attribute_players_on_ice, so the bridge always
+    agrees with the shooting_team_players and opposing_team_players columns.
+
+    Args:
+        shots_df: Shots with shotID, nhl_game_id, teamCode, time and period columns
+        shift_indexes: Mapping of nhl_game_id to the game's ShiftIndex
+
+    Returns:
+        DataFrame with shotID, nhl_game_id, playerId and side ('shooting' or 'opposing')
+    """
+    shot_ids = shots_df['shotID'].to_numpy()
+    shot_times = shot_period_seconds(shots_df)
+    periods = shots_df['period'].to_numpy()
+    team_codes = shots_df['teamCode'].to_numpy()
+    frames = []
+
+    for nhl_game_id, game_positions in shots_df.groupby('nhl_game_id', sort=False).indices.items():
+        shift_index = shift_indexes.get(nhl_game_id)
+        if shift_index is None:
+            continue
+        game_periods = periods[game_positions]
+        for period in np.unique(game_periods):
+            positions = game_positions[game_periods == period]
+            shifts, on_ice = shift_index.on_ice_mask(shot_times[positions], period)
+            if shifts is None:
+                continue
+            rows, cols = np.nonzero(on_ice)
+            same_team = shifts.teams[cols] == team_codes[positions][rows]
+            frames.append(pd.DataFrame({
+                'shotID': shot_ids[positions][rows],
+                'nhl_game_id': nhl_game_id,
+                'playerId': shifts.player_ids[cols],
+                'side': np.where(same_team, 'shooting', 'opposing'),
+            }))
+
+    if not frames:
+        return pd.DataFrame(columns=['shotID', 'nhl_game_id', 'playerId', 'side'])
+    # Overlapping shifts for the same player would otherwise duplicate the primary key
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=['nhl_game_id', 'shotID', 'playerId'])
@@ -0,0 +1,71 @@
+import pandas as pd
+from sqlalchemy import text
+
+from utils.bulk_load import bulk_load
+
+SHOT_ON_ICE_TABLE = 'shot_on_ice'
+
+MYSQL_DDL = f"""
+CREATE TABLE IF NOT EXISTS {SHOT_ON_ICE_TABLE} (
+    shotID INT NOT NULL,
+    nhl_game_id INT NOT NULL,
+    playerId INT NOT NULL,
+    side ENUM('shooting', 'opposing') NOT NULL,
+    PRIMARY KEY (nhl_game_id, shotID, playerId),
+    KEY idx_shot_on_ice_player (playerId, nhl_game_id, side)
+)
+"""
+
+# SQLite has no ENUM or inline KEY clauses, so the secondary index is created separately
+SQLITE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SHOT_ON_ICE_TABLE} (
+        shotID INTEGER NOT NULL,
+        nhl_game_id INTEGER NOT NULL,
+        playerId INTEGER NOT NULL,
+        side TEXT NOT NULL CHECK (side IN ('shooting', 'opposing')),
+        PRIMARY KEY (nhl_game_id, shotID, playerId)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_shot_on_ice_player ON {SHOT_ON_ICE_TABLE} (playerId, nhl_game_id, side)",
+]
+
+
+def ensure_shot_on_ice_table(engine):
+    """
+    Create the shot_on_ice bridge table and its indexes if they don't exist.
+
+    The primary key (nhl_game_id, shotID, playerId) joins back to shots_data, and the
+    (playerId, nhl_game_id, side) index turns player and line lookups into index seeks.
+    """
+    statements = SQLITE_DDL if engine.dialect.name == 'sqlite' else [MYSQL_DDL]
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def games_with_shot_on_ice(engine, game_ids=None):
+    """Set of nhl_game_ids that already have bridge rows, optionally limited to game_ids."""
+    query = f"SELECT DISTINCT nhl_game_id FROM {SHOT_ON_ICE_TABLE}"
+    params = {}
+    if game_ids is not None:
+        game_ids = pd.Series(game_ids).dropna().astype('int64')
+        if game_ids.empty:
+            return set()
+        query += " WHERE nhl_game_id BETWEEN :low AND :high"
+        params = {'low': int(game_ids.min()), 'high': int(game_ids.max())}
+    with engine.connect() as connection:
+        existing = {row[0] for row in connection.execute(text(query), params)}
+    if game_ids is not None:
+        existing &= set(game_ids.tolist())
+    return existing
+
+
+def write_shot_on_ice(engine, on_ice_df):
+    """Append bridge rows built by shift_index.build_shot_on_ice."""
+    if on_ice_df.empty:
+        print(f"No new rows for '{SHOT_ON_ICE_TABLE}'.")
+        return 0
+    ensure_shot_on_ice_table(engine)
+    on_ice_df = on_ice_df[['shotID', 'nhl_game_id', 'playerId', 'side']]
+    return bulk_load(on_ice_df, SHOT_ON_ICE_TABLE, engine)
@@ -0,0 +1,233 @@
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+from utils.paths import project_root
+from utils.query_cache import data_version
+from utils.shots_schema import DERIVED_SCHEMA, SHOTS_SCHEMA, SHOTS_TABLE_COLUMNS, coerce_shots_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Only the Parquet mirror needs pyarrow; MySQL ingestion works without it
+    pa = pc = ds = pq = None
+
+# Columnar mirror of shots_data for the analytics tools (shot maps, heat maps, xG%).
+# Files live under <root>/season=<season>/teamCode=<team>/, so a filter on season or team
+# only opens the matching directories, and the remaining filters are checked against
+# row group statistics before any rows are decoded.
+def default_mirror_dir():
+    """data/shots/parquet under the project root, whatever directory ingestion runs from."""
+    return os.path.join(project_root(), 'data', 'shots', 'parquet')
+
+
+SHOTS_PARQUET_DIR = os.getenv("SHOTS_PARQUET_DIR") or default_mirror_dir()
+
+# Nightly ingestion keeps the mirror current where it runs next to the app. Set
+# SHOTS_PARQUET_MIRROR=0 where the mirror would be thrown away, like an ephemeral CI runner.
+MIRROR_ON_INGEST = os.getenv("SHOTS_PARQUET_MIRROR", "1") != "0"
+
+PARTITION_COLUMNS = ['season', 'teamCode']
+
+# data_versions stamp of shots_data the mirror was last brought up to, in <root>/_version
+# (pyarrow skips files starting with '_' when it lists the dataset). Readers only serve the
+# mirror while it matches the database's stamp, so a mirror ingestion stopped updating is
+# never served in place of newer rows.
+VERSION_FILE = '_version'
+
+# Every shots_data column: besides the plotting and xG functions, the embedded database
+# builds its shots_data from the mirror, and the generated SQL may read any column the
+# chains' prompts describe (homeTeamWon for team records, for one). Readers that pass
+# columns only decode those.
+MIRROR_COLUMNS = SHOTS_TABLE_COLUMNS
+
+_ARROW_TYPES = {
+    'Int8': 'int8', 'Int16': 'int16', 'Int32': 'int32', 'int64': 'int64',
+    'float32': 'float32', 'float64': 'float64', 'category': 'string', 'object': 'string',
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The shots Parquet mirror needs pyarrow; install it with: pip install pyarrow")
+
+
+def _arrow_type(name, dtype):
+    if name == 'gameDate':
+        return pa.date32()
+    return pa.type_for_alias(_ARROW_TYPES[dtype])
+
+
+def mirror_schema():
+    """Arrow schema of the mirrored columns, including the two partition columns."""
+    _require_pyarrow()
+    dtypes = {name: dtype for name, dtype, _ in SHOTS_SCHEMA + DERIVED_SCHEMA}
+    return pa.schema([(name, _arrow_type(name, dtypes[name])) for name in MIRROR_COLUMNS])
+
+
+def _partitioning():
+    schema = mirror_schema()
+    return ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor='hive')
+
+
+def _to_table(df):
+    df = coerce_shots_frame(df[MIRROR_COLUMNS])
+    # Category columns come out of pandas as dictionaries; every file stores plain strings
+    # so the dataset has one schema (Parquet dictionary-encodes them on disk anyway)
+    return pa.Table.from_pandas(df, preserve_index=False).cast(mirror_schema())
+
+
+def _write(df, root):
+    # Ingestion chunks hold whole games, so the game range makes each write's file names unique
+    first, last = int(df['nhl_game_id'].min()), int(df['nhl_game_id'].max())
+    ds.write_dataset(_to_table(df), root, format='parquet', partitioning=_partitioning(),
+                     basename_template=f"games-{first}-{last}-{{i}}.parquet",
+                     existing_data_behavior='overwrite_or_ignore')
+
+
+def _drop_games(root, partitions, game_ids):
+    """Remove rows of game_ids from the files of the given partitions, so rewriting a game never duplicates it."""
+    game_ids = pa.array(sorted(game_ids), type=pa.int64())
+    for season, team in partitions:
+        directory = Path(root) / f"season={season}" / f"teamCode={team}"
+        for path in directory.glob("*.parquet"):
+            table = pq.read_table(path)
+            keep = pc.invert(pc.is_in(table['nhl_game_id'], value_set=game_ids))
+            if pc.all(keep).as_py():
+                continue
+            table = table.filter(keep)
+            if table.num_rows:
+                pq.write_table(table, path)
+            else:
+                path.unlink()
+
+
+def write_shots_parquet(df, root=SHOTS_PARQUET_DIR):
+    """
+    Write shots to the Parquet mirror, replacing any rows it already has for the same games.
+
+    Args:
+        df: Shots with every MIRROR_COLUMNS column, e.g. a chunk as it is loaded into shots_data
+        root: Dataset directory
+
+    Returns:
+        int: Number of rows written
+    """
+    _require_pyarrow()
+    if df.empty:
+        return 0
+    game_ids = df['nhl_game_id'].unique()
+    partitions = df[PARTITION_COLUMNS].drop_duplicates().itertuples(index=False)
+    _drop_games(root, list(partitions), game_ids)
+    _write(df, root)
+    return len(df)
+
+
+def has_mirror(root=SHOTS_PARQUET_DIR):
+    """True when pyarrow is installed and the mirror has been built under root."""
+    return pa is not None and Path(root).is_dir()
+
+
+def mirror_version(root=SHOTS_PARQUET_DIR):
+    """data_versions stamp of shots_data the mirror matches, or None if it isn't stamped."""
+    try:
+        return int((Path(root) / VERSION_FILE).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def stamp_mirror(root, version):
+    """Record that the mirror matches shots_data at data_versions stamp version; None clears the stamp."""
+    path = Path(root) / VERSION_FILE
+    if version is None:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"{int(version)}\n")
+
+
+def is_current(version, root=SHOTS_PARQUET_DIR):
+    """True when the mirror can be read in place of shots_data at data_versions stamp version."""
+    return has_mirror(root) and mirror_version(root) == version
+
+
+def shots_dataset(root=SHOTS_PARQUET_DIR):
+    """The mirror as a pyarrow Dataset, for callers that want to scan it themselves."""
+    _require_pyarrow()
+    if not Path(root).is_dir():
+        raise FileNotFoundError(f"No shots Parquet mirror at '{root}'; build it with: python -m utils.shots_parquet")
+    return ds.dataset(root, format='parquet', partitioning=_partitioning(), schema=mirror_schema())
+
+
+def read_shots(columns=None, filters=None, root=SHOTS_PARQUET_DIR, backend='numpy'):
+    """
+    Read shots from the Parquet mirror without going through MySQL.
+
+    Args:
+        columns: Columns to read, defaults to all MIRROR_COLUMNS; other columns are never decoded
+        filters: Predicates in pyarrow's form, e.g. [('season', '>=', 2020), ('teamCode', '==', 'TOR')].
+                 Tuples in a list are ANDed; a list of such lists is ORed. Filters on season and
+                 teamCode skip whole directories, the rest skip row groups by their statistics.
+        root: Dataset directory
+        backend: 'numpy' for a DataFrame with the compact shots_data dtypes, 'arrow' for a
+                 DataFrame backed by pd.ArrowDtype columns, or 'table' for the pyarrow Table
+
+    Returns:
+        DataFrame (or pyarrow Table) of the matching shots
+    """
+    if backend not in ('numpy', 'arrow', 'table'):
+        raise ValueError(f"Unknown backend {backend}")
+    dataset = shots_dataset(root)
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = dataset.to_table(columns=columns, filter=expression)
+    if backend == 'table':
+        return table
+    if backend == 'arrow':
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return coerce_shots_frame(table.to_pandas())
+
+
+def mirror_from_database(engine, root=SHOTS_PARQUET_DIR, table_name='shots_data', seasons=None):
+    """
+    Rebuild the mirror from shots_data, one season at a time; returns the number of rows written.
+    A full rebuild stamps the mirror with the table's data_versions stamp from before it started.
+    """
+    _require_pyarrow()
+    columns = ', '.join(MIRROR_COLUMNS)
+    version = None
+    if seasons is None:
+        version = data_version(engine, table_name)
+        # Not served while it is half rebuilt
+        stamp_mirror(root, None)
+        with engine.connect() as connection:
+            seasons = [row[0] for row in connection.execute(text(f"SELECT DISTINCT season FROM {table_name} ORDER BY season"))]
+    written = 0
+    for season in seasons:
+        shutil.rmtree(Path(root) / f"season={season}", ignore_errors=True)
+        df = pd.read_sql(text(f"SELECT {columns} FROM {table_name} WHERE season = :season"), engine,
+                         params={'season': season})
+        if df.empty:
+            continue
+        _write(df, root)
+        print(f"✔ Mirrored {len(df)} shots from season {season}")
+        written += len(df)
+    if version is not None:
+        stamp_mirror(root, version)
+    return written
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from sqlalchemy import create_engine
+
+    # Full rebuild of the mirror. Ingestion that writes to it (SHOTS_PARQUET_MIRROR) keeps it
+    # current after that; where ingestion runs elsewhere, rerun this after each update.
+    # Run from src with: python -m utils.shots_parquet
+    load_dotenv()
+    engine = create_engine(f"mysql+mysqlconnector://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
+                           f"@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}")
+    mirror_from_database(engine)
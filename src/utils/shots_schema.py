@@ -0,0 +1,198 @@
+import pandas as pd
+from datetime import date
+from sqlalchemy import text
+
+# Every shots_data column with its compact pandas dtype and MySQL type. The first block is
+# what is read from the MoneyPuck shots file; the second is added during ingestion.
+# Integer columns use pandas' nullable types so a blank cell doesn't force float64.
+# xGoal stays float64/DOUBLE so it is stored exactly as MoneyPuck publishes it and sums
+# of it match the season totals; coordinates and angles only feed plots, so FLOAT is enough.
+SHOTS_SCHEMA = [
+    ('shotID', 'Int32', 'INT UNSIGNED NOT NULL'),
+    ('homeTeamCode', 'category', 'CHAR(3)'),
+    ('awayTeamCode', 'category', 'CHAR(3)'),
+    ('season', 'Int16', 'SMALLINT UNSIGNED NOT NULL'),
+    ('isPlayoffGame', 'Int8', 'TINYINT UNSIGNED'),
+    ('game_id', 'Int32', 'MEDIUMINT UNSIGNED'),
+    ('homeTeamWon', 'Int8', 'TINYINT UNSIGNED'),
+    ('id', 'Int32', 'MEDIUMINT UNSIGNED'),
+    ('time', 'Int16', 'SMALLINT UNSIGNED'),
+    ('period', 'Int8', 'TINYINT UNSIGNED'),
+    ('team', 'category', "ENUM('HOME','AWAY')"),
+    ('xCord', 'float32', 'FLOAT'),
+    ('yCord', 'float32', 'FLOAT'),
+    ('location', 'category', 'VARCHAR(12)'),
+    ('event', 'category', "ENUM('SHOT','MISS','GOAL')"),
+    ('goal', 'Int8', 'TINYINT UNSIGNED'),
+    ('shotDistance', 'float32', 'FLOAT'),
+    ('shotType', 'category', 'VARCHAR(8)'),
+    ('shotOnEmptyNet', 'Int8', 'TINYINT UNSIGNED'),
+    ('goalieNameForShot', 'object', 'VARCHAR(64)'),
+    ('shooterPlayerId', 'Int32', 'INT UNSIGNED'),
+    ('shooterName', 'object', 'VARCHAR(64)'),
+    ('shooterLeftRight', 'category', 'CHAR(1)'),
+    ('xCordAdjusted', 'float32', 'FLOAT'),
+    ('yCordAdjusted', 'float32', 'FLOAT'),
+    ('isHomeTeam', 'Int8', 'TINYINT UNSIGNED'),
+    ('awaySkatersOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('homeSkatersOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('xGoal', 'float64', 'DOUBLE'),
+    ('homeTeamGoals', 'Int8', 'TINYINT UNSIGNED'),
+    ('awayTeamGoals', 'Int8', 'TINYINT UNSIGNED'),
+    ('shotAngle', 'float32', 'FLOAT'),
+    ('playerPositionThatDidEvent', 'category', 'CHAR(1)'),
+    ('shootingTeamForwardsOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('shootingTeamDefencemenOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('defendingTeamForwardsOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('defendingTeamDefencemenOnIce', 'Int8', 'TINYINT UNSIGNED'),
+    ('teamCode', 'category', 'CHAR(3)'),
+]
+
+# The on-ice player lists are TEXT: six skaters with long names plus the goalie can pass
+# 255 characters, and LOAD DATA LOCAL would clip them with only a warning
+DERIVED_SCHEMA = [
+    ('nhl_game_id', 'int64', 'INT UNSIGNED NOT NULL'),
+    ('shooting_team_players', 'object', 'TEXT'),
+    ('opposing_team_players', 'object', 'TEXT'),
+    ('gameDate', 'object', 'DATE'),
+]
+
+# MySQL requires the partitioning column in every unique key. nhl_game_id already
+# determines the season, so adding season doesn't change what the key makes unique.
+SHOTS_PRIMARY_KEY = ['nhl_game_id', 'shotID', 'season']
+
+# shots_data is range-partitioned by season on MySQL, one partition per season from this
+# one on plus a catch-all, so season filters only read the partitions they name
+FIRST_PARTITIONED_SEASON = 2015
+CATCH_ALL_PARTITION = 'pmax'
+
+# Secondary indexes matched to the hardcoded queries (stat_hardcode, figure_generation) and
+# the generated shots_data SQL. InnoDB appends the primary key to every secondary index,
+# so nhl_game_id and shotID are covered without being listed.
+SHOTS_INDEXES = {
+    # Team xG%: (homeTeamCode = X OR awayTeamCode = X) AND gameDate BETWEEN ..., reading
+    # teamCode, xGoal and the skater counts; MySQL answers the OR with an index merge
+    'idx_shots_home_team': ['homeTeamCode', 'gameDate', 'teamCode', 'xGoal', 'homeSkatersOnIce', 'awaySkatersOnIce'],
+    'idx_shots_away_team': ['awayTeamCode', 'gameDate', 'teamCode', 'xGoal', 'homeSkatersOnIce', 'awaySkatersOnIce'],
+    # Team records: teamCode = X AND goal = 1 AND gameDate >= ...
+    'idx_shots_team': ['teamCode', 'gameDate', 'goal', 'homeSkatersOnIce', 'awaySkatersOnIce'],
+    # Shot maps and player records: shooterName = X AND season BETWEEN ... / gameDate >= ...
+    'idx_shots_shooter': ['shooterName', 'season', 'gameDate', 'goal'],
+    # League-wide date ranges
+    'idx_shots_date': ['gameDate'],
+    # Single-game feats across the league (chains.single_games): goal = 1 GROUP BY
+    # nhl_game_id, shooterName reads only the goals, and the LIKE filters on the on-ice
+    # player lists are checked against those rows instead of every shot
+    'idx_shots_goal': ['goal', 'shooterName'],
+}
+
+# Columns of the MoneyPuck shots file that are kept in shots_data
+SHOTS_COLUMNS = [name for name, _, _ in SHOTS_SCHEMA]
+SHOTS_DTYPES = {name: dtype for name, dtype, _ in SHOTS_SCHEMA}
+
+# All shots_data columns in table order
+SHOTS_TABLE_COLUMNS = SHOTS_COLUMNS + [name for name, _, _ in DERIVED_SCHEMA]
+
+
+def _column_type(mysql_type, dialect):
+    if dialect == 'mysql':
+        return mysql_type
+    # SQLite has no ENUM; its type affinity rules accept the other MySQL type names as is
+    return 'TEXT' if mysql_type.startswith('ENUM') else mysql_type
+
+
+def current_season(today=None):
+    """Season a date falls in, named by the year it starts in (October 2024 - June 2025 is 2024)."""
+    today = today or date.today()
+    return today.year if today.month >= 9 else today.year - 1
+
+
+def _partition(season):
+    return f"PARTITION p{season} VALUES LESS THAN ({season + 1})"
+
+
+def season_partitions_sql(through_season=None):
+    """PARTITION BY clause with one partition per season up to through_season, and a catch-all."""
+    through_season = through_season or current_season()
+    partitions = [_partition(season) for season in range(FIRST_PARTITIONED_SEASON, through_season + 1)]
+    partitions.append(f"PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (season) (\n    " + ",\n    ".join(partitions) + "\n)"
+
+
+def shots_index_ddl(table_name='shots_data'):
+    """CREATE INDEX statements for SHOTS_INDEXES, for dialects without inline KEY clauses."""
+    return [f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({', '.join(columns)})"
+            for name, columns in SHOTS_INDEXES.items()]
+
+
+def shots_table_ddl(table_name='shots_data', dialect='mysql', indexes=True, through_season=None):
+    """
+    CREATE TABLE statement for shots_data with the compact column types.
+
+    On MySQL the table is partitioned by season and, with indexes, declares SHOTS_INDEXES
+    inline; other dialects get the indexes from shots_index_ddl.
+    """
+    columns = [f"    {name} {_column_type(mysql_type, dialect)}" for name, _, mysql_type in SHOTS_SCHEMA + DERIVED_SCHEMA]
+    columns.append(f"    PRIMARY KEY ({', '.join(SHOTS_PRIMARY_KEY)})")
+    if dialect == 'mysql' and indexes:
+        columns.extend(f"    KEY {name} ({', '.join(index_columns)})" for name, index_columns in SHOTS_INDEXES.items())
+    ddl = f"CREATE TABLE IF NOT EXISTS {table_name} (\n" + ",\n".join(columns) + "\n)"
+    if dialect == 'mysql':
+        ddl += "\n" + season_partitions_sql(through_season)
+    return ddl
+
+
+def ensure_shots_table(engine, table_name='shots_data'):
+    """Create the shots table with the typed schema and its indexes if it doesn't exist yet."""
+    with engine.begin() as connection:
+        connection.execute(text(shots_table_ddl(table_name, engine.dialect.name)))
+        if engine.dialect.name != 'mysql':
+            for statement in shots_index_ddl(table_name):
+                connection.execute(text(statement))
+            return
+        # A table migrated before an index joined SHOTS_INDEXES gets it here. Legacy tables
+        # (TEXT columns, none of the indexes yet) are left to migrate_shots_partitions.
+        existing = {row[0] for row in connection.execute(text(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"), {'table_name': table_name})}
+        missing = [name for name in SHOTS_INDEXES if name not in existing]
+        if existing & set(SHOTS_INDEXES) and missing:
+            connection.execute(text(f"ALTER TABLE {table_name} " + ", ".join(
+                f"ADD INDEX {name} ({', '.join(SHOTS_INDEXES[name])})" for name in missing)))
+            print(f"✔ Added indexes {', '.join(missing)} to '{table_name}'")
+
+
+def ensure_season_partitions(engine, table_name, seasons):
+    """
+    Split the catch-all partition so each of seasons has its own, before its rows are loaded.
+
+    Only applies to MySQL tables partitioned with season_partitions_sql; the catch-all is
+    empty at the start of a new season, so the REORGANIZE moves no rows.
+    """
+    if engine.dialect.name != 'mysql':
+        return
+    with engine.begin() as connection:
+        existing = {row[0] for row in connection.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"), {'table_name': table_name})}
+        if CATCH_ALL_PARTITION not in existing:
+            return
+        last = max((int(name[1:]) for name in existing if name != CATCH_ALL_PARTITION), default=FIRST_PARTITIONED_SEASON - 1)
+        new = [int(season) for season in sorted(set(seasons)) if int(season) > last]
+        if not new:
+            return
+        partitions = [_partition(season) for season in range(last + 1, max(new) + 1)]
+        partitions.append(f"PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE")
+        connection.execute(text(f"ALTER TABLE {table_name} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO ("
+                                + ", ".join(partitions) + ")"))
+        print(f"✔ Added partitions for seasons {last + 1}-{max(new)} to '{table_name}'")
+
+
+def coerce_shots_frame(df):
+    """Cast the shots columns present in df to their compact dtypes."""
+    dtypes = {name: dtype for name, dtype, _ in SHOTS_SCHEMA + DERIVED_SCHEMA if name in df.columns}
+    df = df.astype(dtypes)
+    if 'gameDate' in df.columns:
+        # DATE columns take date objects on every driver; 'YYYY-MM-DD' strings only on some
+        df['gameDate'] = pd.to_datetime(df['gameDate'], errors='coerce').dt.date
+    return df
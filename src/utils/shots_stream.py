@@ -0,0 +1,82 @@
+import tempfile
+import zipfile
+
+import pandas as pd
+import requests
+
+from utils.shots_schema import SHOTS_COLUMNS, SHOTS_DTYPES
+
+CHUNK_ROWS = 50_000
+
+
+def download_to_tempfile(url, session=None, block_size=1 << 20, timeout=60):
+    """
+    Stream a download to an anonymous temporary file and return it, rewound.
+
+    A ZIP's central directory sits at the end of the archive, so it needs a seekable
+    file, but the body is copied in fixed-size blocks and never held in memory.
+    """
+    session = session or requests
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        archive = tempfile.TemporaryFile()
+        for block in response.iter_content(chunk_size=block_size):
+            archive.write(block)
+    archive.seek(0)
+    return archive
+
+
+def shots_csv_member(zip_ref):
+    """Name of the shots CSV inside the archive."""
+    members = [name for name in zip_ref.namelist() if name.endswith('.csv') and not name.startswith('__MACOSX')]
+    if not members:
+        raise ValueError("No CSV file found in the shots archive")
+    return members[0]
+
+
+def nhl_game_ids(shots_df):
+    """NHL game id (e.g. 2024030111) from MoneyPuck's season and game_id columns."""
+    return shots_df['season'].astype('int64') * 1_000_000 + shots_df['game_id'].astype('int64')
+
+
+def iter_shot_chunks(csv_file, chunksize=CHUNK_ROWS):
+    """
+    Read a shots CSV in chunks of SHOTS_COLUMNS with SHOTS_DTYPES, adding nhl_game_id.
+
+    Rows of the last game in a chunk are held back and prepended to the next chunk, so
+    every game is yielded whole and its shift chart is only needed once.
+    """
+    carry = None
+    reader = pd.read_csv(csv_file, usecols=SHOTS_COLUMNS, dtype=SHOTS_DTYPES, chunksize=chunksize,
+                         encoding="utf-8")
+    for chunk in reader:
+        chunk = chunk[SHOTS_COLUMNS].assign(nhl_game_id=nhl_game_ids(chunk))
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last_game = chunk['nhl_game_id'].iloc[-1]
+        tail = (chunk['nhl_game_id'] == last_game).to_numpy()
+        carry = chunk[tail]
+        if not tail.all():
+            yield chunk[~tail].reset_index(drop=True)
+    if carry is not None and not carry.empty:
+        yield carry.reset_index(drop=True)
+
+
+def iter_shots_archive(archive, chunksize=CHUNK_ROWS):
+    """
+    Yield the shots in an open MoneyPuck shots ZIP as DataFrame chunks, one or more whole games each.
+
+    The archive member is decompressed and parsed as a stream, so peak memory depends on
+    chunksize rather than on the size of the season file.
+    """
+    with zipfile.ZipFile(archive) as zip_ref:
+        member = shots_csv_member(zip_ref)
+        print(f"Processing {member}...")
+        with zip_ref.open(member) as csv_file:
+            yield from iter_shot_chunks(csv_file, chunksize=chunksize)
+
+
+def stream_shots_zip(url, chunksize=CHUNK_ROWS, session=None):
+    """Download a MoneyPuck shots ZIP to a temporary file and yield its shots (see iter_shots_archive)."""
+    with download_to_tempfile(url, session=session) as archive:
+        yield from iter_shots_archive(archive, chunksize=chunksize)
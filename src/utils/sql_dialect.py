@@ -0,0 +1,186 @@
+import re
+
+# MySQL-to-embedded translation for the SQL this app sends: the hand-written queries and
+# what the LLM chains generate. It covers the MySQL spellings those queries use, not the
+# whole language. Integer division is one known gap: SQLite's 5 / 2 is 2, MySQL's is 2.5.
+BACKENDS = ('sqlite', 'duckdb')
+
+# INFORMATION_SCHEMA with MySQL's upper-case column names, as get_table_info and the
+# schema registry read it
+_INFORMATION_SCHEMA = {
+    'sqlite': {
+        'COLUMNS': """(SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, p.name AS COLUMN_NAME,
+            lower(p.type) AS DATA_TYPE, p.cid + 1 AS ORDINAL_POSITION
+            FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+            WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%')""",
+        'TABLES': """(SELECT 'main' AS TABLE_SCHEMA, name AS TABLE_NAME, upper(type) AS TABLE_TYPE
+            FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%')""",
+    },
+    'duckdb': {
+        'COLUMNS': """(SELECT table_schema AS "TABLE_SCHEMA", table_name AS "TABLE_NAME", column_name AS "COLUMN_NAME",
+            lower(data_type) AS "DATA_TYPE", ordinal_position AS "ORDINAL_POSITION"
+            FROM information_schema.columns)""",
+        'TABLES': """(SELECT table_schema AS "TABLE_SCHEMA", table_name AS "TABLE_NAME", table_type AS "TABLE_TYPE"
+            FROM information_schema.tables)""",
+    },
+}
+
+_INTERVAL = re.compile(r"^\s*INTERVAL\s+(.+?)\s+(DAY|WEEK|MONTH|YEAR)S?\s*$", re.IGNORECASE | re.DOTALL)
+_SEPARATOR = re.compile(r"\s+SEPARATOR\s+('(?:[^'\\]|\\.|'')*')\s*$", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\s+ORDER\s+BY\s", re.IGNORECASE)
+_LIMIT_OFFSET = re.compile(r"\bLIMIT\s+(\d+)\s*,\s*(\d+)", re.IGNORECASE)
+_SQLITE_PARTS = {'YEAR': '%Y', 'MONTH': '%m', 'DAY': '%d'}
+
+
+def mask_literals(query):
+    """query with the contents of quoted strings, quoted identifiers and comments blanked, positions kept."""
+    masked, i = [], 0
+    while i < len(query):
+        char = query[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < len(query) and query[end] != char:
+                end += 2 if query[end] == '\\' else 1
+            end = min(end, len(query) - 1)
+            masked.append(char + ' ' * (end - i - 1) + query[end] if end > i else char)
+            i = end + 1
+        elif query.startswith('--', i) or query.startswith('#', i):
+            end = query.find('\n', i)
+            end = len(query) if end == -1 else end
+            masked.append(' ' * (end - i))
+            i = end
+        elif query.startswith('/*', i):
+            end = query.find('*/', i + 2)
+            end = len(query) if end == -1 else end + 2
+            masked.append(' ' * (end - i))
+            i = end
+        else:
+            masked.append(char)
+            i += 1
+    return ''.join(masked)
+
+
+def _sub(pattern, replacement, query, flags=re.IGNORECASE):
+    """re.sub outside of string literals and comments."""
+    compiled = re.compile(pattern, flags)
+    for match in reversed(list(compiled.finditer(mask_literals(query)))):
+        # Matched on the masked text, expanded against the original
+        original = compiled.match(query, match.start(), match.end())
+        if original is not None:
+            query = query[:match.start()] + original.expand(replacement) + query[match.end():]
+    return query
+
+
+def _quote_identifiers(query):
+    """`name` quoting is MySQL's; both backends quote identifiers with double quotes."""
+    for match in reversed(list(re.finditer(r"`[^`]*`", mask_literals(query)))):
+        query = f'{query[:match.start()]}"{query[match.start() + 1:match.end() - 1]}"{query[match.end():]}'
+    return query
+
+
+def _rewrite_calls(query, name, rewrite):
+    """
+    Replace every call name(...) outside literals with rewrite(args), args being the
+    argument strings. rewrite returns None to leave a call as it is.
+    """
+    skip = set()
+    while True:
+        masked = mask_literals(query)
+        calls = [match for match in re.finditer(rf"\b{name}\s*\(", masked, re.IGNORECASE) if match.start() not in skip]
+        if not calls:
+            return query
+        # Last call first, so a call nested in another's arguments is rewritten before its parent
+        call = calls[-1]
+        depth, args, arg_start = 0, [], call.end()
+        for i in range(call.end() - 1, len(masked)):
+            if masked[i] == '(':
+                depth += 1
+            elif masked[i] == ')':
+                depth -= 1
+                if depth == 0:
+                    args.append(query[arg_start:i])
+                    break
+            elif masked[i] == ',' and depth == 1:
+                args.append(query[arg_start:i])
+                arg_start = i + 1
+        else:
+            return query  # Unbalanced; leave the rest for the backend to report
+        replacement = rewrite([arg.strip() for arg in args])
+        if replacement is None:
+            skip.add(call.start())
+            continue
+        query = query[:call.start()] + replacement + query[i + 1:]
+
+
+def _date_arithmetic(backend, sign):
+    def rewrite(args):
+        interval = _INTERVAL.match(args[1]) if len(args) == 2 else None
+        if interval is None:
+            return None
+        amount, unit = interval.group(1), interval.group(2).upper()
+        if backend == 'duckdb':
+            return f"({args[0]} {sign} INTERVAL ({amount}) {unit})"
+        if unit == 'WEEK':
+            amount, unit = f"({amount}) * 7", 'DAY'
+        return f"date({args[0]}, '{sign}' || ({amount}) || ' {unit.lower()}')"
+    return rewrite
+
+
+def _group_concat(backend):
+    def rewrite(args):
+        separator = "','"
+        match = _SEPARATOR.search(args[-1]) if args else None
+        if match:
+            separator = match.group(1)
+            args[-1] = args[-1][:match.start()]
+        elif backend == 'sqlite':
+            return None  # Already SQLite's spelling
+        # MySQL orders inside the first argument; both backends take ORDER BY after the separator
+        order = _ORDER_BY.search(mask_literals(args[-1]))
+        order_by = ''
+        if order:
+            order_by = ' ' + args[-1][order.start():].strip()
+            args[-1] = args[-1][:order.start()]
+        if backend == 'sqlite':
+            if separator == "','" and re.match(r"DISTINCT\b", args[0], re.IGNORECASE):
+                # SQLite allows DISTINCT on one argument only; ',' is its default separator anyway
+                return f"group_concat({', '.join(args)}{order_by})"
+            return f"group_concat({', '.join(args)}, {separator}{order_by})"
+        return f"string_agg({', '.join(args)}, {separator}{order_by})"
+    return rewrite
+
+
+def translate(query, backend, placeholders=False):
+    """
+    A MySQL query rewritten for an embedded backend.
+
+    Args:
+        query: MySQL query
+        backend: 'sqlite' or 'duckdb'
+        placeholders: Turn mysql.connector's %s parameter markers into ?
+
+    Returns:
+        str: The query in the backend's dialect
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedded backend {backend!r}; expected one of {BACKENDS}")
+    query = _quote_identifiers(query)
+    query = _rewrite_calls(query, 'DATABASE', lambda args: "'main'")
+    for view, select in _INFORMATION_SCHEMA[backend].items():
+        query = _sub(rf"\bINFORMATION_SCHEMA\s*\.\s*{view}\b", select.replace('\\', '\\\\'), query)
+    query = _rewrite_calls(query, 'CURDATE', lambda args: "CURRENT_DATE")
+    query = _rewrite_calls(query, 'DATE_SUB', _date_arithmetic(backend, '-'))
+    query = _rewrite_calls(query, 'DATE_ADD', _date_arithmetic(backend, '+'))
+    query = _rewrite_calls(query, 'GROUP_CONCAT', _group_concat(backend))
+    if backend == 'sqlite':
+        query = _rewrite_calls(query, 'NOW', lambda args: "CURRENT_TIMESTAMP")
+        query = _rewrite_calls(query, 'IF', lambda args: f"iif({', '.join(args)})")
+        for part, code in _SQLITE_PARTS.items():
+            query = _rewrite_calls(query, part, lambda args, code=code: f"CAST(strftime('{code}', {args[0]}) AS INTEGER)")
+    else:
+        # MySQL compares strings case-insensitively under its default collation; so does ILIKE
+        query = _sub(r"\bLIKE\b", "ILIKE", query)
+        query = _sub(_LIMIT_OFFSET.pattern, r"LIMIT \2 OFFSET \1", query)
+    if placeholders:
+        query = _sub(r"%s", "?", query, flags=0)
+    return query
@@ -0,0 +1,409 @@
+import json
+import os
+import re
+import time
+
+import mysql.connector
+from utils import database_init
+from utils.db_pool import checkout
+from utils.embedded_db import time_limit
+from utils.query_metrics import QUERY_METRICS, note_execution
+from utils.query_cache import is_read
+from utils import query_stream
+from utils.query_stream import ResultTooLarge, capped_query, fetch_frame, top_level
+
+# Rows the planner may expect a generated query to examine before it is refused. A full
+# pass over every season of shots_data is past it; a season, team or player filter is not.
+ROW_BUDGET = 1_000_000
+
+# Server-side time limit for one generated query, in milliseconds
+TIMEOUT_MS = 15_000
+
+# Rows a generated query may return to an answering prompt
+MAX_ROWS = 1_000
+
+# Times a chain is asked for a query before the last rejection is reported
+ATTEMPTS = 2
+
+# MySQL errors raised when MAX_EXECUTION_TIME stops a query
+_TIMEOUT_ERRNOS = {3024, 1317}
+
+_FENCE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+# A table and its alias after FROM, JOIN or a comma in a FROM list
+_SQLITE_TABLE = re.compile(r"(?:\b(?:FROM|JOIN)\s+|,\s*)[`\"]?(\w+)[`\"]?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|GROUP\b|ORDER\b|LIMIT\b|FROM\b|"
+                           r"LEFT\b|RIGHT\b|INNER\b|CROSS\b|NATURAL\b|USING\b|UNION\b|HAVING\b)(\w+))?", re.IGNORECASE)
+
+
+class QueryRejected(ValueError):
+    """
+    A generated query the governor refused or stopped, with what a chain needs to write a better one.
+
+    Attributes:
+        reason: 'not_read', 'multiple_statements', 'too_expensive', 'timeout', 'too_many_rows' or 'error'
+        query: The query as it was checked
+        estimated_rows: Rows the plan expected to examine, for 'too_expensive'
+        hint: What to change in the query
+    """
+
+    def __init__(self, reason, message, query=None, estimated_rows=None, hint=None):
+        super().__init__(message)
+        self.reason = reason
+        self.query = query
+        self.estimated_rows = estimated_rows
+        self.hint = hint
+
+    def to_dict(self):
+        details = {'error': self.reason, 'message': str(self)}
+        if self.estimated_rows is not None:
+            details['estimated_rows'] = self.estimated_rows
+        if self.hint:
+            details['hint'] = self.hint
+        return details
+
+    def feedback(self):
+        """The rejection as a note appended to the question when the chain is asked again."""
+        note = f"The previous SQL query was rejected: {self}."
+        if self.hint:
+            note += f" {self.hint}"
+        return f"{note}\nPrevious query: {self.query}"
+
+
+def _raw_sqlite(connection):
+    return type(connection).__module__.split('.')[0] in ('sqlite3', 'pysqlite3')
+
+
+def dialect_of(connection):
+    """The dialect of an embedded connection, 'sqlite' for sqlite3 connections (the test stand-in), else 'mysql'."""
+    return getattr(connection, 'dialect', None) or ('sqlite' if _raw_sqlite(connection) else 'mysql')
+
+
+def _is_database_error(err):
+    # By module, since database_init swaps pysqlite3 in for sqlite3 after connections may exist
+    return isinstance(err, mysql.connector.Error) or type(err).__module__.split('.')[0] in ('sqlite3', 'pysqlite3')
+
+
+def clean_sql(query):
+    """Strip the code fences and trailing semicolons models add around a query."""
+    return _FENCE.sub('', query.strip()).strip().rstrip(';').strip()
+
+
+def governed_query(query, max_rows=None, timeout_ms=None, dialect='mysql'):
+    """
+    query with a MAX_EXECUTION_TIME hint on its outer SELECT (MySQL) and a top-level
+    LIMIT of max_rows + 1, so the server stops as soon as the result is known to be too big.
+    """
+    if max_rows is not None:
+        query = capped_query(query, max_rows)
+    if timeout_ms and dialect == 'mysql':
+        select = re.search(r"\bSELECT\b", top_level(query), re.IGNORECASE)
+        if select is not None:
+            query = f"{query[:select.end()]} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */{query[select.end():]}"
+    return query
+
+
+def _plan(cursor, query):
+    cursor.execute(query)
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def mysql_examined_rows(plan):
+    """
+    Rows a MySQL EXPLAIN expects to examine. Within a SELECT each table is read once per
+    row that survives the tables joined before it; a dependent subquery runs once per row
+    of the outer query.
+    """
+    selects = {}
+    for step in plan:
+        selects.setdefault(step.get('id') or 1, []).append(step)
+    examined, outer_rows = 0, 1
+    for select_id in sorted(selects):
+        steps = selects[select_id]
+        fanout, select_examined = 1, 0
+        for step in steps:
+            rows = float(step.get('rows') or 1)
+            select_examined += fanout * rows
+            fanout *= max(rows * float(step.get('filtered') or 100) / 100, 1)
+        if select_id == min(selects):
+            outer_rows = fanout
+        elif str(steps[0].get('select_type') or '').startswith('DEPENDENT'):
+            select_examined *= outer_rows
+        examined += select_examined
+    return int(examined)
+
+
+def sqlite_examined_rows(plan, table_rows):
+    """
+    Rows an SQLite EXPLAIN QUERY PLAN implies, for the embedded backend and the test
+    stand-in: a SCAN reads its whole table per row of the loops around it, a SEARCH about
+    ten rows, an automatic index costs one pass to build, and a correlated subquery runs
+    once per outer row.
+
+    Args:
+        plan: EXPLAIN QUERY PLAN rows (id, parent, notused, detail)
+        table_rows: Function from a plan step's table name or alias to its row count
+    """
+    children = {}
+    for step in plan:
+        children.setdefault(step['parent'], []).append(step)
+
+    def examined(parent, outer):
+        total, fanout = 0, outer
+        for step in children.get(parent, []):
+            detail = step['detail']
+            words = detail.split()
+            if words[0] == 'SCAN':
+                rows = table_rows(words[1])
+                total += fanout * rows
+                fanout *= max(rows, 1)
+            elif words[0] == 'SEARCH':
+                table = table_rows(words[1])
+                if 'AUTOMATIC' in detail:
+                    total += table
+                # SQLite's own guess without ANALYZE: an index lookup finds about ten rows
+                rows = 1 if 'PRIMARY KEY' in detail else min(table, 10)
+                total += fanout * rows
+                fanout *= max(rows, 1)
+            elif detail.startswith('CORRELATED'):
+                total += examined(step['id'], fanout)
+            else:
+                total += examined(step['id'], 1)
+        return total
+
+    return int(examined(0, 1))
+
+
+# DuckDB operators that compare every row of one input with every row of the other
+_DUCKDB_PAIRWISE_JOINS = {'NESTED_LOOP_JOIN', 'BLOCKWISE_NL_JOIN', 'PIECEWISE_MERGE_JOIN', 'CROSS_PRODUCT'}
+
+
+def duckdb_examined_rows(plan):
+    """
+    Rows a DuckDB EXPLAIN (FORMAT JSON) plan implies: every operator's estimated output,
+    plus the product of the inputs for joins that pair rows without a hash table.
+    DuckDB unnests correlated subqueries into joins, so they need no separate case.
+    """
+    def examined(node):
+        """(rows examined under node, node's estimated output)"""
+        children = [examined(child) for child in node.get('children', [])]
+        total = sum(rows for rows, _ in children)
+        pairwise = node['name'].strip() in _DUCKDB_PAIRWISE_JOINS
+        product = 1
+        for _, output in children:
+            product *= max(output, 1)
+        estimate = node.get('extra_info', {}).get('Estimated Cardinality')
+        # Cross products carry no estimate of their own
+        output = int(estimate) if estimate else (product if pairwise else max((output for _, output in children), default=0))
+        if pairwise:
+            total += product
+        return total + output, output
+
+    return int(sum(examined(node)[0] for node in plan))
+
+
+class SqlGovernor:
+    """
+    Gate in front of SQL written by the LLM chains.
+
+    Before a generated query runs it must be a single read, and its EXPLAIN plan must not
+    expect to examine more than row_budget rows. It then runs with a server-side time limit
+    (MAX_EXECUTION_TIME on MySQL) and a LIMIT just past max_rows. Anything refused or
+    stopped raises QueryRejected, which run_generated feeds back to the chain.
+
+    Args:
+        row_budget: Most rows a plan may expect to examine
+        timeout_ms: Execution time limit per query
+        max_rows: Most rows a query may return
+    """
+
+    def __init__(self, row_budget=ROW_BUDGET, timeout_ms=TIMEOUT_MS, max_rows=MAX_ROWS):
+        self.row_budget = row_budget
+        self.timeout_ms = timeout_ms
+        self.max_rows = max_rows
+        self.rejected = {}
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Governor set by SQL_ROW_BUDGET, SQL_TIMEOUT_MS and SQL_MAX_ROWS, unless overridden."""
+        settings = {
+            'row_budget': int(os.getenv("SQL_ROW_BUDGET", ROW_BUDGET)),
+            'timeout_ms': int(os.getenv("SQL_TIMEOUT_MS", TIMEOUT_MS)),
+            'max_rows': int(os.getenv("SQL_MAX_ROWS", MAX_ROWS)),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    def _reject(self, reason, message, **details):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        print(f"⚠ Rejected generated SQL ({reason}): {message}")
+        return QueryRejected(reason, message, **details)
+
+    def check_statement(self, query):
+        """The query without fences, if it is one read statement."""
+        query = clean_sql(query)
+        if ';' in top_level(query):
+            raise self._reject('multiple_statements', "Only one SQL statement can run at a time", query=query,
+                               hint="Return a single SELECT statement.")
+        if not is_read(query):
+            raise self._reject('not_read', "Only SELECT queries can run", query=query,
+                               hint="Return a single SELECT statement that reads the data.")
+        return query
+
+    def estimate(self, query, connection):
+        """Rows the plan of query expects to examine on connection."""
+        cursor = connection.cursor()
+        try:
+            dialect = dialect_of(connection)
+            if dialect == 'duckdb':
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+                return duckdb_examined_rows(json.loads(cursor.fetchall()[0][1]))
+            if dialect == 'sqlite':
+                plan = _plan(cursor, f"EXPLAIN QUERY PLAN {query}")
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                existing = {row[0] for row in cursor.fetchall()}
+                tables = {name: name for name in existing}
+                tables.update({alias: table for table, alias in _SQLITE_TABLE.findall(query) if alias and table in existing})
+
+                def table_rows(name):
+                    table = tables.get(name)
+                    if table is None:  # A materialized subquery or CTE, counted where it is built
+                        return 1
+                    cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                    return cursor.fetchone()[0]
+
+                return sqlite_examined_rows(plan, table_rows)
+            return mysql_examined_rows(_plan(cursor, f"EXPLAIN {query}"))
+        finally:
+            cursor.close()
+
+    def check(self, query, connection):
+        """The cleaned query, after the statement and cost checks."""
+        query = self.check_statement(query)
+        try:
+            estimated = self.estimate(query, connection)
+        except Exception as err:
+            if not _is_database_error(err):
+                raise
+            # A query that can't be planned won't run either; let the chain see why
+            raise self._reject('error', f"The query could not be planned: {err}", query=query,
+                               hint="Check the table and column names against the schema.") from err
+        if estimated > self.row_budget:
+            raise self._reject(
+                'too_expensive', f"The query would examine about {estimated:,} rows, over the budget of {self.row_budget:,}",
+                query=query, estimated_rows=estimated,
+                hint="Filter on season, gameDate, a team or a player, and avoid correlated subqueries.")
+        return query
+
+    def _stopped(self, err, query, connection):
+        timed_out = (getattr(err, 'errno', None) in _TIMEOUT_ERRNOS
+                     or dialect_of(connection) != 'mysql' and 'interrupted' in str(err).lower())
+        if timed_out:
+            return self._reject('timeout', f"The query ran longer than {self.timeout_ms} ms", query=query,
+                                hint="Narrow the filters or simplify the joins.")
+        return self._reject('error', f"The query failed: {err}", query=query,
+                            hint="Check the table and column names against the schema.")
+
+    def _execute(self, query, connection):
+        # Embedded databases have no MAX_EXECUTION_TIME hint; they are interrupted from outside
+        with time_limit(connection, self.timeout_ms):
+            cursor = connection.cursor()
+            try:
+                started = time.perf_counter()
+                cursor.execute(governed_query(query, self.max_rows, self.timeout_ms, dialect_of(connection)))
+                executed = time.perf_counter()
+                columns = [description[0] for description in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                note_execution(executed - started, time.perf_counter() - executed)
+                return rows
+            finally:
+                cursor.close()
+
+    def run(self, query, db_connection):
+        """
+        Check and run a generated query; its rows as dicts, like run_query_mysql.
+
+        Raises:
+            QueryRejected: The query was refused, stopped, failed or returned more than max_rows rows
+        """
+        # Rejections are recorded too, as errors named by their reason
+        with QUERY_METRICS.measure(query) as measurement, checkout(db_connection) as connection:
+            query = self.check(query, connection)
+
+            @measurement.run
+            def run(_):
+                try:
+                    return self._execute(query, connection)
+                except Exception as err:
+                    if not _is_database_error(err):
+                        raise
+                    raise self._stopped(err, query, connection) from err
+
+            rows = measurement.result(
+                run(query) if _raw_sqlite(connection) else
+                database_init.QUERY_CACHE.fetch(query, run, read_versions=lambda: database_init.read_data_versions(db_connection)))
+            if len(rows) > self.max_rows:
+                raise self._reject('too_many_rows', f"The query returned more than {self.max_rows} rows", query=query,
+                                   hint="Aggregate the rows or add a LIMIT with an ORDER BY.")
+        return rows
+
+    def frame(self, query, db_connection, max_rows):
+        """
+        Check a generated query and stream its result into a DataFrame of at most max_rows rows.
+
+        Raises:
+            QueryRejected: As run
+        """
+        with checkout(db_connection) as connection:
+            query = self.check(query, connection)
+            dialect = dialect_of(connection)
+        try:
+            # Capped before the hint goes in, so the hint stays on the statement's first SELECT
+            return fetch_frame(governed_query(query, max_rows, self.timeout_ms, dialect), db_connection, max_rows=max_rows)
+        except ResultTooLarge as err:
+            raise self._reject('too_many_rows', str(err), query=query,
+                               hint="Add filters on season, gameDate, a team or a player.") from err
+        except mysql.connector.Error as err:
+            raise self._stopped(err, query, connection) from err
+
+
+def run_generated(sql_chain, inputs, db_connection, execute, attempts=ATTEMPTS):
+    """
+    Write a query with sql_chain and run it with execute(query, db_connection). A rejected
+    query is sent back to the chain, with the reason added to the question, up to attempts times.
+
+    Returns:
+        (query, result of execute)
+
+    Raises:
+        QueryRejected: Every attempt was rejected
+    """
+    question = inputs['question']
+    for attempt in range(attempts):
+        query = sql_chain.invoke({**inputs, 'question': question})
+        try:
+            return query, execute(query, db_connection)
+        except QueryRejected as err:
+            if attempt + 1 == attempts:
+                raise
+            question = f"{inputs['question']}\n\n{err.feedback()}"
+
+
+def run_generated_rows(sql_chain, inputs, db_connection, governor=None, attempts=ATTEMPTS):
+    """
+    run_generated through governor.run, for chains that hand the rows to an answering
+    prompt: a final rejection is returned as the result, as QueryRejected.to_dict().
+    """
+    governor = governor or SQL_GOVERNOR
+    try:
+        return run_generated(sql_chain, inputs, db_connection, governor.run, attempts)
+    except QueryRejected as err:
+        return err.query, err.to_dict()
+
+
+# Shared by every chain in this process
+SQL_GOVERNOR = SqlGovernor.from_env()
+
+
+def governed_shot_frame(query, db_connection):
+    """fetch_shot_frame behind SQL_GOVERNOR: shot-level rows for plots and xG tables, capped at query_stream.MAX_ROWS."""
+    return SQL_GOVERNOR.frame(query, db_connection, query_stream.MAX_ROWS)
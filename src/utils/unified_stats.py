@@ -0,0 +1,182 @@
+import re
+
+import pandas as pd
+from sqlalchemy import Float, Text, inspect, text
+from utils.bulk_load import upsert
+
+# Season summary stats used to live in one table per kind, season type and year
+# (skaterstats_regular_2024, ...), so a question about five seasons was a five-way UNION.
+# They now go into one table per kind, keyed by season, season type, situation and the
+# entity a row describes, and the per-year names are views over those tables.
+STATS_KINDS = {
+    # kind: (multi-season table, column identifying the player, line, pairing or team)
+    'skater': ('skater_stats', 'playerId'),
+    'goalie': ('goalie_stats', 'playerId'),
+    'line': ('line_stats', 'lineId'),
+    'pair': ('pair_stats', 'lineId'),
+    'team': ('team_stats', 'team'),
+}
+
+_PER_YEAR_TABLE = re.compile(r'^(skater|goalie|line|pair|team)stats_(regular|playoffs)_(\d{4})$', re.IGNORECASE)
+
+
+def parse_stats_table(table_name):
+    """(kind, season_type, season) of a per-year stats table name, or None for any other table."""
+    match = _PER_YEAR_TABLE.match(table_name)
+    if match is None:
+        return None
+    kind, season_type, season = match.groups()
+    return kind.lower(), season_type.lower(), int(season)
+
+
+def per_year_table(kind, season_type, season):
+    return f"{kind}stats_{season_type}_{season}"
+
+
+def stats_key(kind):
+    """Unique key of a multi-season table."""
+    return ['season', 'season_type', 'situation', STATS_KINDS[kind][1]]
+
+
+def lookup_index(kind):
+    """
+    Secondary index for one entity across seasons: equality on the first three columns
+    leaves a range over season, so a career is one short index range scan.
+    """
+    table, entity = STATS_KINDS[kind]
+    return f"idx_{table}_lookup", [entity, 'season_type', 'situation', 'season']
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _add_missing_columns(engine, table_name, df):
+    # MoneyPuck adds columns now and then; older seasons simply have NULL in them
+    if not inspect(engine).has_table(table_name):
+        return
+    existing = {column['name'].lower() for column in inspect(engine).get_columns(table_name)}
+    missing = [column for column in df.columns if column.lower() not in existing]
+    with engine.begin() as connection:
+        for column in missing:
+            column_type = Float() if pd.api.types.is_numeric_dtype(df[column]) else Text()
+            connection.execute(text(f"ALTER TABLE {_quote(engine, table_name)} ADD COLUMN {_quote(engine, column)} "
+                                    f"{column_type.compile(dialect=engine.dialect)}"))
+    if missing:
+        print(f"✔ Added columns {missing} to '{table_name}'")
+
+
+def _delete_stale_rows(engine, table_name, df, key_columns, season, season_type):
+    """Delete rows of this season and season type that are no longer in the source file."""
+    entity_columns = key_columns[2:]
+    quoted = ', '.join(_quote(engine, column) for column in entity_columns)
+    with engine.connect() as connection:
+        existing = pd.DataFrame(connection.execute(text(
+            f"SELECT {quoted} FROM {_quote(engine, table_name)} WHERE season = :season AND season_type = :season_type"),
+            {'season': season, 'season_type': season_type}).fetchall(), columns=entity_columns)
+    current = set(df[entity_columns].astype(str).itertuples(index=False, name=None))
+    stale = [row for row in existing.astype(str).itertuples(index=False, name=None) if row not in current]
+    if not stale:
+        return 0
+    conditions = ' AND '.join(f"{_quote(engine, column)} = :{column}" for column in entity_columns)
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"DELETE FROM {_quote(engine, table_name)} WHERE season = :season AND season_type = :season_type AND {conditions}"),
+            [dict(zip(entity_columns, row), season=season, season_type=season_type) for row in stale])
+    return len(stale)
+
+
+def _ensure_lookup_index(engine, kind):
+    table_name = STATS_KINDS[kind][0]
+    name, columns = lookup_index(kind)
+    if any(index['name'] == name for index in inspect(engine).get_indexes(table_name)):
+        return
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE INDEX {_quote(engine, name)} ON {_quote(engine, table_name)} "
+                                f"({', '.join(_quote(engine, column) for column in columns)})"))
+
+
+def write_unified_stats(engine, df, table_name):
+    """
+    Merge one per-year stats file into its multi-season table.
+
+    Args:
+        engine: SQLAlchemy engine
+        df: Contents of the per-year file, e.g. MoneyPuck's skaters.csv for one season
+        table_name: Per-year table name the file belongs to, e.g. "skaterstats_regular_2024"
+
+    Returns:
+        int: Number of rows upserted
+    """
+    kind, season_type, season = parse_stats_table(table_name)
+    unified = STATS_KINDS[kind][0]
+    key_columns = stats_key(kind)
+    df = df.assign(season=season, season_type=season_type)
+    # MoneyPuck's teams file repeats the team column; pandas renames the copy team.1
+    df = df.loc[:, ~df.columns.str.contains(r'\.\d+$')]
+
+    _add_missing_columns(engine, unified, df)
+    if inspect(engine).has_table(unified):
+        _delete_stale_rows(engine, unified, df, key_columns, season, season_type)
+    upserted = upsert(df, unified, engine, key_columns)
+    _ensure_lookup_index(engine, kind)
+    return upserted
+
+
+def per_year_tables(engine, kind=None):
+    """Per-year stats tables (of kind, if given) still stored as tables, oldest season first."""
+    tables = [name for name in inspect(engine).get_table_names()
+              if parse_stats_table(name) and kind in (None, parse_stats_table(name)[0])]
+    return sorted(tables, key=lambda name: parse_stats_table(name)[2])
+
+
+def backfill_unified_stats(engine, kind):
+    """
+    Merge the per-year tables of kind whose season isn't in the multi-season table yet.
+
+    Until utils.migrate_unified_stats has run, ingestion only loads the current season, so
+    without this the readers of the multi-season tables would find no earlier seasons.
+
+    Returns:
+        list of the per-year tables merged
+    """
+    unified = STATS_KINDS[kind][0]
+    loaded = set()
+    if inspect(engine).has_table(unified):
+        with engine.connect() as connection:
+            loaded = {(int(season), season_type) for season, season_type in connection.execute(text(
+                f"SELECT DISTINCT season, season_type FROM {_quote(engine, unified)}"))}
+    merged = []
+    for table_name in per_year_tables(engine, kind):
+        _, season_type, season = parse_stats_table(table_name)
+        if (season, season_type) in loaded:
+            continue
+        df = pd.read_sql(text(f"SELECT * FROM {_quote(engine, table_name)}"), engine)
+        write_unified_stats(engine, df, table_name)
+        print(f"✔ Merged {len(df)} rows of '{table_name}' into '{unified}'")
+        merged.append(table_name)
+    return merged
+
+
+def ensure_compat_view(engine, table_name):
+    """
+    Point the per-year name at its slice of the multi-season table.
+
+    Returns:
+        bool: False if a table still exists under that name (not migrated yet), True once the view is in place
+    """
+    kind, season_type, season = parse_stats_table(table_name)
+    inspector = inspect(engine)
+    if table_name.lower() in {name.lower() for name in inspector.get_table_names()}:
+        return False
+    select = (f"SELECT * FROM {_quote(engine, STATS_KINDS[kind][0])} "
+              f"WHERE season = {season} AND season_type = '{season_type}'")
+    view = _quote(engine, table_name)
+    with engine.begin() as connection:
+        if engine.dialect.name == 'mysql':
+            # Recreated on every load, since MySQL fixes a view's columns when it is created
+            connection.execute(text(f"CREATE OR REPLACE VIEW {view} AS {select}"))
+        else:
+            connection.execute(text(f"DROP VIEW IF EXISTS {view}"))
+            connection.execute(text(f"CREATE VIEW {view} AS {select}"))
+    return True
@@ -14,6 +14,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 # Add the project root to the Python path
 sys.path.insert(0, project_root)
 
+# App modules import each other as top-level packages (e.g. utils.database_init), as when run from src
+sys.path.insert(1, os.path.join(project_root, 'src'))
+
 @pytest.fixture(autouse=True)
 def mock_streamlit_session_state():
     """Mock the Streamlit session state for testing."""
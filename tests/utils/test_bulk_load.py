@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from src.utils.bulk_load import _write_load_file, bulk_load, has_unique_key, swap_load, upsert
+
+
+@pytest.fixture
+def engine():
+    return create_engine('sqlite://')
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'playerId': pd.array([8478402, None, 8477934], dtype='Int32'),
+        'name': ['Connor McDavid', 'Ryan "Nuge" Nugent-Hopkins', None],
+        'xGoal': [0.25, np.nan, 0.5],
+        'isHome': [True, False, True],
+        'team': pd.Categorical(['EDM', 'EDM', 'EDM']),
+    })
+
+
+def rows(engine, query):
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(text(query))]
+
+
+def test_replace_then_append(engine, frame):
+    assert bulk_load(frame, 'players', engine, if_exists="replace") == 3
+    assert bulk_load(frame.iloc[:1], 'players', engine) == 1
+    assert bulk_load(frame, 'players', engine, if_exists="replace") == 3
+
+    assert rows(engine, "SELECT playerId, name, xGoal, isHome, team FROM players") == [
+        (8478402, 'Connor McDavid', 0.25, 1, 'EDM'),
+        (None, 'Ryan "Nuge" Nugent-Hopkins', None, 0, 'EDM'),
+        (8477934, None, 0.5, 1, 'EDM'),
+    ]
+
+
+def test_empty_frame_creates_table(engine, frame):
+    assert bulk_load(frame.iloc[:0], 'players', engine) == 0
+    assert rows(engine, "SELECT COUNT(*) FROM players") == [(0,)]
+
+
+def test_secondary_indexes_are_rebuilt(engine, frame):
+    bulk_load(frame.iloc[:0], 'players', engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX idx_players_team ON players (team, playerId)"))
+
+    bulk_load(frame, 'players', engine, rebuild_indexes_over=1)
+    assert rows(engine, "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'players'") == [
+        ('idx_players_team',)]
+    assert rows(engine, "SELECT COUNT(*) FROM players") == [(3,)]
+
+
+def test_load_file_format(tmp_path, frame):
+    path = tmp_path / 'load.csv'
+    _write_load_file(frame.assign(isHome=frame['isHome'].astype('Int8')), path, batch_rows=2)
+    assert path.read_text(encoding='utf-8').splitlines() == [
+        '8478402,Connor McDavid,0.25,1,EDM',
+        'NULL,"Ryan ""Nuge"" Nugent-Hopkins",NULL,0,EDM',
+        '8477934,NULL,0.5,1,EDM',
+    ]
+
+
+def test_swap_load_keeps_indexes_and_drops_shadow(engine, frame):
+    swap_load(frame, 'players', engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX idx_players_team ON players (team)"))
+
+    swap_load(frame.iloc[:2], 'players', engine)
+    assert rows(engine, "SELECT COUNT(*) FROM players") == [(2,)]
+    assert rows(engine, "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'players'") == [
+        ('idx_players_team',)]
+    assert not inspect(engine).has_table('players__shadow')
+
+
+def test_upsert_inserts_and_updates_by_key(engine):
+    game_logs = pd.DataFrame({
+        'gameId': [2024020001, 2024020001, 2024020001],
+        'playerTeam': ['TOR', 'TOR', 'MTL'],
+        'situation': ['all', '5on5', 'all'],
+        'xGoalsFor': [2.5, 1.5, 3.0],
+    })
+    # The first load adds the unique key through a shadow table, even over duplicate rows
+    upsert(pd.concat([game_logs, game_logs]), 'game_logs', engine, ['gameId', 'playerTeam', 'situation'])
+    assert has_unique_key(engine, 'game_logs', ['gameId', 'playerTeam', 'situation'])
+    assert rows(engine, "SELECT COUNT(*) FROM game_logs") == [(3,)]
+
+    update = pd.DataFrame({
+        'gameId': [2024020001, 2024020002],
+        'playerTeam': ['MTL', 'TOR'],
+        'situation': ['all', 'all'],
+        'xGoalsFor': [3.2, 1.0],
+    })
+    assert upsert(update, 'game_logs', engine, ['gameId', 'playerTeam', 'situation']) == 2
+    assert rows(engine, "SELECT gameId, playerTeam, situation, xGoalsFor FROM game_logs ORDER BY gameId, playerTeam, situation") == [
+        (2024020001, 'MTL', 'all', 3.2),
+        (2024020001, 'TOR', '5on5', 1.5),
+        (2024020001, 'TOR', 'all', 2.5),
+        (2024020002, 'TOR', 'all', 1.0),
+    ]
+    assert not inspect(engine).has_table('game_logs__staging')
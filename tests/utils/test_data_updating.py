@@ -0,0 +1,127 @@
+import io
+import threading
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from src.utils.shots_schema import SHOTS_COLUMNS
+from utils import data_updating
+from utils.query_cache import data_version
+from utils.shots_parquet import mirror_version, read_shots, stamp_mirror
+
+GAMES = [2024030111, 2024030112]
+
+
+class StubFetcher:
+    """Serves the same two-skater shift chart for every game."""
+
+    def __init__(self):
+        self.shift_requests = []
+
+    def fetch_all_shifts(self, game_ids, game_dates=None):
+        self.shift_requests.extend(game_ids)
+        shifts = [
+            {'playerId': 8479318, 'period': 1, 'startTime': '00:00', 'endTime': '01:00',
+             'firstName': 'Auston', 'lastName': 'Matthews', 'teamAbbrev': 'TOR'},
+            {'playerId': 8480018, 'period': 1, 'startTime': '00:00', 'endTime': '01:00',
+             'firstName': 'Nick', 'lastName': 'Suzuki', 'teamAbbrev': 'MTL'},
+        ]
+        return {game_id: shifts for game_id in game_ids}
+
+    def fetch_all_game_dates(self, game_ids):
+        raise AssertionError("every game date should come from game_logs")
+
+
+def write_sources(directory):
+    pd.DataFrame({'playerId': [8479318, 8480018], 'season': 2024, 'name': ['Auston Matthews', 'Nick Suzuki'],
+                  'situation': 'all', 'goals': [30, 25]}).to_csv(directory / 'skaters.csv', index=False)
+    pd.DataFrame({'lineId': ['abc', 'de'], 'season': 2024, 'name': ['A-B-C', 'D-E'], 'position': ['line', 'pairing'],
+                  'situation': 'all', 'xGoalsPercentage': [0.55, 0.48]}).to_csv(directory / 'lines.csv', index=False)
+    pd.DataFrame({'gameId': GAMES, 'playerTeam': ['TOR', 'TOR'], 'situation': ['all', 'all'],
+                  'gameDate': [20250420, 20250422]}).to_csv(directory / 'all_teams.csv', index=False)
+
+    rows = []
+    for game_id in GAMES:
+        for shot in range(3):
+            row = {column: 1 for column in SHOTS_COLUMNS}
+            row.update(shotID=len(rows), season=2024, game_id=game_id % 1_000_000, time=10 + shot * 10,
+                       period=1, xGoal=0.1, teamCode='TOR', isPlayoffGame=1)
+            rows.append(row)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('shots_2024.csv', pd.DataFrame(rows).to_csv(index=False))
+    (directory / 'shots_2024.zip').write_bytes(archive.getvalue())
+
+
+@pytest.fixture
+def source_urls(tmp_path):
+    """A local file server standing in for MoneyPuck; it answers If-Modified-Since with 304."""
+    directory = tmp_path / 'moneypuck'
+    directory.mkdir()
+    write_sources(directory)
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield {
+        'skaterstats_regular_2024': f"{base}/skaters.csv",
+        'linestats_regular_2024': f"{base}/lines.csv",
+        'game_logs': f"{base}/all_teams.csv",
+        'shots_data': f"{base}/shots_2024.zip",
+    }
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+
+
+def scalar(engine, query):
+    with engine.connect() as connection:
+        return connection.execute(text(query)).scalar()
+
+
+def test_main_loads_every_source(engine, source_urls, tmp_path):
+    fetcher = StubFetcher()
+    dag = data_updating.main(engine, fetcher, urls=source_urls, parse_workers=1, parquet_root=tmp_path / 'parquet')
+
+    assert scalar(engine, "SELECT COUNT(*) FROM skaterstats_regular_2024") == 2
+    assert scalar(engine, "SELECT COUNT(*) FROM linestats_regular_2024") == 1
+    assert scalar(engine, "SELECT COUNT(*) FROM pairstats_regular_2024") == 1
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats WHERE season = 2024 AND season_type = 'regular'") == 2
+    assert scalar(engine, "SELECT COUNT(*) FROM game_logs") == 2
+    assert scalar(engine, "SELECT COUNT(*) FROM shots_data") == 6
+    assert scalar(engine, "SELECT gameDate FROM shots_data WHERE nhl_game_id = 2024030112 LIMIT 1") == '2025-04-22'
+    assert scalar(engine, "SELECT COUNT(*) FROM shot_on_ice") == 12
+    assert len(read_shots(columns=['nhl_game_id'], root=tmp_path / 'parquet')) == 6
+    assert {'download:shots_data', 'parse:game_logs', 'write:game_logs', 'write:shots_data'} <= set(dag.timings)
+    # Ingestion only wrote the new games, so the mirror is not stamped as a copy of shots_data
+    assert mirror_version(tmp_path / 'parquet') is None
+
+
+def test_current_mirror_stays_current(engine, source_urls, tmp_path):
+    root = tmp_path / 'parquet'
+    stamp_mirror(root, data_version(engine, 'shots_data'))
+    data_updating.main(engine, StubFetcher(), urls=source_urls, parse_workers=1, parquet_root=root)
+    assert mirror_version(root) == data_version(engine, 'shots_data') == 1
+
+
+def test_second_run_skips_unchanged_sources(engine, source_urls):
+    data_updating.main(engine, StubFetcher(), urls=source_urls, parse_workers=1)
+
+    fetcher = StubFetcher()
+    dag = data_updating.main(engine, fetcher, urls=source_urls, parse_workers=1)
+    assert fetcher.shift_requests == []
+    assert scalar(engine, "SELECT COUNT(*) FROM shots_data") == 6
+    assert all(result is None for name, result in dag.results.items() if not name.startswith('write'))
+    assert all(result == 0 for name, result in dag.results.items() if name.startswith('write'))
@@ -0,0 +1,190 @@
+import threading
+import time
+
+import mysql.connector
+import pytest
+# database_init holds pools by the utils.db_pool import path, so use the same one here
+from utils import database_init
+from utils.db_pool import ConnectionPool, PoolTimeout, checkout
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query):
+        if self.connection.fail_next:
+            self.connection.fail_next = False
+            self.connection.alive = False
+            raise mysql.connector.OperationalError("Lost connection to MySQL server during query")
+        self.query = query
+
+    def fetchall(self):
+        return [{'connection': self.connection.number}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    opened = 0
+
+    def __init__(self, fail_next=False):
+        FakeConnection.opened += 1
+        self.number = FakeConnection.opened
+        self.alive = True
+        self.closed = False
+        self.fail_next = fail_next
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if not self.alive:
+            raise mysql.connector.InterfaceError("MySQL Connection not available")
+
+    def cursor(self, dictionary=False, buffered=False):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**settings):
+    return ConnectionPool(FakeConnection, **settings)
+
+
+def test_connections_are_opened_lazily_and_reused():
+    pool = make_pool(size=3)
+    assert pool.in_use == 0
+    with pool.connection() as first:
+        assert pool.in_use == 1
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats.checkouts == 2
+
+
+def test_exhausted_pool_times_out():
+    pool = make_pool(size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool.stats.timeouts == 1
+
+
+def test_waits_for_a_connection_and_records_the_wait():
+    pool = make_pool(size=1, timeout=2)
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.in_use == 0:
+        time.sleep(0.001)
+    threading.Timer(0.05, release.set).start()
+    with pool.connection():
+        pass
+    holder.join()
+
+    stats = pool.stats.as_dict()
+    assert stats['waited'] == 1
+    assert stats['max_wait_seconds'] >= 0.04
+    assert stats['mean_wait_seconds'] > 0
+
+
+def test_waiter_is_woken_when_a_connection_is_discarded():
+    pool = make_pool(size=1, timeout=5)
+    failing = threading.Event()
+
+    def fail():
+        with pytest.raises(RuntimeError):
+            with pool.connection() as connection:
+                failing.wait()
+                connection.alive = False
+                raise RuntimeError("query failed")
+
+    holder = threading.Thread(target=fail)
+    holder.start()
+    while pool.in_use == 0:
+        time.sleep(0.001)
+    threading.Timer(0.05, failing.set).start()
+    # The dropped connection frees its slot, so this opens a new one instead of timing out
+    with pool.connection() as connection:
+        assert connection.alive
+    holder.join()
+    assert pool.stats.discarded == 1 and pool.stats.max_wait_seconds < 1
+
+
+def test_idle_connection_is_health_checked_and_replaced():
+    pool = make_pool(size=1, ping_after=0)
+    with pool.connection() as connection:
+        pass
+    connection.alive = False
+
+    with pool.connection() as replacement:
+        assert replacement is not connection
+    assert connection.closed
+    assert pool.stats.reconnects == 1
+    assert pool.in_use == 0
+
+
+def test_connection_that_failed_is_dropped():
+    pool = make_pool(size=2)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as connection:
+            connection.alive = False
+            raise RuntimeError("query failed")
+    assert connection.closed
+    assert pool.stats.discarded == 1
+
+    with pool.connection() as healthy:
+        assert healthy is not connection
+
+
+def test_healthy_connection_survives_a_failed_query():
+    pool = make_pool(size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as connection:
+            raise ValueError("bad SQL")
+    with pool.connection() as again:
+        assert again is connection
+
+
+def test_close_and_checkout():
+    pool = make_pool(size=2)
+    with pool.connection() as connection:
+        pass
+    pool.close()
+    assert connection.closed
+
+    raw = FakeConnection()
+    with checkout(raw) as same:
+        assert same is raw
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv('MYSQL_POOL_SIZE', '8')
+    monkeypatch.setenv('MYSQL_POOL_TIMEOUT', '2.5')
+    pool = ConnectionPool.from_env(FakeConnection, ping_after=5)
+    assert (pool.size, pool.timeout, pool.ping_after) == (8, 2.5, 5)
+
+
+def test_run_query_mysql_retries_a_lost_connection():
+    pool = ConnectionPool(lambda: FakeConnection(fail_next=FakeConnection.opened == 0), size=2)
+    FakeConnection.opened = 0
+
+    result = database_init.run_query_mysql("SELECT 1", pool)
+    assert result == [{'connection': 2}]
+    assert pool.stats.discarded == 1
+
+
+def test_run_query_mysql_accepts_a_raw_connection():
+    assert database_init.run_query_mysql("SELECT 1", FakeConnection()) == [{'connection': FakeConnection.opened}]
+    assert database_init.run_query_mysql("SELECT 1", FakeConnection(fail_next=True)) is None
@@ -0,0 +1,147 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from src.utils.sql_dialect import translate
+from utils import database_init, query_catalog
+from utils.embedded_db import build_embedded_db, default_data_dir, default_db_path, default_sources, embedded_pool
+from utils.query_cache import QueryCache
+from utils.sql_governor import QueryRejected, SqlGovernor
+
+pytest.importorskip("pyarrow")
+
+from src.utils.shots_parquet import write_shots_parquet  # noqa: E402
+from tests.utils.test_shots_parquet import make_shots  # noqa: E402
+
+BACKENDS = ['sqlite', pytest.param('duckdb', marks=pytest.mark.skipif(importlib.util.find_spec('duckdb') is None,
+                                                                   reason="duckdb is not installed"))]
+
+
+def write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache(max_bytes=0))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / 'data'
+    for season, goals in ((2022, 40), (2023, 69)):
+        write_csv(data / 'skaters' / str(season) / f'skaters_regular_{season}.csv', [
+            {'playerId': 8479318, 'name': 'Auston Matthews', 'situation': situation, 'I_F_goals': goals}
+            for situation in ('all', '5on5')])
+        write_csv(data / 'pairings' / str(season) / f'pairings_regular_{season}.csv', [
+            {'lineId': 'a-b-c', 'position': 'line', 'situation': 'all', 'xGoalsFor': 12.5},
+            {'lineId': 'd-e', 'position': 'pairing', 'situation': 'all', 'xGoalsFor': 20.0}])
+    write_csv(data / 'bio_information' / 'allPlayersLookup.csv', [
+        {'playerId': 8479318, 'name': 'Auston Matthews'}, {'playerId': 8478483, 'name': 'Mitch Marner'}])
+    shots = make_shots([2023020001, 2023020002], season=2023)
+    # TOR (home) wins the first game and loses the second in overtime
+    second = shots['nhl_game_id'] == 2023020002
+    shots.loc[second, 'homeTeamWon'] = 0
+    shots.loc[second & (shots['teamCode'] == 'MTL'), 'period'] = 4
+    write_shots_parquet(shots, data / 'shots')
+    return data
+
+
+@pytest.fixture(params=BACKENDS)
+def db(request, data_dir, tmp_path):
+    path = tmp_path / f'nhl.{request.param}'
+    build_embedded_db(path, request.param, default_sources(data_dir), data_dir / 'shots')
+    pool = embedded_pool(path, request.param, size=2)
+    yield pool
+    pool.close()
+
+
+def test_paths_are_taken_from_the_project_root(monkeypatch, tmp_path):
+    root = Path(__file__).resolve().parents[2]
+    assert Path(default_data_dir()) == root / 'data'
+    assert Path(default_db_path()) == root / 'data' / 'nhl.duckdb'
+    monkeypatch.setenv('EMBEDDED_DB_PATH', 'data/nhl.sqlite')
+    assert Path(default_db_path()) == root / 'data' / 'nhl.sqlite'
+    monkeypatch.setenv('EMBEDDED_DB_PATH', str(tmp_path / 'nhl.sqlite'))
+    assert Path(default_db_path()) == tmp_path / 'nhl.sqlite'
+
+
+def test_translate_mysql_spellings():
+    query = ("SELECT `name`, GROUP_CONCAT(teamCode SEPARATOR '/') FROM shots_data "
+             "WHERE gameDate >= DATE_SUB(CURDATE(), INTERVAL 2 WEEK) AND name LIKE %s AND note = 'IF(%s)' LIMIT 5, 10")
+    assert translate(query, 'duckdb', placeholders=True) == (
+        "SELECT \"name\", string_agg(teamCode, '/') FROM shots_data "
+        "WHERE gameDate >= (CURRENT_DATE - INTERVAL (2) WEEK) AND name ILIKE ? AND note = 'IF(%s)' LIMIT 10 OFFSET 5")
+    assert translate(query, 'sqlite') == (
+        "SELECT \"name\", group_concat(teamCode, '/') FROM shots_data "
+        "WHERE gameDate >= date(CURRENT_DATE, '-' || ((2) * 7) || ' day') AND name LIKE %s AND note = 'IF(%s)' LIMIT 5, 10")
+    assert translate("SELECT IF(goal = 1, YEAR(gameDate), NULL) FROM shots_data", 'sqlite') \
+        == "SELECT iif(goal = 1, CAST(strftime('%Y', gameDate) AS INTEGER), NULL) FROM shots_data"
+    with pytest.raises(ValueError):
+        translate("SELECT 1", 'postgres')
+
+
+def test_same_queries_as_mysql(db):
+    columns = database_init.get_table_info(db, ['bio_info'])['bio_info']
+    assert [column['COLUMN_NAME'] for column in columns] == ['playerId', 'name']
+    assert columns[0]['DATA_TYPE'] in ('integer', 'bigint')
+    tables = {row['TABLE_NAME'] for row in database_init.get_table_info(db)}
+    assert {'skater_stats', 'skaterstats_regular_2023', 'line_stats', 'pair_stats', 'shots_data', 'data_versions'} <= tables
+
+    # Per-year names are views over the multi-season tables
+    assert database_init.run_query_mysql(
+        "SELECT I_F_goals FROM `skaterstats_regular_2023` WHERE situation = 'all'", db) == [{'I_F_goals': 69}]
+    assert database_init.run_query_mysql("SELECT COUNT(*) AS pairs FROM pair_stats", db) == [{'pairs': 2}]
+    assert database_init.run_query_mysql(
+        "SELECT GROUP_CONCAT(DISTINCT teamCode ORDER BY teamCode SEPARATOR ',') AS teams FROM shots_data "
+        "WHERE season = 2023 AND shooterName LIKE 'TOR%'", db) == [{'teams': 'TOR'}]
+    assert database_init.run_query_mysql("SELECT missing FROM bio_info", db) is None
+
+    assert query_catalog.find_player_id(db, 'Marner') == 8478483
+    assert database_init.read_data_versions(db)['shots_data'] == 1
+
+
+def test_governor_on_embedded_backend(db):
+    governor = SqlGovernor(row_budget=100, timeout_ms=1_000, max_rows=5)
+    assert governor.run("SELECT COUNT(*) AS shots FROM shots_data WHERE teamCode = 'TOR'", db) == [{'shots': 4}]
+    with pytest.raises(QueryRejected) as cross:
+        governor.run("SELECT COUNT(*) FROM shots_data a, shots_data b, shots_data c", db)
+    assert cross.value.reason == 'too_expensive'
+    with pytest.raises(QueryRejected) as many:
+        governor.run("SELECT * FROM shots_data", db)
+    assert many.value.reason == 'too_many_rows'
+
+    slow = SqlGovernor(row_budget=10**12, timeout_ms=50, max_rows=10)
+    with pytest.raises(QueryRejected) as stopped:
+        slow.run("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) "
+                 "SELECT COUNT(*) AS c FROM n", db)
+    assert stopped.value.reason == 'timeout'
+    assert slow.run("SELECT COUNT(*) AS shots FROM shots_data", db) == [{'shots': 8}]
+
+
+def test_team_record_query_shape(db):
+    # The record query team_record's prompt teaches, over columns only shots_data's full schema has
+    record = database_init.run_query_mysql("""
+        SELECT
+            SUM(CASE WHEN (scoring_games.homeTeamCode = 'TOR' AND scoring_games.homeTeamWon = 1)
+                       OR (scoring_games.awayTeamCode = 'TOR' AND scoring_games.homeTeamWon = 0) THEN 1 ELSE 0 END) AS wins,
+            COUNT(DISTINCT scoring_games.nhl_game_id) AS total_games,
+            SUM(CASE WHEN ((scoring_games.homeTeamCode = 'TOR' AND scoring_games.homeTeamWon = 0)
+                        OR (scoring_games.awayTeamCode = 'TOR' AND scoring_games.homeTeamWon = 1))
+                      AND shots_with_overtime.overtime = 1 THEN 1 ELSE 0 END) AS overtime_losses
+        FROM
+            (SELECT DISTINCT nhl_game_id, homeTeamCode, awayTeamCode, homeTeamWon
+             FROM shots_data
+             WHERE shooterName = 'TOR shooter 0' AND goal = 1 AND gameDate >= '2025-03-01') AS scoring_games
+        LEFT JOIN
+            (SELECT nhl_game_id, MAX(CASE WHEN period = 4 THEN 1 ELSE 0 END) AS overtime
+             FROM shots_data
+             GROUP BY nhl_game_id) AS shots_with_overtime
+            ON scoring_games.nhl_game_id = shots_with_overtime.nhl_game_id
+    """, db)
+    assert [{key: int(value) for key, value in row.items()} for row in record] == [
+        {'wins': 1, 'total_games': 2, 'overtime_losses': 1}]
+    assert database_init.run_query_mysql(
+        "SELECT COUNT(*) AS lists FROM shots_data WHERE shooting_team_players LIKE '%1%'", db) == [{'lists': 8}]
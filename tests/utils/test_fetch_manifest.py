@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine
+from src.utils.fetch_manifest import FetchManifest
+
+URL = 'https://moneypuck.com/moneypuck/playerData/seasonSummary/2024/regular/skaters.csv'
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = content
+        self.headers = headers or {}
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeServer:
+    """Answers conditional GETs like a static file host, optionally ignoring validators."""
+
+    def __init__(self, content, etag='"v1"', honour_validators=True):
+        self.content = content
+        self.etag = etag
+        self.honour_validators = honour_validators
+        self.requests = []
+        self.responses = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.requests.append(headers or {})
+        if self.honour_validators and (headers or {}).get('If-None-Match') == self.etag:
+            response = FakeResponse(304)
+        else:
+            response = FakeResponse(200, self.content, {'ETag': self.etag, 'Last-Modified': 'Tue, 15 Oct 2024 08:00:00 GMT'})
+        self.responses.append(response)
+        return response
+
+
+@pytest.fixture
+def engine():
+    return create_engine('sqlite://')
+
+
+def test_first_fetch_downloads_and_commit_enables_304(engine):
+    server = FakeServer(b'name,goals\nMcDavid,32\n')
+    manifest = FetchManifest(engine, session=server, block_size=4)
+
+    fetched = manifest.fetch(URL)
+    assert fetched.body.read() == b'name,goals\nMcDavid,32\n'
+    assert server.requests[0] == {}
+
+    # Nothing is recorded until the tables were written
+    assert manifest.fetch(URL) is not None
+    manifest.commit(fetched)
+
+    assert manifest.fetch(URL) is None
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    assert server.requests[-1]['If-Modified-Since'] == 'Tue, 15 Oct 2024 08:00:00 GMT'
+    # Every streamed response went back to the session's pool, downloaded or not
+    assert all(response.closed for response in server.responses)
+
+
+def test_unchanged_hash_is_skipped_without_validators(engine):
+    server = FakeServer(b'name,goals\nMcDavid,32\n', honour_validators=False)
+    manifest = FetchManifest(engine, session=server)
+    manifest.commit(manifest.fetch(URL))
+
+    assert manifest.fetch(URL) is None
+    server.content = b'name,goals\nMcDavid,33\n'
+    assert manifest.fetch(URL, to_file=True).body.read() == b'name,goals\nMcDavid,33\n'
+
+
+def test_manifest_persists_in_the_database(engine):
+    server = FakeServer(b'a,b\n1,2\n')
+    first = FetchManifest(engine, session=server)
+    first.commit(first.fetch(URL))
+
+    assert FetchManifest(engine, session=server).fetch(URL) is None
+
+
+def test_failed_download_returns_none(engine):
+    class FailingServer:
+        def get(self, url, headers=None, stream=False, timeout=None):
+            self.response = FakeResponse(503)
+            return self.response
+
+    server = FailingServer()
+    assert FetchManifest(engine, session=server).fetch(URL) is None
+    assert server.response.closed
@@ -0,0 +1,59 @@
+import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from src.utils.game_dates import game_calendar_from_logs, load_game_calendar, normalize_game_dates, resolve_game_dates
+
+
+@pytest.fixture
+def game_logs():
+    # all_teams.csv has one row per team and situation, with gameDate as YYYYMMDD integers
+    return pd.DataFrame({
+        'gameId': [2024020001, 2024020001, 2024020001, 2024020002, 2024020002],
+        'situation': ['all', 'all', '5on5', 'all', 'all'],
+        'gameDate': [20241004, 20241004, 20241004, 20241008, 20241008],
+    })
+
+
+def test_normalize_game_dates():
+    dates = normalize_game_dates([20241004, '20241008', 20241009.0, '2024-10-10', datetime.date(2024, 10, 11), None])
+    assert dates.tolist() == ['2024-10-04', '2024-10-08', '2024-10-09', '2024-10-10', '2024-10-11', None]
+
+
+def test_game_calendar_from_logs(game_logs):
+    calendar = game_calendar_from_logs(game_logs)
+    assert calendar.to_dict('records') == [
+        {'gameId': 2024020001, 'gameDate': '2024-10-04'},
+        {'gameId': 2024020002, 'gameDate': '2024-10-08'},
+    ]
+
+
+def test_resolve_game_dates_only_fetches_missing_games(game_logs):
+    shots = pd.DataFrame({'nhl_game_id': [2024020001, 2024020002, 2024020003, 2024020003, 2024020001]})
+    requested = []
+
+    def fetch_missing(game_ids):
+        requested.extend(game_ids)
+        return {game_id: '2024-10-09' for game_id in game_ids}
+
+    result = resolve_game_dates(shots, game_calendar_from_logs(game_logs), fetch_missing)
+    assert requested == [2024020003]
+    assert result['gameDate'].tolist() == ['2024-10-04', '2024-10-08', '2024-10-09', '2024-10-09', '2024-10-04']
+
+
+def test_resolve_game_dates_without_fallback(game_logs):
+    shots = pd.DataFrame({'nhl_game_id': [2024020003, 2024020002]})
+    result = resolve_game_dates(shots, game_calendar_from_logs(game_logs))
+    assert result['gameDate'].isna().tolist() == [True, False]
+
+
+def test_load_game_calendar_from_table(game_logs):
+    engine = create_engine('sqlite://')
+    game_logs.to_sql('game_logs', engine, index=False)
+    calendar = load_game_calendar(engine, [2024020002])
+    assert calendar.to_dict('records') == [{'gameId': 2024020002, 'gameDate': '2024-10-08'}]
+
+
+def test_load_game_calendar_missing_table():
+    assert load_game_calendar(create_engine('sqlite://'), [2024020001]).empty
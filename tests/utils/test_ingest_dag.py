@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+from src.utils.ingest_dag import TaskDAG, TaskFailed
+
+
+def test_dependencies_receive_results_in_order():
+    dag = TaskDAG()
+    dag.add('a', lambda: 2)
+    dag.add('b', lambda: 3)
+    dag.add('c', lambda b, a: b * 10 + a, deps=['b', 'a'])
+    assert dag.run()['c'] == 32
+    assert set(dag.timings) == {'a', 'b', 'c'}
+
+
+def test_independent_tasks_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    dag = TaskDAG()
+    for name in 'abc':
+        dag.add(name, barrier.wait)
+    dag.run(max_workers=3)
+
+
+def test_tasks_sharing_a_lock_never_overlap():
+    active, peak = [0], [0]
+    guard = threading.Lock()
+
+    def write():
+        with guard:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with guard:
+            active[0] -= 1
+
+    dag = TaskDAG()
+    for name in 'abcd':
+        dag.add(name, write, lock='game_logs')
+    dag.run(max_workers=4)
+    assert peak[0] == 1
+
+
+def test_failure_skips_dependents_only():
+    def fail():
+        raise ValueError("download failed")
+
+    dag = TaskDAG()
+    dag.add('download:a', fail)
+    dag.add('write:a', lambda _: 1, deps=['download:a'])
+    dag.add('write:b', lambda: 2)
+    with pytest.raises(TaskFailed) as excinfo:
+        dag.run()
+    assert list(excinfo.value.errors) == ['download:a']
+    assert excinfo.value.skipped == ['write:a']
+    assert dag.results == {'write:b': 2}
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    dag = TaskDAG()
+    dag.add('a', lambda _: 1, deps=['b'])
+    dag.add('b', lambda _: 1, deps=['a'])
+    with pytest.raises(ValueError):
+        dag.run()
+
+    dag = TaskDAG()
+    dag.add('a', lambda _: 1, deps=['missing'])
+    with pytest.raises(ValueError):
+        dag.run()
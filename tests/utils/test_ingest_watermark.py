@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from src.utils.ingest_watermark import (delete_game_rows, ensure_watermark_table, ingested_game_ids,
+                                        mark_games_ingested, seed_watermark)
+
+
+@pytest.fixture
+def engine():
+    return create_engine('sqlite://')
+
+
+def count(engine, query):
+    with engine.connect() as connection:
+        return connection.execute(text(query)).scalar()
+
+
+def test_mark_and_lookup(engine):
+    ensure_watermark_table(engine)
+    assert ingested_game_ids(engine, 'shots_data', [2024030111]) == set()
+
+    mark_games_ingested(engine, 'shots_data', {2024030111: 80, 2024030112: 75})
+    mark_games_ingested(engine, 'other_table', {2024030113: 10})
+
+    assert ingested_game_ids(engine, 'shots_data', [2024030111, 2024030113, 2024030114]) == {2024030111}
+    assert ingested_game_ids(engine, 'shots_data', []) == set()
+
+
+def test_marking_twice_updates_the_row(engine):
+    ensure_watermark_table(engine)
+    mark_games_ingested(engine, 'shots_data', {2024030111: 80})
+    mark_games_ingested(engine, 'shots_data', pd.Series({2024030111: 82}))
+    assert count(engine, "SELECT row_count FROM ingested_games") == 82
+    assert count(engine, "SELECT COUNT(*) FROM ingested_games") == 1
+
+
+def test_seed_from_existing_rows_runs_once(engine):
+    pd.DataFrame({'nhl_game_id': [2024030111] * 3 + [2024030112] * 2}).to_sql('shots_data', engine, index=False)
+
+    assert seed_watermark(engine, 'shots_data') == 2
+    assert seed_watermark(engine, 'shots_data') == 0
+    assert count(engine, "SELECT row_count FROM ingested_games WHERE nhl_game_id = 2024030111") == 3
+
+
+def test_seed_without_table(engine):
+    assert seed_watermark(engine, 'shots_data') == 0
+
+
+def test_delete_game_rows_skips_missing_tables(engine):
+    pd.DataFrame({'nhl_game_id': [1, 1, 2]}).to_sql('shots_data', engine, index=False)
+    delete_game_rows(engine, ['shots_data', 'shot_on_ice'], [1])
+    assert count(engine, "SELECT COUNT(*) FROM shots_data") == 1
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from src.utils.nhl_fetch import NHLFetcher
+
+
+class StubNHLHandler(BaseHTTPRequestHandler):
+    """Serves fake shift charts and gamecenter pages, failing some requests once."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            attempt = server.attempts.get(self.path, 0) + 1
+            server.attempts[self.path] = attempt
+        try:
+            time.sleep(0.02)
+            if self.path.startswith('/stats/shiftcharts'):
+                game_id = int(self.path.rsplit('=', 1)[1])
+                if game_id == 2024020003 and attempt == 1:
+                    return self._send(503, {})
+                if game_id == 2024020099:
+                    return self._send(404, {})
+                return self._send(200, {'data': [{'gameId': game_id, 'period': 1}]})
+            if self.path.startswith('/web/gamecenter/'):
+                game_id = int(self.path.split('/')[3])
+                return self._send(200, {'gameDate': f"2024-10-{game_id % 100:02d}"})
+            return self._send(404, {})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNHLHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.attempts = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(stub_server):
+    base = f"http://127.0.0.1:{stub_server.server_address[1]}"
+    fetcher = NHLFetcher(stats_base_url=f"{base}/stats", web_base_url=f"{base}/web",
+                         max_workers=8, per_host_limit=3, retries=2, backoff_factor=0)
+    yield fetcher
+    fetcher.close()
+
+
+def test_fetch_all_shifts_is_ordered(fetcher):
+    game_ids = [2024020005, 2024020001, 2024020004, 2024020002]
+    shifts = fetcher.fetch_all_shifts(game_ids)
+    assert list(shifts) == game_ids
+    for game_id in game_ids:
+        assert shifts[game_id] == [{'gameId': game_id, 'period': 1}]
+
+
+def test_retries_transient_errors(fetcher, stub_server):
+    shifts = fetcher.fetch_all_shifts([2024020003])
+    assert shifts[2024020003] == [{'gameId': 2024020003, 'period': 1}]
+    assert stub_server.attempts['/stats/shiftcharts?cayenneExp=gameId=2024020003'] == 2
+
+
+def test_http_errors_fall_back_to_empty(fetcher):
+    assert fetcher.fetch_all_shifts([2024020099]) == {2024020099: []}
+
+
+def test_per_host_limit(fetcher, stub_server):
+    fetcher.fetch_all_shifts(range(2024020010, 2024020040))
+    assert stub_server.max_in_flight <= 3
+
+
+def test_fetch_all_game_dates(fetcher):
+    dates = fetcher.fetch_all_game_dates([2024020012, 2024020011, 2024020012])
+    assert dates == {2024020012: '2024-10-12', 2024020011: '2024-10-11'}
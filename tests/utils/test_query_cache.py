@@ -0,0 +1,151 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from utils import database_init
+from utils.data_updating import update_table
+from utils.query_cache import QueryCache, bump_data_versions, normalize_sql, referenced_tables
+
+
+class Database:
+    """Stands in for MySQL: counts the queries that reach it."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries = []
+
+    def run(self, query):
+        self.queries.append(query)
+        with self.engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.execute(text(query))]
+
+    def versions(self):
+        with self.engine.connect() as connection:
+            return dict(connection.execute(text("SELECT table_name, version FROM data_versions")).fetchall())
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+    pd.DataFrame({'playerId': [1, 2], 'name': ['Auston Matthews', 'Mitch Marner']}).to_sql('bio_info', engine, index=False)
+    bump_data_versions(engine, ['bio_info'])
+    return engine
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT *\n  FROM   bio_info\tWHERE name = 'A  B' ;") == "SELECT * FROM bio_info WHERE name = 'A  B'"
+
+
+def test_referenced_tables():
+    assert referenced_tables("SELECT * FROM shots_data s JOIN shot_on_ice o ON o.shotID = s.shotID "
+                             "WHERE s.shooterName = 'from bio_info'") == ('shot_on_ice', 'shots_data')
+    assert referenced_tables("SELECT a.x FROM `game_logs` a, bio_info AS b WHERE a.id IN (SELECT id FROM team_stats)"
+                             ) == ('bio_info', 'game_logs', 'team_stats')
+    assert referenced_tables("SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS") == ('information_schema',)
+    assert referenced_tables("SELECT * FROM skaterstats_regular_2024") == ('skater_stats', 'skaterstats_regular_2024')
+
+
+def test_repeated_query_is_served_from_cache(engine):
+    database, cache = Database(engine), QueryCache()
+    query = "SELECT name FROM bio_info WHERE playerId = 1"
+
+    first = cache.fetch(query, database.run, database.versions)
+    first[0]['name'] = 'changed by the caller'
+    again = cache.fetch("SELECT name\n FROM bio_info WHERE playerId = 1;", database.run, database.versions)
+
+    assert again == [{'name': 'Auston Matthews'}]
+    assert len(database.queries) == 1
+    assert cache.metrics()['hits'] == 1 and cache.metrics()['hit_ratio'] == 0.5
+
+
+def test_ingestion_bump_invalidates(engine):
+    database, cache = Database(engine), QueryCache(version_check=0)
+    query = "SELECT COUNT(*) AS players FROM bio_info"
+    assert cache.fetch(query, database.run, database.versions) == [{'players': 2}]
+
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO bio_info VALUES (3, 'William Nylander')"))
+    assert cache.fetch(query, database.run, database.versions) == [{'players': 2}]
+
+    bump_data_versions(engine, ['BIO_INFO'])
+    assert cache.fetch(query, database.run, database.versions) == [{'players': 3}]
+    assert cache.stats.invalidations == 1
+
+
+def test_entries_expire_after_their_table_ttl(engine):
+    database, cache = Database(engine), QueryCache(ttls={'bio_info': 0})
+    for _ in range(2):
+        cache.fetch("SELECT * FROM bio_info", database.run, database.versions)
+    assert len(database.queries) == 2
+    assert cache.stats.expired == 1
+
+
+def test_memory_bound_evicts_least_recently_used(engine):
+    database, cache = Database(engine), QueryCache(max_bytes=1500, max_entry_fraction=1)
+    queries = [f"SELECT name, {n} AS n FROM bio_info" for n in range(4)]
+    for query in queries:
+        cache.fetch(query, database.run)
+        cache.fetch(queries[0], database.run)
+
+    assert cache.bytes <= 1500
+    assert cache.stats.evictions > 0
+    assert database.queries.count(queries[0]) == 1
+
+
+def test_writes_and_volatile_queries_skip_the_cache(engine):
+    database, cache = Database(engine), QueryCache()
+    cache.fetch("SELECT * FROM bio_info", database.run)
+    cache.fetch("DELETE FROM bio_info WHERE playerId = 2", lambda query: None)
+    assert len(cache) == 0
+
+    for _ in range(2):
+        cache.fetch("SELECT name, CURRENT_TIMESTAMP AS at FROM bio_info", database.run)
+    assert len(database.queries) == 3
+    assert cache.stats.uncached == 2
+
+
+def test_update_table_bumps_versions(engine):
+    skaters = pd.DataFrame({'playerId': [1], 'season': [2024], 'situation': ['all'], 'I_F_goals': [69]})
+    update_table(engine, skaters, 'skaterstats_regular_2024')
+    update_table(engine, skaters, 'skaterstats_regular_2024')
+
+    versions = Database(engine).versions()
+    assert versions['skater_stats'] == 2 and versions['skaterstats_regular_2024'] == 2
+    assert versions['information_schema'] == 2
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query):
+        self.connection.queries.append(query)
+        self.query = query
+
+    def fetchall(self):
+        if 'data_versions' in self.query:
+            return [{'table_name': 'skater_stats', 'version': 1}]
+        return [{'name': 'Auston Matthews'}]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+
+def test_run_query_mysql_caches_reads(monkeypatch):
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache())
+    connection = FakeConnection()
+    query = "WITH ranked AS (SELECT name FROM skater_stats) SELECT * FROM ranked"
+
+    for _ in range(3):
+        assert database_init.run_query_mysql(query, connection) == [{'name': 'Auston Matthews'}]
+    database_init.run_query_mysql(query, connection, use_cache=False)
+
+    assert [query for query in connection.queries if 'data_versions' not in query] == [query, query]
+    assert database_init.QUERY_CACHE.metrics()['hits'] == 2
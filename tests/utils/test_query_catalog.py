@@ -0,0 +1,102 @@
+import sqlite3
+
+import mysql.connector
+import pytest
+from utils import database_init, query_catalog
+from utils.db_pool import ConnectionPool
+from utils.query_cache import QueryCache
+
+
+class PreparedCursor:
+    """sqlite3 behind the slice of mysql.connector's prepared dictionary cursor the catalog uses."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.statement = None
+        self.rows = []
+
+    def execute(self, sql, params):
+        if self.connection.fail_next:
+            self.connection.fail_next = False
+            raise mysql.connector.errors.DatabaseError("Unknown prepared statement handler")
+        if sql != self.statement:
+            # mysql.connector prepares on the first execute and on a new statement only
+            self.connection.prepares += 1
+            self.statement = sql
+        self.connection.executes += 1
+        cursor = self.connection.sqlite.execute(sql.replace('%s', '?'), params)
+        columns = [description[0] for description in cursor.description]
+        self.rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        self.connection.closed_cursors += 1
+
+
+class PreparingConnection:
+    def __init__(self):
+        self.sqlite = sqlite3.connect(':memory:', check_same_thread=False)
+        self.sqlite.execute("CREATE TABLE bio_info (playerId INTEGER, name TEXT)")
+        self.sqlite.executemany("INSERT INTO bio_info VALUES (?, ?)",
+                                [(8479318, 'Auston Matthews'), (8478483, 'Mitch Marner'), (8477939, 'William Nylander')])
+        self.prepares = self.executes = self.closed_cursors = 0
+        self.fail_next = False
+
+    def cursor(self, prepared=False, dictionary=False):
+        assert prepared and dictionary
+        return PreparedCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.sqlite.close()
+
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache(max_bytes=0))
+
+
+@pytest.fixture
+def connection():
+    return PreparingConnection()
+
+
+def test_statement_is_prepared_once_per_connection(connection):
+    pool = ConnectionPool(lambda: connection, size=1, health_check=lambda _: None)
+    for name, player_id in (('Matthews', 8479318), ('Marner', 8478483), ('Nylander', 8477939), ('Matthews', 8479318)):
+        assert query_catalog.find_player_id(pool, name) == player_id
+    assert connection.prepares == 1
+    assert connection.executes == 4
+    assert query_catalog.find_player_id(pool, 'Gretzky') is None
+
+
+def test_failed_statement_is_prepared_again(connection):
+    assert query_catalog.find_player_id(connection, 'Marner') == 8478483
+    connection.fail_next = True
+    assert query_catalog.find_player_id(connection, 'Nylander') == 8477939
+    assert connection.prepares == 2
+    assert connection.closed_cursors == 1
+
+
+def test_cache_keys_on_parameters(connection, monkeypatch):
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache(version_check=3600))
+    monkeypatch.setattr(database_init, 'read_data_versions', lambda _db: {})
+    statement = query_catalog.PLAYER_ID_BY_NAME
+    matthews = query_catalog.run_statement(connection, statement, ['%Matthews%'])
+    marner = query_catalog.run_statement(connection, statement, ['%Marner%'])
+    assert matthews == [{'playerId': 8479318}] and marner == [{'playerId': 8478483}]
+    assert query_catalog.run_statement(connection, statement, ['%Matthews%']) == matthews
+    assert connection.executes == 2
+
+
+def test_register_refuses_a_conflicting_statement():
+    assert query_catalog.register('player_id_by_name', query_catalog.CATALOG['player_id_by_name']) == 'player_id_by_name'
+    with pytest.raises(ValueError, match="already registered"):
+        query_catalog.register('player_id_by_name', "SELECT 1")
+    with pytest.raises(ValueError):
+        query_catalog.in_placeholders(0)
+    assert query_catalog.in_placeholders(3) == '%s, %s, %s'
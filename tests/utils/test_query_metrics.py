@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import urllib.request
+
+import mysql.connector
+import pytest
+from utils import database_init, query_catalog, query_stream
+from utils.query_cache import QueryCache
+from utils.query_metrics import OVERFLOW_FINGERPRINT, QueryMetrics, fingerprint, fingerprint_id, serve_metrics, tool_scope
+
+
+class DictCursor:
+    """sqlite3 cursor returning dict rows, like mysql.connector's dictionary=True cursor."""
+
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def execute(self, query, params=()):
+        try:
+            self.cursor.execute(query.replace('%s', '?'), params)
+        except Exception as err:
+            raise mysql.connector.errors.ProgrammingError(str(err)) from err
+
+    def fetchall(self):
+        columns = [description[0] for description in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def close(self):
+        self.cursor.close()
+
+
+class DictConnection:
+    def __init__(self):
+        self.sqlite = sqlite3.connect(':memory:', check_same_thread=False)
+        self.sqlite.execute("CREATE TABLE bio_info (playerId INTEGER, name TEXT)")
+        self.sqlite.executemany("INSERT INTO bio_info VALUES (?, ?)", [(8479318, 'Auston Matthews'), (8478483, 'Mitch Marner')])
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None):
+        return DictCursor(self.sqlite) if dictionary else self.sqlite.cursor()
+
+    def commit(self):
+        self.sqlite.commit()
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = QueryMetrics(slow_seconds=None, slow_log=None)
+    for module in (database_init, query_catalog, query_stream):
+        monkeypatch.setattr(module, 'QUERY_METRICS', metrics)
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache(version_check=3600))
+    monkeypatch.setattr(database_init, 'read_data_versions', lambda _db: {})
+    return metrics
+
+
+def test_fingerprint_ignores_values():
+    assert fingerprint("SELECT * FROM shots_data WHERE season = 2023 AND shooterName = 'Auston Matthews' -- why\n") \
+        == fingerprint("SELECT * FROM shots_data  WHERE season = 2019 AND shooterName = 'Mitch Marner';")
+    assert fingerprint("SELECT * FROM skaterstats_regular_2023 WHERE gameId IN (1, 2, 3) LIMIT 10") \
+        == "SELECT * FROM skaterstats_regular_2023 WHERE gameId IN (?+) LIMIT ?"
+    assert fingerprint("SELECT playerId FROM bio_info WHERE name LIKE %s") == "SELECT playerId FROM bio_info WHERE name LIKE ?"
+
+
+def test_queries_are_recorded_per_tool(metrics):
+    connection = DictConnection()
+    with tool_scope('Player_BIO_information'):
+        first = database_init.run_query_mysql("SELECT name FROM bio_info WHERE playerId = 8479318", connection)
+        again = database_init.run_query_mysql("SELECT name FROM bio_info WHERE playerId = 8479318", connection)
+    assert first == again == [{'name': 'Auston Matthews'}]
+    assert database_init.run_query_mysql("SELECT missing FROM bio_info", connection) is None
+
+    recorded, hit = list(metrics.recent)[:2]
+    assert recorded['tool'] == 'Player_BIO_information' and not recorded['cache_hit']
+    assert recorded['rows'] == 1 and recorded['bytes'] > 0
+    assert recorded['execute_seconds'] > 0 and recorded['seconds'] >= recorded['execute_seconds'] + recorded['fetch_seconds']
+    assert hit['cache_hit'] and hit['execute_seconds'] == 0 and hit['fingerprint'] == recorded['fingerprint']
+
+    # Without a scope the calling function is the tool
+    failed = metrics.recent[-1]
+    assert failed['tool'].endswith(':test_queries_are_recorded_per_tool') and failed['error'] == 'ProgrammingError'
+
+    top = metrics.top()
+    assert top[0]['count'] == 2 and top[0]['cache_hit_ratio'] == 0.5
+    assert top[0]['query'] == "SELECT name FROM bio_info WHERE playerId = ?"
+
+
+def test_streamed_frames_and_statements_are_recorded(metrics):
+    connection = DictConnection()
+    frame = query_stream.fetch_frame("SELECT * FROM bio_info", connection)
+    assert metrics.recent[-1]['rows'] == len(frame) == 2
+    assert metrics.recent[-1]['fetch_seconds'] > 0
+    assert query_catalog.run_statement(connection, query_catalog.PLAYER_ID_BY_NAME, ['%Marner%'], use_cache=False) \
+        == [{'playerId': 8478483}]
+    assert metrics.recent[-1]['rows'] == 1 and not metrics.recent[-1]['cache_hit']
+
+
+def test_slow_queries_are_logged(tmp_path):
+    slow = QueryMetrics(slow_seconds=0, slow_log=tmp_path / 'slow.log')
+    with slow.measure("SELECT * FROM shots_data WHERE season = 2023", tool='shot_map_scatter') as measurement:
+        measurement.result([{'shotID': 1}])
+    entry = json.loads((tmp_path / 'slow.log').read_text().splitlines()[0])
+    assert entry['tool'] == 'shot_map_scatter' and entry['query'] == "SELECT * FROM shots_data WHERE season = 2023"
+    assert entry['rows'] == 1
+
+
+def test_series_are_capped():
+    capped = QueryMetrics(slow_seconds=None, slow_log=None, max_series=3)
+    for column in ('xGoal', 'goal', 'xGoal', 'shotType', 'event', 'goal', 'period'):
+        with capped.measure(f"SELECT {column} FROM shots_data WHERE season = 2024", tool='Stats_SQL_Chain') as measurement:
+            measurement.result([])
+    # The first three shapes keep their series; later new shapes share the tool's overflow series
+    assert len(capped._series) == 4
+    assert capped._series[('Stats_SQL_Chain', fingerprint_id(
+        "SELECT goal FROM shots_data WHERE season = ?"))].count == 2
+    overflow = capped._series[('Stats_SQL_Chain', OVERFLOW_FINGERPRINT)]
+    assert overflow.count == 2 and overflow.query is None
+    assert 'fingerprint="other"' in capped.render()
+
+
+def test_metrics_endpoint(metrics):
+    with metrics.measure("SELECT 1", tool='getDate') as measurement:
+        measurement.result([(1,)])
+    server = serve_metrics(0, metrics=metrics)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics").read().decode()
+        top = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics/top").read())
+    finally:
+        server.shutdown()
+    assert 'nhl_query_seconds_bucket{tool="getDate",fingerprint="' in body and 'le="+Inf"} 1' in body
+    assert 'nhl_query_rows_total{tool="getDate"' in body
+    assert top[0]['tool'] == 'getDate'
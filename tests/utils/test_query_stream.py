@@ -0,0 +1,106 @@
+import sqlite3
+
+import numpy as np
+import pytest
+# query_stream checks for pools by the utils.db_pool import path, so use the same one here
+from utils.db_pool import ConnectionPool
+from utils.query_stream import ResultTooLarge, capped_query, fetch_columns, fetch_frame, fetch_shot_frame, iter_query_frames
+
+
+class StreamingConnection:
+    """sqlite3 behind the slice of the mysql.connector API the streaming fetch uses."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.consumed = 0
+
+    def cursor(self, buffered=True):
+        return self.connection.cursor()
+
+    def consume_results(self):
+        self.consumed += 1
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = StreamingConnection(str(tmp_path / 'shots.db'))
+    connection.connection.execute("CREATE TABLE shots_data (shotID INTEGER, xGoal REAL, shooterName TEXT)")
+    connection.connection.executemany("INSERT INTO shots_data VALUES (?, ?, ?)",
+                                      [(i, i / 100, None if i % 7 == 0 else f"Player {i % 3}") for i in range(25)])
+    connection.connection.commit()
+    return connection
+
+
+def test_frames_come_in_batches(connection):
+    frames = list(iter_query_frames("SELECT * FROM shots_data ORDER BY shotID", connection, batch_size=10))
+    assert [len(frame) for frame in frames] == [10, 10, 5]
+    assert list(frames[0].columns) == ['shotID', 'xGoal', 'shooterName']
+
+    frame = fetch_frame("SELECT * FROM shots_data ORDER BY shotID", connection, batch_size=10)
+    assert frame['shotID'].tolist() == list(range(25))
+
+
+def test_numpy_columns(connection):
+    columns = fetch_columns("SELECT shotID, xGoal FROM shots_data ORDER BY shotID;", connection, batch_size=8)
+    assert columns['shotID'].dtype == np.int64
+    assert np.isclose(columns['xGoal'].sum(), sum(i / 100 for i in range(25)))
+
+
+def test_arrow_columns(connection):
+    pytest.importorskip('pyarrow')
+    table = fetch_columns("SELECT * FROM shots_data WHERE shotID >= 14 ORDER BY shotID", connection,
+                          backend='arrow', batch_size=4)
+    assert table.num_rows == 11
+    assert str(table.schema.field('shooterName').type) == 'string'
+    assert table.column('shooterName').null_count == 2
+
+
+def test_empty_result_keeps_its_columns(connection):
+    frame = fetch_frame("SELECT shotID, xGoal FROM shots_data WHERE shotID < 0", connection)
+    assert frame.empty and list(frame.columns) == ['shotID', 'xGoal']
+    assert list(fetch_columns("SELECT shotID FROM shots_data WHERE shotID < 0", connection)) == ['shotID']
+
+
+def test_row_cap_refuses_large_results(connection):
+    assert len(fetch_frame("SELECT * FROM shots_data", connection, max_rows=25)) == 25
+    with pytest.raises(ResultTooLarge):
+        fetch_frame("SELECT * FROM shots_data", connection, batch_size=10, max_rows=24)
+
+    pool = ConnectionPool(lambda: connection, size=1, health_check=lambda _: None)
+    with pytest.raises(ResultTooLarge, match="more than 3 rows"):
+        list(iter_query_frames("SELECT * FROM shots_data", pool, batch_size=2, max_rows=3))
+    # The pool gets the connection back, ready for the next query
+    assert len(fetch_frame("SELECT * FROM shots_data", pool)) == 25
+
+
+def test_cap_is_a_top_level_limit(connection):
+    # No derived table around the query, whose duplicate column names MySQL would refuse
+    assert capped_query("SELECT a.*, b.* FROM shots_data a JOIN shots_data b USING (shotID);", 10) \
+        == "SELECT a.*, b.* FROM shots_data a JOIN shots_data b USING (shotID)\nLIMIT 11"
+    assert capped_query("SELECT * FROM (SELECT * FROM shots_data LIMIT 500) AS s LIMIT 200", 10) \
+        == "SELECT * FROM (SELECT * FROM shots_data LIMIT 500) AS s LIMIT 11"
+    assert capped_query("SELECT * FROM shots_data LIMIT 5 OFFSET 20", 10) == "SELECT * FROM shots_data LIMIT 5 OFFSET 20"
+    frame = fetch_frame("SELECT a.shotID, b.shotID FROM shots_data a JOIN shots_data b USING (shotID) -- pairs", connection,
+                        max_rows=25)
+    assert len(frame) == 25
+
+
+def test_abandoned_stream_is_drained(connection):
+    frames = iter_query_frames("SELECT * FROM shots_data", connection, batch_size=5)
+    next(frames)
+    frames.close()
+    assert connection.consumed == 1
+
+
+def test_shot_frame_reports_a_too_large_result(connection, monkeypatch):
+    from utils import query_stream
+
+    monkeypatch.setattr(query_stream, 'MAX_ROWS', 10)
+    with pytest.raises(ValueError, match="narrower query"):
+        fetch_shot_frame("SELECT * FROM shots_data", connection)
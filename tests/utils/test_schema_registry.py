@@ -0,0 +1,87 @@
+import re
+
+import pytest
+from utils import database_init
+from utils.query_cache import QueryCache
+from utils.schema_registry import SchemaRegistry
+
+COLUMNS = {
+    'BIO_Info': [('playerId', 'int'), ('name', 'text'), ('position', 'text')],
+    'shots_data': [('shotID', 'int'), ('nhl_game_id', 'int'), ('xGoal', 'float')],
+}
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+
+    def execute(self, query):
+        self.database.queries.append(query)
+        self.query = query
+
+    def fetchall(self):
+        if 'data_versions' in self.query:
+            return [{'table_name': 'information_schema', 'version': self.database.version}]
+        if 'ORDER BY TABLE_NAME' in self.query:
+            return [{'TABLE_NAME': table, 'COLUMN_NAME': column, 'DATA_TYPE': data_type}
+                    for table, columns in sorted(self.database.columns.items()) for column, data_type in columns]
+        table = re.search(r"TABLE_NAME = '(\w+)'", self.query).group(1)
+        return [{'COLUMN_NAME': column, 'DATA_TYPE': data_type} for column, data_type in self.database.columns.get(table, [])]
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.columns = {table: list(columns) for table, columns in COLUMNS.items()}
+        self.version = 1
+        self.queries = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def schema_reads(self):
+        return sum('INFORMATION_SCHEMA' in query for query in self.queries)
+
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    monkeypatch.setattr(database_init, 'QUERY_CACHE', QueryCache(max_bytes=0))
+
+
+def test_prompt_matches_per_table_lookup(tmp_path):
+    database = FakeDatabase()
+    registry = SchemaRegistry(database, snapshot_path=str(tmp_path / 'snapshot.json')).load()
+
+    for tables in (['BIO_Info'], ['shots_data', 'BIO_Info'], ['missing_table']):
+        assert registry.prompt(tables) == str(database_init.get_table_info(database, tables))
+    assert registry.prompt(['bio_info']) == str({'bio_info': database_init.get_table_info(database, ['BIO_Info'])['BIO_Info']})
+
+
+def test_schema_is_read_once_per_version(tmp_path):
+    database = FakeDatabase()
+    registry = SchemaRegistry(database, snapshot_path=str(tmp_path / 'snapshot.json'), version_check=0).load()
+    for _ in range(5):
+        registry.prompt(['shots_data'])
+    assert database.schema_reads() == 1
+
+    database.columns['shots_data'].append(('season', 'smallint'))
+    database.version = 2
+    assert "'season'" in registry.prompt(['shots_data'])
+    assert database.schema_reads() == 2
+
+
+def test_restart_reads_the_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / 'schema' / 'snapshot.json')
+    SchemaRegistry(FakeDatabase(), snapshot_path=snapshot_path).load()
+
+    database = FakeDatabase()
+    registry = SchemaRegistry(database, snapshot_path=snapshot_path).load()
+    assert registry.prompt(['BIO_Info']) == str({'BIO_Info': [{'COLUMN_NAME': column, 'DATA_TYPE': data_type}
+                                                              for column, data_type in COLUMNS['BIO_Info']]})
+    assert database.schema_reads() == 0
+
+    database.version = 2
+    SchemaRegistry(database, snapshot_path=snapshot_path).load()
+    assert database.schema_reads() == 1
@@ -0,0 +1,140 @@
+import gzip
+import json
+import os
+
+import pytest
+from src.utils.nhl_fetch import NHLFetcher
+from src.utils.shift_cache import ShiftChartCache
+
+SHIFTS = [
+    {'period': 1, 'startTime': '00:00', 'endTime': '00:45', 'firstName': 'Auston', 'lastName': 'Matthews', 'teamAbbrev': 'TOR'},
+    {'period': 1, 'startTime': '00:00', 'endTime': '00:50', 'firstName': 'Nick', 'lastName': 'Suzuki', 'teamAbbrev': 'MTL'},
+]
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Records requested URLs and answers with canned shift chart / gamecenter payloads."""
+
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        if 'shiftcharts' in url:
+            return FakeResponse({'data': SHIFTS})
+        return FakeResponse({'gameState': self.game_state})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ShiftChartCache(str(tmp_path / 'cache'), flush_every=1)
+
+
+def test_round_trip_and_manifest(cache):
+    assert cache.get(2024020001) is None
+    assert cache.put(2024020001, SHIFTS, final=True)
+    assert 2024020001 in cache
+    assert cache.get(2024020001) == SHIFTS
+
+    with open(cache.manifest_path) as f:
+        manifest = json.load(f)
+    entry = manifest['games']['2024020001']
+    assert entry['shifts'] == 2
+    assert os.path.exists(os.path.join(cache.objects_dir, f"{entry['sha256']}.json.gz"))
+
+
+def test_identical_charts_share_one_object(cache):
+    cache.put(2024020001, SHIFTS, final=True)
+    cache.put(2024020002, list(SHIFTS), final=True)
+    assert len(os.listdir(cache.objects_dir)) == 1
+
+
+def test_only_final_non_empty_games_are_cached(cache):
+    assert not cache.put(2024020001, SHIFTS, final=False)
+    assert not cache.put(2024020002, [], final=True)
+    assert len(cache) == 0
+
+
+def test_corrupted_entry_is_evicted(cache):
+    cache.put(2024020001, SHIFTS, final=True)
+    object_path = os.path.join(cache.objects_dir, os.listdir(cache.objects_dir)[0])
+    with open(object_path, 'wb') as f:
+        f.write(gzip.compress(b'[]'))
+
+    assert cache.get(2024020001) is None
+    assert 2024020001 not in cache
+    assert not os.path.exists(object_path)
+
+
+def test_corrupted_stream_is_evicted(cache):
+    cache.put(2024020001, SHIFTS, final=True)
+    object_path = os.path.join(cache.objects_dir, os.listdir(cache.objects_dir)[0])
+    with open(object_path, 'rb') as f:
+        data = f.read()
+    # Keep the gzip header, garble the deflate stream after it
+    with open(object_path, 'wb') as f:
+        f.write(data[:10] + b'\xff' * 16 + data[26:])
+
+    assert cache.get(2024020001) is None
+    assert 2024020001 not in cache
+
+
+def test_manifest_persists_across_instances(tmp_path):
+    first = ShiftChartCache(str(tmp_path), flush_every=100)
+    first.put(2024020001, SHIFTS, final=True)
+    first.flush()
+    assert ShiftChartCache(str(tmp_path)).get(2024020001) == SHIFTS
+
+
+def test_fetcher_serves_final_games_from_cache(cache):
+    session = FakeSession(game_state='OFF')
+    fetcher = NHLFetcher(session=session, shift_cache=cache)
+
+    assert fetcher.fetch_all_shifts([2024020001]) == {2024020001: SHIFTS}
+    requests_after_first_pass = len(session.urls)
+    assert fetcher.fetch_all_shifts([2024020001]) == {2024020001: SHIFTS}
+    assert len(session.urls) == requests_after_first_pass
+
+
+def test_fetcher_does_not_cache_live_games(cache):
+    session = FakeSession(game_state='LIVE')
+    fetcher = NHLFetcher(session=session, shift_cache=cache)
+
+    fetcher.fetch_all_shifts([2024020001])
+    fetcher.fetch_all_shifts([2024020001])
+    assert sum('shiftcharts' in url for url in session.urls) == 2
+    assert 2024020001 not in cache
+
+
+def test_fetcher_skips_the_state_check_for_old_games(cache):
+    session = FakeSession(game_state='LIVE')
+    fetcher = NHLFetcher(session=session, shift_cache=cache)
+
+    fetcher.fetch_all_shifts([2024020001], game_dates={2024020001: '2024-10-12'})
+    assert not any('landing' in url for url in session.urls)
+    assert 2024020001 in cache
+
+
+def test_game_date_and_state_share_one_landing_request(cache):
+    session = FakeSession(game_state='OFF')
+    fetcher = NHLFetcher(session=session, shift_cache=cache)
+
+    fetcher.fetch_all_game_dates([2024020001])
+    fetcher.fetch_all_shifts([2024020001])
+    assert sum('landing' in url for url in session.urls) == 1
+    assert 2024020001 in cache
@@ -0,0 +1,110 @@
+import random
+import pandas as pd
+import pytest
+from src.utils.shift_index import ShiftIndex, attribute_players_on_ice, time_to_seconds
+
+TEAMS = ['TOR', 'MTL']
+
+
+def reference_players_on_ice(shifts_data, shot_time, shot_period, team_code):
+    """The original linear scan over the shift chart, used as the expected output."""
+    players_on_ice = {'shooting_team': [], 'opposing_team': []}
+    for shift in shifts_data:
+        start_time = time_to_seconds(shift['startTime'])
+        end_time = time_to_seconds(shift['endTime'])
+        shift_length = end_time - start_time
+        if shift['period'] == shot_period and start_time <= shot_time < end_time and shift_length <= 300:
+            player_name = f"{shift['firstName']} {shift['lastName']}"
+            if shift['teamAbbrev'] == team_code:
+                players_on_ice['shooting_team'].append(player_name)
+            else:
+                players_on_ice['opposing_team'].append(player_name)
+    return ', '.join(players_on_ice['shooting_team']), ', '.join(players_on_ice['opposing_team'])
+
+
+def make_shift(period, start, end, first, last, team):
+    return {
+        'period': period,
+        'startTime': f"{start // 60:02d}:{start % 60:02d}",
+        'endTime': f"{end // 60:02d}:{end % 60:02d}",
+        'firstName': first,
+        'lastName': last,
+        'teamAbbrev': team,
+    }
+
+
+@pytest.fixture
+def synthetic_shifts():
+    """A shuffled, messy shift chart with overlapping, long and empty shifts."""
+    rng = random.Random(7)
+    shifts = []
+    for period in (1, 2, 3, 4):
+        for player in range(40):
+            team = TEAMS[player % 2]
+            t = rng.randint(0, 60)
+            while t < 1200:
+                length = rng.choice([0, 20, 45, 60, 90, 400])
+                shifts.append(make_shift(period, t, min(t + length, 1200), f"First{player}", f"Last{player}", team))
+                t += length + rng.randint(30, 200)
+    shifts.append({**make_shift(1, 100, 140, 'Bad', 'Time', 'TOR'), 'endTime': None})
+    rng.shuffle(shifts)
+    return shifts
+
+
+def test_time_to_seconds():
+    assert time_to_seconds('12:34') == 754
+    assert time_to_seconds(None) == 0
+    assert time_to_seconds('') == 0
+    assert time_to_seconds('bad') == 0
+
+
+def test_matches_linear_scan(synthetic_shifts):
+    index = ShiftIndex(synthetic_shifts)
+    for period in (1, 2, 3, 4, 5):
+        for shot_time in range(0, 1201, 7):
+            for team in TEAMS:
+                expected = reference_players_on_ice(synthetic_shifts, shot_time, period, team)
+                assert index.players_on_ice(shot_time, period, team) == expected
+
+
+def test_shift_boundaries():
+    shifts = [
+        make_shift(1, 100, 150, 'Auston', 'Matthews', 'TOR'),
+        make_shift(1, 150, 200, 'Mitch', 'Marner', 'TOR'),
+        make_shift(1, 90, 160, 'Nick', 'Suzuki', 'MTL'),
+    ]
+    index = ShiftIndex(shifts)
+    # Start time is inclusive and end time is exclusive
+    assert index.players_on_ice(100, 1, 'TOR') == ('Auston Matthews', 'Nick Suzuki')
+    assert index.players_on_ice(150, 1, 'TOR') == ('Mitch Marner', 'Nick Suzuki')
+    assert index.players_on_ice(150, 1, 'MTL') == ('Nick Suzuki', 'Mitch Marner')
+    assert index.players_on_ice(200, 1, 'TOR') == ('', '')
+
+
+def test_empty_and_missing_period():
+    assert ShiftIndex([]).players_on_ice(10, 1, 'TOR') == ('', '')
+    index = ShiftIndex([make_shift(1, 0, 40, 'A', 'B', 'TOR')])
+    assert len(index) == 1
+    assert index.players_on_ice(10, 2, 'TOR') == ('', '')
+
+
+def test_attribute_players_on_ice_matches_per_shot_lookup(synthetic_shifts):
+    rng = random.Random(11)
+    other_game = [dict(shift, teamAbbrev='MTL' if shift['teamAbbrev'] == 'TOR' else 'TOR') for shift in synthetic_shifts]
+    shift_indexes = {2024030111: ShiftIndex(synthetic_shifts), 2024030112: ShiftIndex(other_game)}
+    shots = pd.DataFrame({
+        'nhl_game_id': [rng.choice([2024030111, 2024030112, 2024030113]) for _ in range(300)],
+        'period': [rng.randint(1, 4) for _ in range(300)],
+        'teamCode': [rng.choice(TEAMS) for _ in range(300)],
+    }, index=range(1000, 1300))
+    shots['time'] = [(period - 1) * 1200 + rng.randint(0, 1199) for period in shots['period']]
+
+    result = attribute_players_on_ice(shots.copy(), shift_indexes)
+
+    for idx, row in shots.iterrows():
+        shift_index = shift_indexes.get(row['nhl_game_id'])
+        expected = ('', '')
+        if shift_index is not None:
+            shot_time = row['time'] - (row['period'] - 1) * 1200
+            expected = shift_index.players_on_ice(shot_time, row['period'], row['teamCode'])
+        assert (result.at[idx, 'shooting_team_players'], result.at[idx, 'opposing_team_players']) == expected
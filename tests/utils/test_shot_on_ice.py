@@ -0,0 +1,168 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from src.utils.shift_index import ShiftIndex, attribute_players_on_ice, build_shot_on_ice
+from src.utils.shot_on_ice import ensure_shot_on_ice_table, games_with_shot_on_ice, write_shot_on_ice
+from src.utils.player_game_xg import backfill_player_game_xg, write_player_game_xg
+from stat_hardcode import xg_percent
+from utils.query_catalog import CATALOG
+
+PLAYERS = {
+    1: ('Auston', 'Matthews', 'TOR'),
+    2: ('Mitch', 'Marner', 'TOR'),
+    3: ('William', 'Nylander', 'TOR'),
+    4: ('Nick', 'Suzuki', 'MTL'),
+    5: ('Cole', 'Caufield', 'MTL'),
+}
+
+
+def make_shift(player_id, period, start, end):
+    first, last, team = PLAYERS[player_id]
+    return {
+        'playerId': player_id,
+        'period': period,
+        'startTime': f"{start // 60:02d}:{start % 60:02d}",
+        'endTime': f"{end // 60:02d}:{end % 60:02d}",
+        'firstName': first,
+        'lastName': last,
+        'teamAbbrev': team,
+    }
+
+
+SHIFTS = {
+    2024020001: [
+        make_shift(1, 1, 0, 60), make_shift(2, 1, 0, 60), make_shift(3, 1, 30, 90),
+        make_shift(4, 1, 0, 120), make_shift(5, 1, 45, 120),
+    ],
+    2024020002: [
+        make_shift(1, 1, 0, 100), make_shift(2, 1, 50, 100), make_shift(4, 1, 0, 100),
+    ],
+}
+
+# shotID, nhl_game_id, teamCode, time, xGoal, gameDate, awaySkatersOnIce, homeSkatersOnIce
+SHOTS = pd.DataFrame([
+    (1, 2024020001, 'TOR', 10, 0.10, '2024-10-01', 5, 5),   # Matthews, Marner vs Suzuki
+    (2, 2024020001, 'MTL', 50, 0.30, '2024-10-01', 5, 5),   # Matthews, Marner, Nylander vs Suzuki, Caufield
+    (3, 2024020001, 'TOR', 70, 0.20, '2024-10-01', 5, 5),   # Nylander vs Suzuki, Caufield
+    (4, 2024020002, 'TOR', 20, 0.40, '2024-10-03', 4, 5),   # Matthews vs Suzuki, power play
+    (5, 2024020002, 'TOR', 60, 0.50, '2024-10-03', 5, 5),   # Matthews, Marner vs Suzuki
+], columns=['shotID', 'nhl_game_id', 'teamCode', 'time', 'xGoal', 'gameDate', 'awaySkatersOnIce', 'homeSkatersOnIce'])
+SHOTS['period'] = 1
+SHOTS['season'] = 2024
+SHOTS['goal'] = [0, 1, 0, 1, 0]
+
+
+@pytest.fixture
+def shift_indexes():
+    return {nhl_game_id: ShiftIndex(shifts) for nhl_game_id, shifts in SHIFTS.items()}
+
+
+@pytest.fixture
+def engine(shift_indexes):
+    engine = create_engine('sqlite://')
+    SHOTS.to_sql('shots_data', engine, index=False)
+    bio_info = pd.DataFrame([(player_id, f"{first} {last}") for player_id, (first, last, _) in PLAYERS.items()],
+                            columns=['playerId', 'name'])
+    bio_info.to_sql('bio_info', engine, index=False)
+    write_shot_on_ice(engine, build_shot_on_ice(SHOTS, shift_indexes))
+    write_player_game_xg(engine, SHOTS['nhl_game_id'])
+    return engine
+
+
+@pytest.fixture
+def db(engine, monkeypatch):
+    """Route xg_percent's catalog statements to the SQLite stand-in."""
+    def run_statement(_db, name, params):
+        with engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.exec_driver_sql(CATALOG[name].replace('%s', '?'), tuple(params))]
+    monkeypatch.setattr(xg_percent, 'run_statement', run_statement)
+    return engine
+
+
+def test_bridge_matches_player_columns(shift_indexes):
+    on_ice = build_shot_on_ice(SHOTS, shift_indexes)
+    attributed = attribute_players_on_ice(SHOTS.copy(), shift_indexes)
+    names = {player_id: f"{first} {last}" for player_id, (first, last, _) in PLAYERS.items()}
+
+    for shot in attributed.itertuples():
+        rows = on_ice[(on_ice['nhl_game_id'] == shot.nhl_game_id) & (on_ice['shotID'] == shot.shotID)]
+        for side, column in (('shooting', shot.shooting_team_players), ('opposing', shot.opposing_team_players)):
+            expected = sorted(column.split(', ')) if column else []
+            assert sorted(names[p] for p in rows.loc[rows['side'] == side, 'playerId']) == expected
+
+
+def test_bridge_skips_games_without_shifts():
+    assert build_shot_on_ice(SHOTS, {}).empty
+
+
+def test_table_and_index_are_created(engine):
+    ensure_shot_on_ice_table(engine)
+    with engine.connect() as connection:
+        indexes = [row[1] for row in connection.execute(text("PRAGMA index_list('shot_on_ice')"))]
+    assert 'idx_shot_on_ice_player' in indexes
+    assert games_with_shot_on_ice(engine) == {2024020001, 2024020002}
+    assert games_with_shot_on_ice(engine, [2024020002, 2024020003]) == {2024020002}
+
+
+def test_player_xgpercent(db):
+    # Matthews: for 0.1 + 0.4 + 0.5, against 0.3
+    assert xg_percent.ngames_player_xgpercent(db, 'matthews', 5, 'all') == pytest.approx(1.0 / 1.3)
+    assert xg_percent.ngames_player_xgpercent(db, 'Matthews', 5, 'Even strength') == pytest.approx(0.6 / 0.9)
+    assert xg_percent.ngames_player_xgpercent(db, 'Matthews', 1, 'all') == pytest.approx(1.0)
+    assert xg_percent.date_player_xgpercent(db, 'Matthews', '2024-10-01', '2024-10-02', 'all') == pytest.approx(0.25)
+    assert xg_percent.date_player_xgpercent(db, 'Nobody', '2024-10-01', '2024-10-02', 'all') == 'No shots Given those conditions'
+    with pytest.raises(ValueError):
+        xg_percent.ngames_player_xgpercent(db, 'Matthews', 5, 'power play')
+
+
+def test_line_xgpercent(db):
+    # Matthews and Marner together at even strength: for 0.1 + 0.5, against 0.3
+    assert xg_percent.ngames_line_xgpercent(db, 'Matthews', 'Marner', 'None', 5) == pytest.approx(0.6 / 0.9)
+    assert xg_percent.date_line_xgpercent(db, 'Matthews', 'Marner', 'None', '2024-10-01', '2024-10-02') == pytest.approx(0.25)
+    # The full line was only on the ice together for shot 2
+    assert xg_percent.ngames_line_xgpercent(db, 'Matthews', 'Marner', 'Nylander', 5) == pytest.approx(0.0)
+    # Players on opposite sides never form a line
+    assert xg_percent.ngames_line_xgpercent(db, 'Matthews', 'Suzuki', 'None', 5) == 'No shots Given those conditions'
+
+
+def test_player_game_xg_rollup(engine):
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT nhl_game_id, strength, xGF, xGA, GF, GA FROM player_game_xg WHERE playerId = 1 ORDER BY nhl_game_id, strength"
+        )).all()
+    assert [tuple(row[:2]) + tuple(row[4:]) for row in rows] == [
+        (2024020001, 'even', 0, 1), (2024020002, 'even', 0, 0), (2024020002, 'uneven', 1, 0)]
+    assert [row[2:4] for row in rows] == [pytest.approx((0.1, 0.3)), pytest.approx((0.5, 0.0)), pytest.approx((0.4, 0.0))]
+    # Every game already has rollup rows
+    assert backfill_player_game_xg(engine) == 0
+
+
+def test_games_without_a_date_are_rolled_up(engine, capsys):
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE shots_data SET gameDate = NULL WHERE nhl_game_id = 2024020002"))
+        connection.execute(text("DELETE FROM player_game_xg"))
+    assert write_player_game_xg(engine, SHOTS['nhl_game_id']) == 10
+    assert "1 games rolled up" in capsys.readouterr().out
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM player_game_xg WHERE gameDate IS NULL")).scalar() == 5
+
+
+def bridge_xgpercent(db, statement, params):
+    """The player xG% as the shot-level bridge query computes it."""
+    xgoals_for, xgoals_against = xg_percent.on_ice_xgoals(db, statement, params)
+    total = xgoals_for + xgoals_against
+    return xgoals_for / total if total else 'No shots Given those conditions'
+
+
+@pytest.mark.parametrize('situation', ['all', 'Even strength'])
+@pytest.mark.parametrize('name', ['Matthews', 'marner', 'Nylander', 'Suzuki', 'Caufield', 'Nobody', 'a'])
+def test_rollup_matches_bridge(db, name, situation):
+    """Golden check: the rollup gives the same xG% as the shot-level definition."""
+    key = xg_percent.situation_key(situation)
+    pattern = [f"%{name}%"]
+    for games in (1, 2, 5):
+        expected = bridge_xgpercent(db, xg_percent.PLAYER_NGAMES[key], pattern + pattern + [games])
+        assert xg_percent.ngames_player_xgpercent(db, name, games, situation) == pytest.approx(expected)
+    for start, end in (('2024-10-01', '2024-10-01'), ('2024-10-02', '2024-10-03'), ('2024-09-01', '2024-12-31')):
+        expected = bridge_xgpercent(db, xg_percent.PLAYER_DATES[key], pattern + [start, end])
+        assert xg_percent.date_player_xgpercent(db, name, start, end, situation) == pytest.approx(expected)
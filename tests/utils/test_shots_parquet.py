@@ -0,0 +1,148 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from src.utils.query_cache import bump_data_versions
+from src.utils.shots_schema import SHOTS_COLUMNS, ensure_shots_table, coerce_shots_frame
+from stat_hardcode import xg_percent
+from utils.query_catalog import CATALOG
+
+pytest.importorskip("pyarrow")
+
+from src.utils.shots_parquet import (MIRROR_COLUMNS, is_current, mirror_from_database, mirror_version,  # noqa: E402
+                                     read_shots, write_shots_parquet)
+
+
+def make_shots(games, season=2024, shots_per_team=2):
+    rows = []
+    for game_id in games:
+        for team, is_home in (('TOR', 1), ('MTL', 0)):
+            for shot in range(shots_per_team):
+                row = {column: 1 for column in SHOTS_COLUMNS}
+                row.update(shotID=len(rows), season=season, game_id=game_id % 1_000_000, teamCode=team,
+                           isHomeTeam=is_home, homeTeamCode='TOR', awayTeamCode='MTL', event='SHOT',
+                           xGoal=0.05 * (shot + 1), shooterName=f'{team} shooter {shot}', goalieNameForShot='')
+                rows.append(row)
+    df = pd.DataFrame(rows)
+    return df.assign(nhl_game_id=[game_id for game_id in games for _ in range(2 * shots_per_team)],
+                     shooting_team_players='1,2', opposing_team_players='3,4', gameDate='2025-04-20')
+
+
+def test_partitions_by_season_and_team(tmp_path):
+    write_shots_parquet(make_shots([2024030111, 2024030112]), tmp_path)
+
+    assert sorted(path.relative_to(tmp_path).parent.as_posix() for path in tmp_path.rglob('*.parquet')) == [
+        'season=2024/teamCode=MTL', 'season=2024/teamCode=TOR']
+    shots = read_shots(root=tmp_path)
+    assert len(shots) == 8
+    assert set(shots.columns) == set(MIRROR_COLUMNS)
+
+
+def test_filters_and_projection(tmp_path):
+    write_shots_parquet(make_shots([2023030111], season=2023), tmp_path)
+    write_shots_parquet(make_shots([2024030111]), tmp_path)
+
+    shots = read_shots(columns=['nhl_game_id', 'xGoal'], filters=[('season', '>=', 2024), ('teamCode', '==', 'TOR')],
+                       root=tmp_path)
+    assert list(shots.columns) == ['nhl_game_id', 'xGoal']
+    assert shots['nhl_game_id'].tolist() == [2024030111, 2024030111]
+    assert str(shots['xGoal'].dtype) == 'float64'
+
+    either = read_shots(columns=['shotID'], filters=[[('season', '==', 2023)], [('teamCode', '==', 'MTL')]],
+                        root=tmp_path)
+    assert len(either) == 6
+
+
+def test_backends(tmp_path):
+    write_shots_parquet(make_shots([2024030111]), tmp_path)
+
+    arrow = read_shots(columns=['teamCode', 'xGoal'], root=tmp_path, backend='arrow')
+    assert isinstance(arrow['xGoal'].dtype, pd.ArrowDtype)
+    table = read_shots(columns=['xGoal'], root=tmp_path, backend='table')
+    assert table.num_rows == 4
+    numpy = read_shots(columns=['teamCode', 'period'], root=tmp_path)
+    assert str(numpy['teamCode'].dtype) == 'category'
+    assert str(numpy['period'].dtype) == 'Int8'
+    with pytest.raises(ValueError):
+        read_shots(root=tmp_path, backend='polars')
+
+
+def test_rewriting_a_game_replaces_its_rows(tmp_path):
+    write_shots_parquet(make_shots([2024030111, 2024030112]), tmp_path)
+    # A rerun after a failed ingestion writes one of the games again, in a chunk of its own
+    write_shots_parquet(make_shots([2024030112], shots_per_team=3), tmp_path)
+
+    shots = read_shots(columns=['nhl_game_id'], root=tmp_path)
+    assert shots['nhl_game_id'].value_counts().to_dict() == {2024030112: 6, 2024030111: 4}
+
+
+def test_mirror_from_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+    ensure_shots_table(engine)
+    shots = coerce_shots_frame(make_shots([2023030111], season=2023))
+    shots = pd.concat([shots, coerce_shots_frame(make_shots([2024030111]))], ignore_index=True)
+    shots.to_sql('shots_data', engine, if_exists='append', index=False)
+
+    root = tmp_path / 'parquet'
+    assert mirror_from_database(engine, root) == 8
+    assert mirror_from_database(engine, root, seasons=[2024]) == 4
+    assert len(read_shots(root=root)) == 8
+    # A full rebuild is stamped with shots_data's data_versions stamp, and only matches that stamp
+    assert mirror_version(root) == 0 and is_current(0, root)
+    bump_data_versions(engine, ['shots_data'])
+    assert not is_current(1, root)
+    mirror_from_database(engine, root)
+    assert is_current(1, root) and not is_current(1, tmp_path / 'missing')
+
+
+def test_missing_mirror(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_shots(root=tmp_path / 'missing')
+
+
+def test_team_xgpercent_from_mirror(tmp_path, monkeypatch):
+    games = [2024030111, 2024030112, 2024030113]
+    shots = pd.concat([make_shots([game], shots_per_team=3).assign(gameDate=f'2025-04-2{i}')
+                       for i, game in enumerate(games)], ignore_index=True)
+    shots['shotID'] = range(len(shots))
+    shots['xGoal'] = [0.01 * (i % 7 + 1) for i in range(len(shots))]
+    shots['homeSkatersOnIce'] = [5 if i % 4 else 4 for i in range(len(shots))]
+    shots['awaySkatersOnIce'] = 5
+    # A game TOR did not play
+    other = make_shots([2024030121]).assign(homeTeamCode='BOS', awayTeamCode='NYR', teamCode='BOS', gameDate='2025-04-21')
+    shots = coerce_shots_frame(pd.concat([shots, other.assign(shotID=range(100, 104))], ignore_index=True))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+    ensure_shots_table(engine)
+    shots.to_sql('shots_data', engine, if_exists='append', index=False)
+    mirror = tmp_path / 'parquet'
+    mirror_from_database(engine, mirror)
+
+    def run_statement(_db, name, params):
+        with engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.exec_driver_sql(CATALOG[name].replace('%s', '?'), tuple(params))]
+    monkeypatch.setattr(xg_percent, 'run_statement', run_statement)
+
+    versions = {'shots_data': 0}
+    monkeypatch.setattr(xg_percent, 'current_data_versions', lambda _db: versions)
+
+    def both(function, *args):
+        monkeypatch.setattr(xg_percent, 'SHOTS_PARQUET_DIR', str(tmp_path / 'missing'))
+        from_sql = function(engine, *args)
+        monkeypatch.setattr(xg_percent, 'SHOTS_PARQUET_DIR', str(mirror))
+        monkeypatch.setattr(xg_percent, 'run_statement', None)  # The mirror path never touches the database
+        from_mirror = function(engine, *args)
+        monkeypatch.setattr(xg_percent, 'run_statement', run_statement)
+        return from_sql, from_mirror
+
+    for situation in ('all', 'Even strength'):
+        for game_number in (1, 2, 5):
+            from_sql, from_mirror = both(xg_percent.ngames_team_xgpercent, 'TOR', game_number, situation)
+            assert isinstance(from_sql, float) and from_mirror == pytest.approx(from_sql)
+        for start, end in (('2025-04-20', '2025-04-21'), ('2025-04-22', '2025-04-30')):
+            from_sql, from_mirror = both(xg_percent.date_team_xgpercent, 'MTL', start, end, situation)
+            assert isinstance(from_sql, float) and from_mirror == pytest.approx(from_sql)
+
+    # Once shots_data moves past the mirror's stamp, team xG% goes back to the database
+    versions['shots_data'] = 1
+    monkeypatch.setattr(xg_percent, 'SHOTS_PARQUET_DIR', str(mirror))
+    assert xg_percent.mirror_team_shots(engine, 'TOR', 'all', game_number=1) is None
@@ -0,0 +1,153 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from src.utils.player_game_xg import write_player_game_xg
+from src.utils.shot_on_ice import ensure_shot_on_ice_table, write_shot_on_ice
+from src.utils.shots_schema import SHOTS_COLUMNS, coerce_shots_frame, ensure_shots_table
+from stat_hardcode import xg_percent
+from utils.query_catalog import CATALOG
+
+# The shots_data SQL the LLM chains are prompted with (shot maps, team records), with literals filled in
+GENERATED_QUERIES = [
+    "SELECT * FROM shots_data WHERE season >= 2020 AND season <= 2023 AND shooterName = 'Morgan Rielly'",
+    "SELECT DISTINCT nhl_game_id, homeTeamCode, awayTeamCode, homeTeamWon FROM shots_data "
+    "WHERE shooterName = 'Auston Matthews' AND goal = 1 AND gameDate >= '2025-03-01'",
+    "SELECT DISTINCT nhl_game_id FROM shots_data WHERE teamCode = 'TOR' AND goal = 1 AND gameDate >= '2025-03-01'",
+    "SELECT COUNT(*) FROM shots_data WHERE gameDate BETWEEN '2025-03-01' AND '2025-03-31'",
+    # chains.single_games: one player's multi-goal games, then the same across the league
+    "WITH rel_games AS (SELECT nhl_game_id, shooterName, COUNT(goal) AS goalNum FROM shots_data "
+    "WHERE shooterName = 'Auston Matthews' AND goal = 1 GROUP BY nhl_game_id, shooterName) "
+    "SELECT COUNT(DISTINCT nhl_game_id) FROM rel_games WHERE goalNum >= 4",
+    "WITH rel_games AS (SELECT nhl_game_id, shooterName, COUNT(goal) AS goalNum FROM shots_data "
+    "WHERE goal = 1 GROUP BY nhl_game_id, shooterName) "
+    "SELECT COUNT(DISTINCT nhl_game_id) AS games, shooterName FROM rel_games WHERE goalNum >= 4 GROUP BY shooterName",
+    # On-ice questions: LIKE '%name%' can't seek any index, so it is checked against the goals only
+    "SELECT COUNT(DISTINCT nhl_game_id) FROM shots_data "
+    "WHERE shooting_team_players LIKE '%Auston Matthews%' AND goal = 1 AND isPlayoffGame = 1",
+]
+
+
+def hardcoded_calls(db):
+    """Every hardcoded xG% function, called once per shape of query it builds."""
+    return [
+        lambda: xg_percent.ngames_player_xgpercent(db, 'Matthews', 5, 'all'),
+        lambda: xg_percent.date_player_xgpercent(db, 'Matthews', '2024-10-01', '2024-10-31', 'Even strength'),
+        lambda: xg_percent.ngames_line_xgpercent(db, 'Matthews', 'Marner', 'None', 5),
+        lambda: xg_percent.date_line_xgpercent(db, 'Matthews', 'Marner', 'Nylander', '2024-10-01', '2024-10-31'),
+        lambda: xg_percent.ngames_team_xgpercent(db, 'TOR', 5, 'all'),
+        lambda: xg_percent.ngames_team_xgpercent(db, 'TOR', 5, 'Even strength'),
+        lambda: xg_percent.date_team_xgpercent(db, 'TOR', '2024-10-01', '2024-10-31', 'all'),
+        lambda: xg_percent.date_team_xgpercent(db, 'TOR', '2024-10-01', '2024-10-31', 'Even strength'),
+    ]
+
+
+def make_shots():
+    rows = []
+    for game in range(1, 4):
+        for team, is_home in (('TOR', 1), ('MTL', 0)):
+            row = {column: 1 for column in SHOTS_COLUMNS}
+            row.update(shotID=len(rows), season=2024, game_id=20000 + game, teamCode=team, isHomeTeam=is_home,
+                       homeTeamCode='TOR', awayTeamCode='MTL', event='SHOT', team='HOME' if is_home else 'AWAY',
+                       shooterName='Auston Matthews', goalieNameForShot='', xGoal=0.1)
+            rows.append(row)
+    shots = pd.DataFrame(rows)
+    return coerce_shots_frame(shots.assign(nhl_game_id=2024000000 + shots['game_id'], gameDate='2024-10-15'))
+
+
+def load_fixture(engine):
+    ensure_shots_table(engine)
+    ensure_shot_on_ice_table(engine)
+    shots = make_shots()
+    shots.to_sql('shots_data', engine, if_exists='append', index=False)
+    on_ice = pd.DataFrame({'shotID': shots['shotID'], 'nhl_game_id': shots['nhl_game_id'], 'playerId': 8479318,
+                           'side': shots['teamCode'].map({'TOR': 'shooting', 'MTL': 'opposing'}).astype(str)})
+    write_shot_on_ice(engine, on_ice)
+    write_player_game_xg(engine, shots['nhl_game_id'])
+    pd.DataFrame({'playerId': [8479318, 8478483, 8477939], 'name': ['Auston Matthews', 'Mitch Marner', 'William Nylander']}
+                 ).to_sql('bio_info', engine, if_exists='replace', index=False)
+
+
+def captured_queries(engine, monkeypatch):
+    """Run the hardcoded functions against engine and return the SQL they sent."""
+    queries = []
+
+    def run_statement(_db, name, params):
+        query, params = driver_sql(engine, CATALOG[name]), tuple(params)
+        queries.append((query, params))
+        with engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.exec_driver_sql(query, params)]
+
+    monkeypatch.setattr(xg_percent, 'run_statement', run_statement)
+    # Team xG% would read a built Parquet mirror instead of sending SQL
+    monkeypatch.setattr(xg_percent, 'has_mirror', lambda _root: False)
+    for call in hardcoded_calls(engine):
+        call()
+    return queries
+
+
+def driver_sql(engine, query):
+    """Catalog SQL in the driver's paramstyle: sqlite3 takes ?, MySQL drivers take %s."""
+    return query.replace('%s', '?') if engine.dialect.name == 'sqlite' else query
+
+
+def full_scans(engine, query, params=(), tables=('shots_data', 's', 'shot_on_ice', 'o', 'player_game_xg')):
+    """
+    Plan steps of query that walk a whole shots table (SQLite). A SCAN is a full pass even
+    when it goes through an index; only SEARCH steps seek into one.
+    """
+    with engine.connect() as connection:
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {query}", params)]
+    return [step for step in plan if step.startswith('SCAN') and step.split()[1] in tables]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+    load_fixture(engine)
+    return engine
+
+
+def test_hardcoded_queries_use_indexes(engine, monkeypatch):
+    queries = captured_queries(engine, monkeypatch)
+    # The two player calls look the player up before summing their player_game_xg rows
+    assert len(queries) == 10
+    for query, params in queries:
+        assert full_scans(engine, query, params) == [], query
+
+
+@pytest.mark.parametrize('query', GENERATED_QUERIES)
+def test_generated_query_shapes_use_indexes(engine, query):
+    assert full_scans(engine, query) == []
+
+
+def test_unindexed_filter_is_reported(engine):
+    # Guard against the check passing vacuously
+    assert full_scans(engine, "SELECT * FROM shots_data WHERE shotType = 'WRIST'") != []
+    # Without goal = 1 an on-ice LIKE reads every shot; on MySQL a season filter prunes it
+    # to that season's partitions, and the SQL governor's row budget refuses it otherwise
+    assert full_scans(engine, "SELECT COUNT(*) FROM shots_data WHERE shooting_team_players LIKE '%Matthews%'") != []
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not os.getenv('MYSQL_TEST_URL'), reason="set MYSQL_TEST_URL to a scratch MySQL database")
+def test_mysql_plans_use_indexes_and_prune_partitions(monkeypatch):
+    engine = create_engine(os.environ['MYSQL_TEST_URL'])
+    with engine.begin() as connection:
+        for table in ('shots_data', 'shot_on_ice', 'player_game_xg', 'bio_info'):
+            connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    load_fixture(engine)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE TABLE shots_data, shot_on_ice, player_game_xg")).fetchall()
+
+    for query, params in captured_queries(engine, monkeypatch) + [(query, ()) for query in GENERATED_QUERIES]:
+        with engine.connect() as connection:
+            plan = [dict(row._mapping) for row in connection.exec_driver_sql(f"EXPLAIN {query}", params)]
+        for step in plan:
+            if step['table'] in ('shots_data', 's', 'shot_on_ice', 'o', 'player_game_xg'):
+                assert step['key'] is not None, (query, step)
+
+    with engine.connect() as connection:
+        step = dict(connection.execute(text(f"EXPLAIN {GENERATED_QUERIES[0]}")).first()._mapping)
+    assert set(step['partitions'].split(',')) == {'p2020', 'p2021', 'p2022', 'p2023'}
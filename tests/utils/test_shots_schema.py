@@ -0,0 +1,51 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect
+from src.utils.shots_schema import (SHOTS_COLUMNS, SHOTS_INDEXES, SHOTS_TABLE_COLUMNS, coerce_shots_frame,
+                                    current_season, ensure_shots_table, shots_table_ddl)
+
+
+def test_every_column_has_a_compact_type():
+    ddl = shots_table_ddl()
+    for column in SHOTS_TABLE_COLUMNS:
+        assert f"    {column} " in ddl
+    assert 'BIGINT' not in ddl
+    # Only the on-ice player lists are TEXT and only xGoal is DOUBLE
+    assert ddl.count(' TEXT') == 2 and 'shooting_team_players TEXT' in ddl
+    assert ddl.count(' DOUBLE') == 1 and 'xGoal DOUBLE' in ddl
+    assert "team ENUM('HOME','AWAY')" in ddl
+    assert 'PRIMARY KEY (nhl_game_id, shotID, season)' in ddl
+
+
+def test_mysql_ddl_partitions_by_season():
+    ddl = shots_table_ddl(through_season=2024)
+    assert 'PARTITION BY RANGE (season)' in ddl
+    assert 'PARTITION p2015 VALUES LESS THAN (2016)' in ddl
+    assert 'PARTITION p2024 VALUES LESS THAN (2025)' in ddl
+    assert ddl.rstrip().endswith('PARTITION pmax VALUES LESS THAN MAXVALUE\n)')
+    assert 'KEY idx_shots_home_team (homeTeamCode, gameDate,' in ddl
+    assert 'KEY idx_shots_home_team' not in shots_table_ddl(indexes=False)
+    assert current_season(date(2025, 3, 1)) == 2024
+    assert current_season(date(2025, 10, 1)) == 2025
+
+
+def test_sqlite_ddl_creates_the_table():
+    engine = create_engine('sqlite://')
+    ensure_shots_table(engine)
+    ensure_shots_table(engine)
+    columns = [column['name'] for column in inspect(engine).get_columns('shots_data')]
+    assert columns == SHOTS_TABLE_COLUMNS
+    assert 'PARTITION' not in shots_table_ddl(dialect='sqlite')
+    assert {index['name'] for index in inspect(engine).get_indexes('shots_data')} == set(SHOTS_INDEXES)
+
+
+def test_coerce_shots_frame():
+    df = pd.DataFrame({'shotID': [1.0], 'period': ['2'], 'xGoal': [0.25], 'teamCode': ['TOR'],
+                       'gameDate': ['2024-10-15'], 'notAShotColumn': ['kept']})
+    coerced = coerce_shots_frame(df)
+    assert coerced.dtypes.astype(str).to_dict() == {
+        'shotID': 'Int32', 'period': 'Int8', 'xGoal': 'float64', 'teamCode': 'category',
+        'gameDate': 'object', 'notAShotColumn': 'object'}
+    assert str(coerced['gameDate'].iloc[0]) == '2024-10-15'
+    assert len(SHOTS_COLUMNS) == 38
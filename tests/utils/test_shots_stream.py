@@ -0,0 +1,87 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from src.utils.shots_schema import SHOTS_COLUMNS
+from src.utils.shots_stream import iter_shot_chunks, stream_shots_zip
+
+
+def make_shots_csv(games=5, shots_per_game=7):
+    rows = []
+    for game in range(1, games + 1):
+        for shot in range(shots_per_game):
+            row = {column: 1 for column in SHOTS_COLUMNS}
+            row.update(shotID=len(rows), season=2024, game_id=30000 + game, time=shot * 100, xGoal=0.0712,
+                       teamCode='TOR', homeTeamCode='TOR', awayTeamCode='MTL', shooterName='Auston Matthews',
+                       goalieNameForShot='', unusedColumn='dropped')
+            rows.append(row)
+    return pd.DataFrame(rows).to_csv(index=False)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeSession:
+    def __init__(self, content):
+        self.content = content
+
+    def get(self, url, stream=False, timeout=None):
+        self.response = FakeResponse(self.content)
+        return self.response
+
+
+def test_chunks_hold_whole_games():
+    chunks = list(iter_shot_chunks(io.StringIO(make_shots_csv()), chunksize=10))
+    shots = pd.concat(chunks, ignore_index=True)
+
+    assert len(shots) == 35
+    assert list(shots.columns) == SHOTS_COLUMNS + ['nhl_game_id']
+    game_chunks = [set(chunk['nhl_game_id']) for chunk in chunks]
+    for game_id in shots['nhl_game_id'].unique():
+        assert sum(game_id in games for games in game_chunks) == 1
+
+
+def test_compact_dtypes_and_game_ids():
+    shots = next(iter_shot_chunks(io.StringIO(make_shots_csv(games=2)), chunksize=100))
+    assert shots['nhl_game_id'].tolist()[0] == 2024030001
+    assert str(shots['period'].dtype) == 'Int8'
+    assert str(shots['teamCode'].dtype) == 'category'
+    assert str(shots['xGoal'].dtype) == 'float64'
+    assert shots['xGoal'].iloc[0] == pytest.approx(0.0712)
+
+
+def test_stream_shots_zip_reads_archive_member():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr('shots_2024.csv', make_shots_csv())
+    session = FakeSession(archive.getvalue())
+
+    chunks = list(stream_shots_zip('https://example.com/shots_2024.zip', chunksize=8, session=session))
+    assert sum(len(chunk) for chunk in chunks) == 35
+    assert session.response.closed
+
+
+def test_archive_without_csv_is_an_error():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('readme.txt', 'nothing here')
+
+    with pytest.raises(ValueError):
+        list(stream_shots_zip('https://example.com/shots.zip', session=FakeSession(archive.getvalue())))
@@ -0,0 +1,159 @@
+import sqlite3
+
+import pytest
+from utils import sql_governor
+from utils.sql_governor import (QueryRejected, SqlGovernor, governed_query, mysql_examined_rows, run_generated,
+                                run_generated_rows)
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    connection.execute("CREATE TABLE shots_data (shotID INTEGER, season INTEGER, shooterName TEXT, xGoal REAL)")
+    connection.execute("CREATE INDEX shots_season ON shots_data (season)")
+    connection.executemany("INSERT INTO shots_data VALUES (?, ?, ?, ?)",
+                           [(i, 2015 + i % 10, f"Player {i % 50}", i / 10_000) for i in range(5_000)])
+    connection.commit()
+    return connection
+
+
+@pytest.fixture
+def governor():
+    return SqlGovernor(row_budget=10_000, timeout_ms=2_000, max_rows=100)
+
+
+class ScriptedChain:
+    """Stands in for an LLM SQL chain: answers with the next query and records the questions asked."""
+
+    def __init__(self, *queries):
+        self.queries = list(queries)
+        self.questions = []
+
+    def invoke(self, inputs):
+        self.questions.append(inputs['question'])
+        return self.queries.pop(0)
+
+
+class RecordingCursor:
+    def __init__(self, cursor, queries):
+        self.cursor = cursor
+        self.queries = queries
+
+    def execute(self, query, *params):
+        self.queries.append(query)
+        return self.cursor.execute(query, *params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class StreamingConnection:
+    """The sqlite connection behind the cursor(buffered=...) call of the streaming fetch, recording what it runs."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = []
+
+    def cursor(self, buffered=True):
+        return RecordingCursor(self.connection.cursor(), self.queries)
+
+
+def rejection(governor, query, connection):
+    with pytest.raises(QueryRejected) as info:
+        governor.run(query, connection)
+    return info.value
+
+
+def test_only_single_reads_run(governor, connection):
+    assert governor.run("```sql\nSELECT COUNT(*) AS shots FROM shots_data WHERE season = 2020;\n```", connection) \
+        == [{'shots': 500}]
+    assert rejection(governor, "DELETE FROM shots_data", connection).reason == 'not_read'
+    assert rejection(governor, "SELECT 1; DROP TABLE shots_data", connection).reason == 'multiple_statements'
+    assert governor.run("SELECT 'a;b' AS text", connection) == [{'text': 'a;b'}]
+    assert rejection(governor, "SELECT goals FROM shots_data", connection).reason == 'error'
+
+
+def test_plans_over_the_budget_are_rejected(governor, connection):
+    cross = rejection(governor, "SELECT COUNT(*) FROM shots_data a JOIN shots_data b ON a.xGoal < b.xGoal", connection)
+    assert cross.reason == 'too_expensive' and cross.estimated_rows > 10_000
+    correlated = rejection(governor, """
+        SELECT shooterName FROM shots_data s
+        WHERE season = 2020 AND xGoal > (SELECT AVG(xGoal) FROM shots_data t WHERE t.shooterName = s.shooterName)
+    """, connection)
+    assert correlated.reason == 'too_expensive'
+    assert correlated.to_dict()['hint'].startswith("Filter on season")
+
+    # One pass over the table is within budget; the index keeps a season filter cheap
+    assert governor.estimate("SELECT * FROM shots_data", connection) == 5_000
+    assert governor.estimate("SELECT * FROM shots_data WHERE season = 2020", connection) < 5_000
+
+
+def test_results_past_the_row_cap_are_rejected(governor, connection):
+    assert len(governor.run("SELECT * FROM shots_data WHERE season = 2020 LIMIT 100", connection)) == 100
+    too_many = rejection(governor, "SELECT * FROM shots_data WHERE season = 2020", connection)
+    assert too_many.reason == 'too_many_rows'
+    assert governor.rejected['too_many_rows'] == 1
+
+
+def test_slow_queries_are_stopped(connection):
+    governor = SqlGovernor(row_budget=10**12, timeout_ms=50, max_rows=100)
+    stopped = rejection(governor, """
+        SELECT COUNT(*) FROM shots_data a, shots_data b, shots_data c WHERE a.xGoal + b.xGoal > c.xGoal
+    """, connection)
+    assert stopped.reason == 'timeout'
+    # The time limit is lifted for the next query
+    assert governor.run("SELECT COUNT(*) AS shots FROM shots_data", connection) == [{'shots': 5_000}]
+
+
+def test_frames_are_capped_and_timed(governor, connection, monkeypatch):
+    stream = StreamingConnection(connection)
+    assert len(governor.frame("SELECT * FROM shots_data WHERE season = 2020 LIMIT 50", stream, 100)) == 50
+    with pytest.raises(QueryRejected) as too_many:
+        governor.frame("SELECT * FROM shots_data WHERE season = 2020", stream, 100)
+    assert too_many.value.reason == 'too_many_rows'
+
+    # On MySQL the time limit hint must follow the statement's first SELECT, or it is ignored
+    monkeypatch.setattr(sql_governor, 'dialect_of', lambda _: 'mysql')
+    monkeypatch.setattr(governor, 'check', lambda query, _: query)
+    governor.frame("SELECT s.*, t.* FROM shots_data s JOIN shots_data t USING (shotID) WHERE s.season = 2020", stream, 1_000)
+    assert stream.queries[-1] == ("SELECT /*+ MAX_EXECUTION_TIME(2000) */ s.*, t.* FROM shots_data s "
+                                  "JOIN shots_data t USING (shotID) WHERE s.season = 2020\nLIMIT 1001")
+
+
+def test_caps_are_injected():
+    assert governed_query("SELECT * FROM shots_data", 100, 1500) \
+        == "SELECT /*+ MAX_EXECUTION_TIME(1500) */ * FROM shots_data\nLIMIT 101"
+    assert governed_query("WITH recent AS (SELECT * FROM shots_data LIMIT 5) SELECT * FROM recent LIMIT 5000", 100, 1500) \
+        == "WITH recent AS (SELECT * FROM shots_data LIMIT 5) SELECT /*+ MAX_EXECUTION_TIME(1500) */ * FROM recent LIMIT 101"
+    assert governed_query("SELECT * FROM shots_data ORDER BY xGoal DESC LIMIT 10", 100, None, 'sqlite') \
+        == "SELECT * FROM shots_data ORDER BY xGoal DESC LIMIT 10"
+
+
+def test_mysql_estimate_multiplies_dependent_subqueries():
+    plan = [
+        {'id': 1, 'select_type': 'PRIMARY', 'table': 's', 'rows': 100_000, 'filtered': 10.0},
+        {'id': 2, 'select_type': 'DEPENDENT SUBQUERY', 'table': 't', 'rows': 50, 'filtered': 100.0},
+    ]
+    assert mysql_examined_rows(plan) == 100_000 + 10_000 * 50
+    join = [
+        {'id': 1, 'select_type': 'SIMPLE', 'table': 'a', 'rows': 1_000, 'filtered': 100.0},
+        {'id': 1, 'select_type': 'SIMPLE', 'table': 'b', 'rows': 1_000, 'filtered': 100.0},
+    ]
+    assert mysql_examined_rows(join) == 1_000 + 1_000 * 1_000
+
+
+def test_rejected_query_is_regenerated_with_the_reason(governor, connection):
+    chain = ScriptedChain("SELECT * FROM shots_data WHERE season = 2020",
+                          "SELECT shooterName, COUNT(*) AS shots FROM shots_data WHERE season = 2020 GROUP BY shooterName")
+    query, rows = run_generated(chain, {'question': "Shots per player in 2020"}, connection, governor.run)
+    assert query.startswith("SELECT shooterName") and len(rows) == 5
+    assert chain.questions[0] == "Shots per player in 2020"
+    assert "more than 100 rows" in chain.questions[1] and "Previous query: SELECT * FROM shots_data" in chain.questions[1]
+
+
+def test_final_rejection_is_the_response(governor, connection):
+    chain = ScriptedChain("DELETE FROM shots_data", "DROP TABLE shots_data")
+    query, response = run_generated_rows(chain, {'question': "Clear the table"}, connection, governor)
+    assert query == "DROP TABLE shots_data"
+    assert response['error'] == 'not_read'
+    assert connection.execute("SELECT COUNT(*) FROM shots_data").fetchone()[0] == 5_000
@@ -0,0 +1,148 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from src.utils.unified_stats import (ensure_compat_view, lookup_index, parse_stats_table, stats_key,
+                                     write_unified_stats)
+from utils.migrate_unified_stats import migrate
+
+
+def skaters(season, goals, players=(8479318, 8478483)):
+    rows = [{'playerId': player_id, 'season': season, 'name': f'Player {player_id}', 'situation': situation,
+             'I_F_goals': goals + index, 'icetime': 1000.0}
+            for index, player_id in enumerate(players) for situation in ('all', '5on5')]
+    return pd.DataFrame(rows)
+
+
+def scalar(engine, query, **params):
+    with engine.connect() as connection:
+        return connection.execute(text(query), params).scalar()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'nhl.db'}")
+
+
+def test_parse_stats_table():
+    assert parse_stats_table('skaterstats_regular_2024') == ('skater', 'regular', 2024)
+    assert parse_stats_table('PairStats_playoffs_2019') == ('pair', 'playoffs', 2019)
+    assert parse_stats_table('game_logs') is None
+    assert stats_key('team') == ['season', 'season_type', 'situation', 'team']
+
+
+def test_seasons_share_one_keyed_table(engine):
+    write_unified_stats(engine, skaters(2023, 40), 'skaterstats_regular_2023')
+    write_unified_stats(engine, skaters(2024, 60), 'skaterstats_regular_2024')
+    write_unified_stats(engine, skaters(2024, 5), 'skaterstats_playoffs_2024')
+    # Reloading a season updates its rows in place
+    write_unified_stats(engine, skaters(2024, 69), 'skaterstats_regular_2024')
+
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats") == 12
+    assert scalar(engine, "SELECT SUM(I_F_goals) FROM skater_stats WHERE playerId = 8479318 AND season_type = 'regular' "
+                          "AND situation = 'all' AND season BETWEEN 2023 AND 2024") == 109
+    indexes = {index['name']: index for index in inspect(engine).get_indexes('skater_stats')}
+    name, columns = lookup_index('skater')
+    assert indexes[name]['column_names'] == columns
+    assert any(index['unique'] and index['column_names'] == stats_key('skater') for index in indexes.values())
+
+
+def test_players_dropped_from_the_file_are_removed(engine):
+    write_unified_stats(engine, skaters(2024, 10), 'skaterstats_regular_2024')
+    write_unified_stats(engine, skaters(2023, 10), 'skaterstats_regular_2023')
+    write_unified_stats(engine, skaters(2024, 10, players=(8479318,)), 'skaterstats_regular_2024')
+
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats WHERE season = 2024") == 2
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats WHERE season = 2023") == 4
+
+
+def test_new_source_columns_are_added(engine):
+    write_unified_stats(engine, skaters(2023, 10), 'skaterstats_regular_2023')
+    write_unified_stats(engine, skaters(2024, 10).assign(I_F_newStat=1.5), 'skaterstats_regular_2024')
+
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats WHERE I_F_newStat IS NULL") == 4
+    assert scalar(engine, "SELECT SUM(I_F_newStat) FROM skater_stats") == 6.0
+
+
+def test_compat_view_keeps_the_old_name(engine):
+    write_unified_stats(engine, skaters(2024, 10), 'skaterstats_regular_2024')
+    write_unified_stats(engine, skaters(2024, 1), 'skaterstats_playoffs_2024')
+
+    assert ensure_compat_view(engine, 'skaterstats_regular_2024')
+    assert ensure_compat_view(engine, 'skaterstats_regular_2024')
+    assert scalar(engine, "SELECT COUNT(*) FROM skaterstats_regular_2024") == 4
+    assert scalar(engine, "SELECT MAX(I_F_goals) FROM skaterstats_regular_2024 WHERE situation = 'all'") == 11
+
+
+def test_compat_view_waits_for_the_table_to_be_migrated(engine):
+    skaters(2024, 10).to_sql('skaterstats_regular_2024', engine, index=False)
+    assert not ensure_compat_view(engine, 'skaterstats_regular_2024')
+
+
+def test_migrate_replaces_per_year_tables_with_views(engine):
+    skaters(2023, 40).to_sql('skaterstats_regular_2023', engine, index=False)
+    skaters(2024, 60).to_sql('SkaterStats_regular_2024', engine, index=False)
+    pd.DataFrame({'team': ['TOR'], 'season': [2024], 'situation': ['all'], 'xGoalsFor': [250.0]}
+                 ).to_sql('teamstats_regular_2024', engine, index=False)
+
+    assert len(migrate(engine)) == 3
+    assert set(inspect(engine).get_view_names()) == {
+        'skaterstats_regular_2023', 'SkaterStats_regular_2024', 'teamstats_regular_2024'}
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats") == 8
+    assert scalar(engine, "SELECT COUNT(*) FROM skaterstats_regular_2023") == 4
+    assert scalar(engine, "SELECT xGoalsFor FROM team_stats WHERE team = 'TOR'") == 250.0
+    assert inspect(engine).has_table('skaterstats_regular_2023__per_year')
+
+
+def test_player_card_reads_a_career_in_one_query(engine, monkeypatch):
+    from figure_generation import player_cards
+    from utils.query_catalog import CATALOG
+
+    write_unified_stats(engine, skaters(2023, 40).rename(columns={'icetime': 'ICETIME'}), 'skaterstats_regular_2023')
+    write_unified_stats(engine, skaters(2024, 60).rename(columns={'icetime': 'ICETIME'}), 'skaterstats_regular_2024')
+    with engine.begin() as connection:
+        for column in ('GAMES_PLAYED', 'onIce_xGoalsPercentage', 'offIce_xGoalsPercentage', 'onIce_corsiPercentage',
+                       'offIce_corsiPercentage', 'I_F_xGoals', 'I_F_primaryAssists', 'I_F_shotsOnGoal', 'I_F_points',
+                       'I_F_penalityMinutes', 'I_F_takeaways', 'I_F_giveaways', 'I_F_lowDangerShots',
+                       'I_F_mediumDangerShots', 'I_F_highDangerShots', 'OnIce_F_xGoals', 'OnIce_F_goals',
+                       'OnIce_A_xGoals', 'OnIce_A_goals', 'OffIce_F_xGoals', 'OffIce_A_xGoals', 'I_F_hits',
+                       'shotsBlockedByPlayer'):
+            connection.execute(text(f"ALTER TABLE skater_stats ADD COLUMN {column} FLOAT"))
+
+    queries = []
+
+    def run_statement(_db, name, params):
+        query = CATALOG[name]
+        queries.append(query)
+        with engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.exec_driver_sql(query.replace('%s', '?'), tuple(params))]
+
+    monkeypatch.setattr(player_cards.query_catalog, 'run_statement', run_statement)
+    career = player_cards.fetch_career_stats(engine, 8479318, range(2015, 2025))
+
+    assert len(queries) == 1
+    assert sorted(career) == [(2023, '5on5'), (2023, 'all'), (2024, '5on5'), (2024, 'all')]
+    assert career[(2024, 'all')][0]['I_F_goals'] == 60
+    assert 'season' not in career[(2024, 'all')][0]
+
+
+def test_first_load_backfills_unmigrated_seasons(engine):
+    from utils.data_updating import write_table
+
+    # Before the migration every season is a per-year table; ingestion only loads 2024
+    skaters(2022, 30).to_sql('skaterstats_regular_2022', engine, index=False)
+    skaters(2023, 40).to_sql('skaterstats_regular_2023', engine, index=False)
+    skaters(2024, 50).to_sql('skaterstats_regular_2024', engine, index=False)
+    pd.DataFrame({'team': ['TOR'], 'season': [2023], 'situation': ['all'], 'xGoalsFor': [250.0]}
+                 ).to_sql('teamstats_regular_2023', engine, index=False)
+
+    write_table(engine, skaters(2024, 60), 'skaterstats_regular_2024')
+    assert scalar(engine, "SELECT COUNT(*) FROM skater_stats") == 12
+    assert scalar(engine, "SELECT I_F_goals FROM skater_stats WHERE season = 2022 AND playerId = 8479318 "
+                          "AND situation = 'all'") == 30
+    assert scalar(engine, "SELECT I_F_goals FROM skater_stats WHERE season = 2024 AND playerId = 8479318 "
+                          "AND situation = 'all'") == 60
+    # Other kinds wait for their own load, and seasons already merged are not read again
+    assert not inspect(engine).has_table('team_stats')
+    skaters(2023, 0).to_sql('skaterstats_regular_2023', engine, index=False, if_exists='replace')
+    write_table(engine, skaters(2024, 61), 'skaterstats_regular_2024')
+    assert scalar(engine, "SELECT SUM(I_F_goals) FROM skater_stats WHERE season = 2023") == 162